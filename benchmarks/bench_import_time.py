@@ -0,0 +1,57 @@
+# --- FILENAME: benchmarks/bench_import_time.py ---
+"""
+Cold-start import time of image_alchemy, measured in fresh interpreters.
+
+Fails (exit code 1) when the median exceeds --budget seconds or when an import
+pulls in one of the heavy libraries that must only load on first use.
+
+Usage:
+    python benchmarks/bench_import_time.py --budget 1.0
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "diffusers", "transformers", "segment_anything", "controlnet_aux",
+                 "cv2", "matplotlib", "skimage")
+MODULES = ("image_alchemy", "image_alchemy.alchemy", "image_alchemy.service",
+           "image_alchemy.pool", "image_alchemy.cli")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum median import time in seconds")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeats)]
+        median = statistics.median(run["seconds"] for run in runs)
+        heavy = sorted(set(m for run in runs for m in run["heavy"]))
+        status = "ok"
+        if median > args.budget:
+            status, failed = f"over budget ({args.budget:.2f}s)", True
+        if heavy:
+            status, failed = f"eagerly imports {', '.join(heavy)}", True
+        print(f"{module:<24} median {median * 1000:7.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# --- FILENAME: benchmarks/bench_operations.py ---
+"""
+Library overhead of every public operation, measured offline on stub models.
+
+The diffusion, SAM and annotator models are replaced by the instant stand-ins of
+`image_alchemy.core.stubs`, so the timings cover only ImageAlchemy's own work:
+pipeline setup, PIL/NumPy conversions, mask handling, tiling, zoom canvases.
+Each operation runs over a matrix of image sizes. The benchmark reports latency
+percentiles, the peak RSS growth during the call and the peak of Python-level
+allocations (NumPy buffers included; PIL images and torch CPU tensors are not
+traced). The allocation peak is also broken down per stage, using the spans the
+library reports through `image_alchemy.core.instrumentation` (e.g. "sam.encode",
+"control.preprocess", "diffusion", "inpaint.composite").
+
+Results can be saved as a baseline and later runs compared against it. The
+comparison fails (exit code 1) when a median latency regresses by more than
+--tolerance, or the total or any stage's allocation peak by more than
+--alloc-tolerance (and at least --alloc-slack MB). benchmarks/baseline.json holds
+a baseline of the default matrix. Allocation peaks carry over between machines;
+latencies do not, so regenerate the baseline locally before comparing them.
+
+Usage:
+    python benchmarks/bench_operations.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_operations.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_operations.py --baseline benchmarks/baseline.json --tolerance 0.25
+    python benchmarks/bench_operations.py --only manipulation --sizes 512x512
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from image_alchemy.alchemy import ImageAlchemy
+from image_alchemy.core import instrumentation
+from image_alchemy.core.stubs import StubModelLoader
+
+DEFAULT_SIZES = "256x256,512x384,1024x768"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _box(w: int, h: int, left: float, top: float) -> list:
+    return [int(w * left), int(h * top), int(w * (left + 0.3)), int(h * (top + 0.3))]
+
+# name -> callable(alchemy, image, seed) running one public operation
+CASES = {
+    "enhancement.denoise": lambda a, img, s: a.enhancement.denoise(img, seed=s),
+    "enhancement.sharpen": lambda a, img, s: a.enhancement.sharpen(img, seed=s),
+    "enhancement.deblur": lambda a, img, s: a.enhancement.deblur(img, seed=s),
+    "enhancement.super_resolution": lambda a, img, s: a.enhancement.super_resolution(img, scale=2, seed=s),
+    "enhancement.colorize": lambda a, img, s: a.enhancement.colorize(img, seed=s),
+    "enhancement.correct_light": lambda a, img, s: a.enhancement.correct_light(img, seed=s, tier="quality"),
+    "enhancement.correct_light_fast": lambda a, img, s: a.enhancement.correct_light(img, tier="fast"),
+    "enhancement.dehaze_fast": lambda a, img, s: a.enhancement.dehaze(img, tier="fast"),
+    "enhancement.white_balance_fast": lambda a, img, s: a.enhancement.white_balance(img, tier="fast"),
+    "enhancement.hdr_fast": lambda a, img, s: a.enhancement.hdr(img, tier="fast"),
+    "enhancement.fast_batch": lambda a, img, s: a.enhancement.fast_batch("dehaze", [img] * 4),
+    "enhancement.enhance_batch": lambda a, img, s: a.enhancement.enhance_batch("denoise", [img] * 4, seeds=[s] * 4),
+    "enhancement.iter_enhance": lambda a, img, s: list(a.enhancement.iter_enhance("denoise", [img] * 4)),
+    "manipulation.inpaint": lambda a, img, s: a.manipulation.inpaint(img, _box(*img.size, 0.1, 0.1), "a cat", seed=s),
+    "manipulation.inpaint_batch": lambda a, img, s: a.manipulation.inpaint_batch(
+        [(img, _box(*img.size, 0.1, 0.1), "a cat")] * 4, seed=s
+    ),
+    "manipulation.remove_object": lambda a, img, s: a.manipulation.remove_object(img, _box(*img.size, 0.1, 0.1), seed=s),
+    "manipulation.add_object": lambda a, img, s: a.manipulation.add_object(img, _box(*img.size, 0.5, 0.5), "a vase", seed=s),
+    "manipulation.reposition_object": lambda a, img, s: a.manipulation.reposition_object(
+        img, _box(*img.size, 0.1, 0.1), _box(*img.size, 0.6, 0.6), "a vase", seed=s
+    ),
+    "manipulation.reposition_object_fused": lambda a, img, s: a.manipulation.reposition_object(
+        img, _box(*img.size, 0.1, 0.1), _box(*img.size, 0.6, 0.6), "a vase", fused=True, seed=s
+    ),
+    "generative.generate_background": lambda a, img, s: a.generative.generate_background(
+        img, _box(*img.size, 0.3, 0.3), "a beach at sunset", seed=s
+    ),
+    "generative.generative_zoom": lambda a, img, s: a.generative.generative_zoom(
+        img, "a forest", num_steps=4, interpolation_factor=2, seed=s
+    ),
+}
+
+def make_image(width: int, height: int) -> Image.Image:
+    """A deterministic photo-like test image: gradients, noise and a few solid shapes."""
+    rng = np.random.RandomState(width * 10007 + height)
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x.repeat(height, 0), y.repeat(width, 1), (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 10, pixels.shape)
+    pixels[height // 4: height // 2, width // 4: width // 2] = (200, 40, 40)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (Linux), or 0 where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+class RssSampler:
+    """Samples the RSS in a background thread and keeps the peak seen inside a `with` block."""
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss())
+
+    @property
+    def growth(self) -> int:
+        return self.peak_bytes - self.start_bytes
+
+class AllocationProfiler(instrumentation.Instrumentation):
+    """
+    Records the peak of traced allocations inside every span, above what was allocated when it opened.
+
+    tracemalloc keeps a single process-wide peak. It is reset whenever a span opens or
+    closes, and the peak seen since the last reset is folded into every open span first,
+    so nested spans each get their own peak. Stages running at the same time in other
+    threads count towards each other's peaks.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.peaks = {}  # span name -> largest peak growth in bytes
+        self._open = []  # [name, traced bytes at entry, peak so far] of every open span
+        self._lock = threading.Lock()
+
+    def _fold_peak(self):
+        _, peak = tracemalloc.get_traced_memory()
+        for record in self._open:
+            record[2] = max(record[2], peak)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        with self._lock:
+            self._fold_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            record = [name, current, current]
+            self._open.append(record)
+        try:
+            yield instrumentation._NULL_SPAN
+        finally:
+            with self._lock:
+                self._fold_peak()
+                self._open.remove(record)
+                self.peaks[name] = max(self.peaks.get(name, 0), record[2] - record[1])
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * q
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+def run_case(alchemy: ImageAlchemy, operation, image: Image.Image, repeats: int) -> dict:
+    """
+    Times `repeats` calls after one warm-up call, then measures allocations,
+    in total and per stage, on one more call.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        operation(alchemy, image, 0)  # warm-up: registers stub models, fills prompt caches
+        latencies = []
+        rss_growth = 0
+        for i in range(repeats):
+            with RssSampler() as rss:
+                start = time.perf_counter()
+                operation(alchemy, image, i)
+                latencies.append(time.perf_counter() - start)
+            rss_growth = max(rss_growth, rss.growth)
+
+        profiler = AllocationProfiler()
+        previous = instrumentation.set_instrumentation(profiler)
+        tracemalloc.start()
+        try:
+            operation(alchemy, image, repeats)
+            _, alloc_peak = tracemalloc.get_traced_memory()
+            # The last reset happened when the outermost span closed
+            alloc_peak = max([alloc_peak] + list(profiler.peaks.values()))
+        finally:
+            tracemalloc.stop()
+            instrumentation.set_instrumentation(previous)
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p90_ms": percentile(latencies, 0.9) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "peak_rss_growth_mb": rss_growth / 1024**2,
+        "alloc_peak_mb": alloc_peak / 1024**2,
+        "stage_alloc_peak_mb": {name: peak / 1024**2 for name, peak in profiler.peaks.items()},
+    }
+
+def json_safe(value):
+    """Replaces non-finite floats (e.g. of an empty stage) by None, which JSON writes as null."""
+    if isinstance(value, dict):
+        return {k: json_safe(v) for k, v in value.items()}
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def compare(results: dict, baseline: dict, tolerance: float, alloc_tolerance: float = 0.25, alloc_slack: float = 0.5) -> list:
+    """
+    Returns (case, metric, baseline value, current value) for every regression against the baseline:
+    a p50 latency higher by more than `tolerance`, or a total or per-stage allocation peak higher
+    by more than `alloc_tolerance` and at least `alloc_slack` MB. Stages missing from the baseline
+    are compared against zero; values that are null on either side are skipped.
+    """
+    regressions = []
+    for case, current in results.items():
+        reference = baseline.get("results", {}).get(case)
+        if not reference:
+            continue
+        before, after = reference.get("p50_ms"), current["p50_ms"]
+        if before is not None and after is not None and after > before * (1 + tolerance):
+            regressions.append((case, "p50_ms", before, after))
+        peaks = [("alloc_peak_mb", reference.get("alloc_peak_mb"), current["alloc_peak_mb"])]
+        reference_stages = reference.get("stage_alloc_peak_mb", {})
+        for stage, peak in sorted(current["stage_alloc_peak_mb"].items()):
+            peaks.append((f"stage_alloc_peak_mb[{stage}]", reference_stages.get(stage, 0.0), peak))
+        for metric, before, after in peaks:
+            if before is None or after is None:
+                continue
+            if after > before * (1 + alloc_tolerance) and after - before >= alloc_slack:
+                regressions.append((case, metric, before, after))
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated WxH image sizes")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per operation and size")
+    parser.add_argument("--only", default="", help="Run only operations whose name contains this substring")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p50 slowdown")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.25,
+                        help="Allowed relative growth of the total and per-stage allocation peaks")
+    parser.add_argument("--alloc-slack", type=float, default=0.5,
+                        help="Allocation peak growth in MB that is never reported, whatever its relative size")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline JSON to this path")
+    parser.add_argument("--stages", action="store_true", help="Print the allocation peak of every stage")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes.split(",")]
+    cases = {name: op for name, op in CASES.items() if args.only in name}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        alchemy = ImageAlchemy(model_loader=StubModelLoader())
+
+    results = {}
+    print(f"{'operation':<40} {'size':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'rss+ MB':>8} {'alloc MB':>9}")
+    for name, operation in cases.items():
+        for width, height in sizes:
+            case = f"{name}@{width}x{height}"
+            stats = run_case(alchemy, operation, make_image(width, height), args.repeats)
+            results[case] = stats
+            print(
+                f"{name:<40} {f'{width}x{height}':>10} {stats['p50_ms']:9.1f} {stats['p90_ms']:9.1f} "
+                f"{stats['p99_ms']:9.1f} {stats['peak_rss_growth_mb']:8.1f} {stats['alloc_peak_mb']:9.1f}"
+            )
+            if args.stages:
+                stages = sorted(stats["stage_alloc_peak_mb"].items(), key=lambda item: -item[1])
+                for stage, peak in stages:
+                    print(f"  {stage:<38} {'':>10} {'':>9} {'':>9} {'':>9} {'':>8} {peak:9.1f}")
+
+    results = json_safe(results)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeats": args.repeats,
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True, allow_nan=False)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.alloc_tolerance, args.alloc_slack)
+        for case, metric, before, after in regressions:
+            growth = f" (+{after / before - 1:.0%})" if before else ""
+            print(f"REGRESSION {case}: {metric} {before:.1f} -> {after:.1f}{growth}")
+        if regressions:
+            return 1
+        print(
+            f"No p50 regressions beyond {args.tolerance:.0%} and no allocation regressions beyond "
+            f"{args.alloc_tolerance:.0%} against {args.baseline}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# --- FILENAME: src/image_alchemy/__init__.py ---
+"""
+ImageAlchemy: prompt-driven image enhancement, manipulation and generation.
+
+The public classes are imported on first access, so `import image_alchemy`
+does not load torch or diffusers until a model is actually needed.
+"""
+import importlib
+
+__version__ = "0.1.0"
+
+_EXPORTS = {
+    "ImageAlchemy": ".alchemy",
+    "AlchemyService": ".service",
+    "ServiceOverloaded": ".service",
+    "AlchemyPool": ".pool",
+    "WorkerCrashed": ".pool",
+    "ModelLoader": ".core.model_loader",
+    "set_instrumentation": ".core.instrumentation",
+    "Recorder": ".core.instrumentation",
+    "JsonLogExporter": ".core.instrumentation",
+    "PrometheusExporter": ".core.instrumentation",
+}
+
+__all__ = ["__version__"] + list(_EXPORTS)
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,30 @@
 # --- FILENAME: src/image_alchemy/alchemy.py ---
-import torch
+from typing import Dict, List
+
 from .core.model_loader import ModelLoader
-from .functionalities.enhancement import EnhancementModule
+from .core.result_cache import ResultCache
+from .functionalities.enhancement import EnhancementModule, CONTROLNET_MAP
 from .functionalities.manipulation import ManipulationModule
 from .functionalities.generative import GenerativeModule
+from .utils.lazy import lazy_import
+
+torch = lazy_import("torch")
+
+def _controlnet_target(control_type: str):
+    controlnet_id, annotator = CONTROLNET_MAP[control_type]
+
+    def load(loader: ModelLoader):
+        loader.get_annotator(annotator)
+        return loader.get_controlnet_pipeline(controlnet_model_id=controlnet_id)
+    return load
+
+# Names accepted by `ImageAlchemy(warmup=[...])` -> function loading what the operations need
+WARMUP_TARGETS = {
+    "inpaint": lambda loader: loader.get_sd_pipeline(),
+    "sam": lambda loader: loader.get_sam_predictor(),
+    "canny": _controlnet_target("canny"),
+    "softedge": _controlnet_target("softedge"),
+}
 
 class ImageAlchemy:
     """
@@ -11,7 +32,24 @@ class ImageAlchemy:
     This class initializes all necessary models and provides access to
     different image processing modules.
     """
-    def __init__(self, device: str = None, cache_dir: str = None):
+    def __init__(
+        self,
+        device: str = None,
+        cache_dir: str = None,
+        sam_cache_bytes: int = 256 * 1024**2,
+        control_cache_bytes: int = 128 * 1024**2,
+        prompt_cache_entries: int = 256,
+        max_device_bytes: int = None,
+        max_host_bytes: int = None,
+        precompute_prompts: bool = False,
+        result_cache_dir: str = None,
+        result_cache_bytes: int = 2 * 1024**3,
+        model_loader: ModelLoader = None,
+        use_snapshots: bool = True,
+        enhancement_tier: str = "auto",
+        warmup: List[str] = None,
+        warmup_workers: int = 2
+    ):
         """
         Initializes the ImageAlchemy engine.
 
@@ -20,23 +58,106 @@ class ImageAlchemy:
                                     If None, automatically detects GPU. Defaults to None.
             cache_dir (str, optional): The directory to cache downloaded models. 
                                        Defaults to Hugging Face's default cache.
+            sam_cache_bytes (int, optional): Memory budget for cached SAM image embeddings.
+                                             Defaults to 256 MB.
+            control_cache_bytes (int, optional): Memory budget for cached ControlNet control images.
+                                                 Defaults to 128 MB.
+            prompt_cache_entries (int, optional): Maximum number of cached prompt embeddings. Defaults to 256.
+            max_device_bytes (int, optional): Budget for model weights on the device. Least-recently-used
+                                              models are offloaded to CPU beyond it. Defaults to None (unbounded).
+            max_host_bytes (int, optional): Budget for offloaded model weights in CPU RAM. Least-recently-used
+                                            models are evicted beyond it. Defaults to None (unbounded).
+            precompute_prompts (bool, optional): Encode the library's built-in prompts at startup.
+                                                 This loads the pipelines they run on. Defaults to False.
+            result_cache_dir (str, optional): Directory for caching operation results on disk. Repeated calls
+                                              with the same image, parameters and `seed` are then served from
+                                              the cache. Calls without a seed are never cached. Defaults to None (off).
+            result_cache_bytes (int, optional): Size cap of the result cache directory. Defaults to 2 GB.
+            model_loader (ModelLoader, optional): Use this loader instead of creating one, e.g. a
+                                                  `core.stubs.StubModelLoader` for testing. The device and
+                                                  model cache arguments are then ignored. Defaults to None.
+            use_snapshots (bool, optional): Load models from the snapshots written by `export_snapshots`
+                                            when they exist in `cache_dir`. Defaults to True.
+            enhancement_tier (str, optional): Default tier of correct_light, dehaze, white_balance and hdr:
+                                              "quality" (diffusion), "fast" (classical OpenCV algorithms) or
+                                              "auto" (fast when running on the CPU). Defaults to "auto".
+            warmup (List[str], optional): Models to load in the background right away, from
+                                          `WARMUP_TARGETS` ("inpaint", "sam", "canny", "softedge") or "all".
+                                          The engine is usable immediately; a request needing a model that
+                                          is still loading waits for it. Defaults to None.
+            warmup_workers (int, optional): Models loaded in parallel during warmup. Defaults to 2.
         """
-        if device is None:
+        if warmup is not None:
+            warmup = list(WARMUP_TARGETS) if "all" in warmup else list(warmup)
+            unknown = [name for name in warmup if name not in WARMUP_TARGETS]
+            if unknown:
+                raise ValueError(f"Unknown warmup targets {unknown}; choose from {sorted(WARMUP_TARGETS)} or 'all'")
+
+        if model_loader is not None:
+            self.device = model_loader.device
+        elif device is None:
             self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         else:
             self.device = device
         
         print(f"Initializing ImageAlchemy on device: {self.device}")
 
-        self.model_loader = ModelLoader(device=self.device, cache_dir=cache_dir)
+        self.model_loader = model_loader or ModelLoader(
+            device=self.device,
+            cache_dir=cache_dir,
+            sam_cache_bytes=sam_cache_bytes,
+            control_cache_bytes=control_cache_bytes,
+            prompt_cache_entries=prompt_cache_entries,
+            max_device_bytes=max_device_bytes,
+            max_host_bytes=max_host_bytes,
+            use_snapshots=use_snapshots
+        )
 
         # Initialize functional modules
-        self.enhancement = EnhancementModule(self.model_loader)
+        self.enhancement = EnhancementModule(self.model_loader, tier=enhancement_tier)
         self.manipulation = ManipulationModule(self.model_loader)
         self.generative = GenerativeModule(self.model_loader)
 
+        self.result_cache = ResultCache(result_cache_dir, result_cache_bytes) if result_cache_dir else None
+        for module in (self.enhancement, self.manipulation, self.generative):
+            module.result_cache = self.result_cache
+
+        if precompute_prompts:
+            print("Precomputing built-in prompt embeddings...")
+            self.enhancement.precompute_prompt_embeddings()
+            self.manipulation.precompute_prompt_embeddings()
+
+        if warmup:
+            print(f"Warming up in the background: {', '.join(warmup)}")
+            self.model_loader.warmup({name: WARMUP_TARGETS[name] for name in warmup}, max_workers=warmup_workers)
+
         print("ImageAlchemy engine initialized successfully.")
 
+    def export_snapshots(self, targets: List[str] = None) -> List[str]:
+        """
+        Loads the models behind `targets` (names from `WARMUP_TARGETS`, default all) and writes
+        fast-load snapshots of them under `<cache_dir>/snapshots`. Run this once per host;
+        later engines using the same `cache_dir` then start from the snapshots.
+
+        Returns:
+            List[str]: The snapshot directories written.
+        """
+        for name in targets or WARMUP_TARGETS:
+            WARMUP_TARGETS[name](self.model_loader)
+        return self.model_loader.export_snapshots()
+
+    def is_ready(self, names: List[str] = None) -> bool:
+        """True once the given (default: all) warmup targets have finished loading."""
+        return self.model_loader.is_ready(names)
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Blocks until warmup finishes. Returns False on timeout or if a model failed to load."""
+        return self.model_loader.wait_until_ready(timeout)
+
+    def warmup_status(self) -> Dict[str, str]:
+        """Returns "loading", "ready" or "failed: <reason>" for every warmup target."""
+        return self.model_loader.warmup_status()
+
     def set_device(self, device: str):
         """
         Changes the device for all loaded models.
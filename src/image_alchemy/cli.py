@@ -0,0 +1,258 @@
+# --- FILENAME: src/image_alchemy/cli.py ---
+"""
+Bulk processing of image directories from the command line.
+
+Examples:
+    image-alchemy enhancement.denoise photos/ -o denoised/ --seed 0
+    image-alchemy manipulation.remove_object "shots/**/*.jpg" -o clean/ --mask-dir masks/
+    image-alchemy enhancement.sharpen data/ -o out/ --num-shards 4 --shard-index 2
+
+Inputs are streamed: at most `--prefetch` decoded images wait for the model
+and outputs are written by background threads. Every finished item is appended
+to a manifest in the output directory, and items already recorded there are
+skipped, so an interrupted run picks up where it stopped. With `--num-shards`,
+each process handles a stable, disjoint subset of the inputs and keeps its own manifest.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, List, Tuple
+
+from .core.staging import StagedPipeline
+from .utils.image_utils import load_image, encode_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+MODULES = ("enhancement", "manipulation", "generative")
+
+def collect_inputs(patterns: List[str]) -> List[Tuple[str, str]]:
+    """
+    Expands directories (recursively) and glob patterns into (path, relative path) pairs,
+    sorted by relative path. Relative paths are taken from each directory argument,
+    or from the common parent directory of a pattern's matches.
+
+    Raises:
+        ValueError: If two different files get the same relative path (e.g. "a/x.png" and
+                    "b/x.png" given as the directories "a" and "b").
+    """
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            paths = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(pattern) for name in names]
+        else:
+            paths = [p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)]
+            root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths]) if paths else "."
+        for path in paths:
+            if not path.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+            if rel in found and os.path.abspath(found[rel]) != os.path.abspath(path):
+                raise ValueError(f"{found[rel]} and {path} both have the relative path {rel}")
+            found[rel] = path
+    return [(found[rel], rel) for rel in sorted(found)]
+
+def in_shard(relative_path: str, shard_index: int, num_shards: int) -> bool:
+    """Stable assignment of an input to a shard, independent of listing order."""
+    digest = hashlib.blake2b(relative_path.replace(os.sep, "/").encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards == shard_index
+
+def read_manifest(path: str) -> set:
+    """Relative paths of the inputs a manifest records as done. Torn trailing lines are ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("status") == "done":
+                done.add(entry["input"])
+    return done
+
+def write_atomic(path: str, data: bytes):
+    """Writes to a temporary file next to `path` and renames it into place."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def parse_param(pair: str) -> Tuple[str, Any]:
+    """
+    Parses a KEY=VALUE pair; the `type` of the --param option. Values are read as JSON
+    when possible, e.g. box=[10,20,200,240].
+    """
+    key, sep, value = pair.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {pair!r}")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+def output_paths(inputs: List[Tuple[str, str]], output_dir: str, extension: str) -> List[str]:
+    """
+    Output path of every (path, relative path) input.
+
+    Raises:
+        ValueError: If two inputs would be written to the same file (e.g. "x.png" and "x.jpg").
+    """
+    owners = {}
+    paths = []
+    for _, rel in inputs:
+        output_path = os.path.join(output_dir, os.path.splitext(rel)[0] + extension)
+        if output_path in owners:
+            raise ValueError(f"{owners[output_path]} and {rel} would both be written to {output_path}")
+        owners[output_path] = rel
+        paths.append(output_path)
+    return paths
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="image-alchemy", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("operation", help='Operation as "module.method", e.g. enhancement.denoise')
+    parser.add_argument("inputs", nargs="+", help="Input directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the results")
+    parser.add_argument("-p", "--param", action="append", default=[], type=parse_param, metavar="KEY=VALUE",
+                        help="Operation argument; may be repeated. Values are parsed as JSON when possible")
+    parser.add_argument("--mask-dir", help="Directory with one mask per input (same relative path and stem), "
+                                           "passed as the operation's `mask` argument")
+    parser.add_argument("--seed", type=int, help="Seed for every item (enables reproducible results)")
+    parser.add_argument("--format", default="png", choices=sorted(FORMATS), help="Output format")
+    parser.add_argument("--prefetch", type=int, default=4, help="Decoded inputs buffered ahead of the model")
+    parser.add_argument("--loaders", type=int, default=2, help="Threads decoding inputs")
+    parser.add_argument("--writers", type=int, default=2, help="Threads encoding and writing outputs")
+    parser.add_argument("--num-shards", type=int, default=1, help="Split the inputs across this many processes")
+    parser.add_argument("--shard-index", type=int, default=0, help="Which shard this process handles")
+    parser.add_argument("--manifest", help="Manifest path. Defaults to manifest[-I-of-N].jsonl in the output directory")
+    parser.add_argument("--device", help="Device to run on. Defaults to CUDA when available")
+    parser.add_argument("--cache-dir", help="Model cache directory")
+    parser.add_argument("--result-cache-dir", help="Enable the on-disk result cache in this directory")
+    return parser
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    module_name, _, method_name = args.operation.partition(".")
+    if module_name not in MODULES or not method_name or method_name.startswith("_"):
+        print(f"Unknown operation: {args.operation}", file=sys.stderr)
+        return 2
+    if not 0 <= args.shard_index < args.num_shards:
+        print("--shard-index must be in [0, --num-shards)", file=sys.stderr)
+        return 2
+    params = dict(args.param)
+    if args.seed is not None:
+        params["seed"] = args.seed
+
+    manifest_path = args.manifest or os.path.join(
+        args.output_dir,
+        "manifest.jsonl" if args.num_shards == 1 else f"manifest-{args.shard_index}-of-{args.num_shards}.jsonl"
+    )
+    done = read_manifest(manifest_path)
+    try:
+        # Checked on all inputs, not just this shard's, so that every shard refuses the same run
+        inputs = collect_inputs(args.inputs)
+        outputs = output_paths(inputs, args.output_dir, "." + args.format)
+    except ValueError as e:
+        print(f"Conflicting inputs: {e}", file=sys.stderr)
+        return 2
+    todo = []
+    for (path, rel), output_path in zip(inputs, outputs):
+        if not in_shard(rel, args.shard_index, args.num_shards):
+            continue
+        if rel in done and os.path.exists(output_path):
+            continue
+        todo.append((path, rel, output_path))
+    print(f"{len(todo)} images to process ({len(done)} already done according to {manifest_path})")
+    if not todo:
+        return 0
+
+    # Deferred so that --help and argument errors do not pay for loading torch
+    from .alchemy import ImageAlchemy
+    alchemy = ImageAlchemy(device=args.device, cache_dir=args.cache_dir, result_cache_dir=args.result_cache_dir)
+    operation = getattr(getattr(alchemy, module_name), method_name, None)
+    if not callable(operation):
+        print(f"Unknown operation: {args.operation}", file=sys.stderr)
+        return 2
+
+    def preprocess(item):
+        path, rel, output_path = item
+        try:
+            inputs = {"image": load_image(path)}
+            if args.mask_dir:
+                stem = os.path.join(args.mask_dir, os.path.splitext(rel)[0])
+                mask_path = next((stem + ext for ext in IMAGE_EXTENSIONS if os.path.exists(stem + ext)), None)
+                if mask_path is None:
+                    raise FileNotFoundError(f"No mask for {rel} in {args.mask_dir}")
+                inputs["mask"] = load_image(mask_path).convert("L")
+            return item, inputs, None
+        except Exception as e:
+            return item, None, e
+
+    def infer(prepared):
+        item, inputs, error = prepared
+        if error is not None:
+            return item, None, error, 0.0
+        start = time.perf_counter()
+        try:
+            return item, operation(**inputs, **params), None, time.perf_counter() - start
+        except Exception as e:
+            return item, None, e, time.perf_counter() - start
+
+    manifest_lock = threading.Lock()
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    manifest = open(manifest_path, "a")
+
+    def postprocess(inferred):
+        (path, rel, output_path), result, error, seconds = inferred
+        entry = {"input": rel, "seconds": round(seconds, 3)}
+        if error is None:
+            try:
+                write_atomic(output_path, encode_image(result, FORMATS[args.format]))
+                entry.update(status="done", output=os.path.relpath(output_path, args.output_dir))
+            except Exception as e:
+                error = e
+        if error is not None:
+            entry.update(status="failed", error=f"{type(error).__name__}: {error}")
+        with manifest_lock:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+        return entry
+
+    staged = StagedPipeline(
+        preprocess, infer, postprocess,
+        preprocess_workers=args.loaders, postprocess_workers=args.writers, queue_size=args.prefetch
+    )
+    failures = 0
+    try:
+        for index, entry in enumerate(staged.run(todo), 1):
+            if entry["status"] == "done":
+                print(f"[{index}/{len(todo)}] {entry['input']} ({entry['seconds']:.2f}s)")
+            else:
+                failures += 1
+                print(f"[{index}/{len(todo)}] {entry['input']} FAILED: {entry['error']}", file=sys.stderr)
+    finally:
+        manifest.close()
+
+    stats = staged.stats()
+    print(f"Finished {len(todo) - failures}/{len(todo)} images in {stats['wall_seconds']:.1f}s")
+    for name in ("preprocess", "infer", "postprocess"):
+        print(f"  {name:<12} utilization {stats[name]['utilization']:6.1%}  busy {stats[name]['busy_seconds']:.1f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
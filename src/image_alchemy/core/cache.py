@@ -0,0 +1,129 @@
+# --- FILENAME: src/image_alchemy/core/cache.py ---
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from . import instrumentation
+
+def estimate_nbytes(obj: Any) -> int:
+    """
+    Best-effort estimate of the memory held by a cached value.
+    Understands torch tensors, NumPy arrays, PIL images and (nested) containers of them.
+    """
+    if obj is None:
+        return 0
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"):  # torch.Tensor
+        return obj.element_size() * obj.nelement()
+    if hasattr(obj, "nbytes"):  # np.ndarray
+        return int(obj.nbytes)
+    if hasattr(obj, "getbands") and hasattr(obj, "size"):  # PIL.Image.Image
+        width, height = obj.size
+        return width * height * len(obj.getbands())
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in obj)
+    return 0
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache with an optional memory budget.
+
+    Entries are evicted oldest-first once `max_bytes` or `max_entries` would be
+    exceeded. Hit, miss and eviction counters are kept so callers can see what
+    the cache is saving them.
+    """
+    def __init__(
+        self,
+        max_bytes: int = None,
+        max_entries: int = None,
+        size_fn: Callable[[Any], int] = estimate_nbytes,
+        name: str = "cache"
+    ):
+        """
+        Args:
+            max_bytes (int, optional): Memory budget for all entries. None means unbounded.
+            max_entries (int, optional): Maximum number of entries. None means unbounded.
+            size_fn (Callable, optional): Returns the size in bytes of a value.
+            name (str, optional): Name used when reporting statistics.
+        """
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size_fn = size_fn
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key` and marks it as most recently used."""
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = self._entries[key][0]
+            else:
+                self.misses += 1
+                value = default
+        instrumentation.count("cache.hits" if hit else "cache.misses", cache=self.name)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Stores a value, evicting least-recently-used entries to stay within budget.
+
+        Returns:
+            bool: False if the value alone is larger than the budget and was not stored.
+        """
+        size = self.size_fn(value) if self.size_fn else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            self._evict()
+        return True
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_bytes is not None and self._current_bytes > self.max_bytes)
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._current_bytes -= size
+            self.evictions += 1
+            instrumentation.count("cache.evictions", cache=self.name)
+
+    def clear(self):
+        """Drops all entries. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Returns hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,138 @@
+# --- FILENAME: src/image_alchemy/core/classical.py ---
+"""
+Deterministic enhancement algorithms for the "fast" tier.
+
+Each function takes and returns a PIL image and runs in milliseconds on a CPU.
+The heavy lifting is done in OpenCV, which releases the GIL, so several images
+can be processed in parallel threads (see `EnhancementModule.fast_batch`).
+"""
+import numpy as np
+from PIL import Image
+
+from ..utils.image_utils import pil_to_numpy
+from ..utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+def _guided_filter(guide: np.ndarray, src: np.ndarray, radius: int, eps: float) -> np.ndarray:
+    """Edge-preserving smoothing of `src` steered by the gray-scale `guide` (He et al.), both float32 in [0, 1]."""
+    size = (2 * radius + 1, 2 * radius + 1)
+    mean_g = cv2.boxFilter(guide, -1, size)
+    mean_s = cv2.boxFilter(src, -1, size)
+    cov = cv2.boxFilter(guide * src, -1, size) - mean_g * mean_s
+    var = cv2.boxFilter(guide * guide, -1, size) - mean_g * mean_g
+    a = cov / (var + eps)
+    b = mean_s - a * mean_g
+    return cv2.boxFilter(a, -1, size) * guide + cv2.boxFilter(b, -1, size)
+
+def dehaze(image: Image.Image, strength: float = 0.95, patch_size: int = 15, min_transmission: float = 0.1) -> Image.Image:
+    """
+    Removes haze with the dark channel prior.
+
+    Args:
+        image (Image.Image): The hazy image.
+        strength (float, optional): Fraction of the estimated haze removed (omega). Defaults to 0.95.
+        patch_size (int, optional): Window of the dark channel in pixels. Defaults to 15.
+        min_transmission (float, optional): Lower bound of the transmission map, avoids noise
+                                            amplification in dense haze. Defaults to 0.1.
+
+    Returns:
+        Image.Image: The dehazed image.
+    """
+    pixels = pil_to_numpy(image).astype(np.float32) / 255.0
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (patch_size, patch_size))
+    dark = cv2.erode(pixels.min(axis=2), kernel)
+
+    # Atmospheric light: the brightest input pixel among the 0.1% haziest ones
+    flat_dark = dark.reshape(-1)
+    count = max(1, flat_dark.size // 1000)
+    candidates = np.argpartition(flat_dark, -count)[-count:]
+    flat_pixels = pixels.reshape(-1, 3)
+    atmosphere = flat_pixels[candidates[flat_pixels[candidates].sum(axis=1).argmax()]]
+    atmosphere = np.maximum(atmosphere, 1e-3)
+
+    transmission = 1.0 - strength * cv2.erode((pixels / atmosphere).min(axis=2), kernel)
+    gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    transmission = _guided_filter(gray, transmission, radius=max(8, patch_size * 3), eps=1e-3)
+    transmission = np.maximum(transmission, min_transmission)[..., None]
+
+    result = (pixels - atmosphere) / transmission + atmosphere
+    return Image.fromarray(np.clip(result * 255.0 + 0.5, 0, 255).astype(np.uint8))
+
+def white_balance(image: Image.Image, method: str = "gray_world", percentile: float = 99.0) -> Image.Image:
+    """
+    Removes a color cast.
+
+    Args:
+        image (Image.Image): The input image.
+        method (str, optional): "gray_world" scales the channels to a common mean. "retinex"
+                                (white-patch Retinex) scales them so that the `percentile`
+                                brightest value of each becomes white. Defaults to "gray_world".
+        percentile (float, optional): Reference percentile of the "retinex" method. Defaults to 99.
+
+    Returns:
+        Image.Image: The balanced image.
+    """
+    pixels = pil_to_numpy(image)
+    if method == "gray_world":
+        means = pixels.reshape(-1, 3).mean(axis=0)
+        gains = means.mean() / np.maximum(means, 1e-3)
+    elif method == "retinex":
+        references = np.percentile(pixels.reshape(-1, 3), percentile, axis=0)
+        gains = 255.0 / np.maximum(references, 1.0)
+    else:
+        raise ValueError(f"Unsupported white balance method: {method}")
+    # One lookup table per channel instead of float math on every pixel
+    lut = np.clip(np.arange(256, dtype=np.float32)[:, None] * gains[None, :] + 0.5, 0, 255).astype(np.uint8)
+    channels = [cv2.LUT(pixels[..., c], lut[:, c]) for c in range(3)]
+    return Image.fromarray(cv2.merge(channels))
+
+def hdr(image: Image.Image, exposures: tuple = (-1.5, 0.0, 1.5)) -> Image.Image:
+    """
+    Single-image HDR look by exposure fusion (Mertens): synthetic under- and
+    over-exposed versions of the image are blended, keeping the well-exposed,
+    saturated and contrasted parts of each.
+
+    Args:
+        image (Image.Image): The input image.
+        exposures (tuple, optional): Exposure offsets in stops of the synthetic brackets.
+                                     Defaults to (-1.5, 0, 1.5).
+
+    Returns:
+        Image.Image: The fused image.
+    """
+    pixels = pil_to_numpy(image)
+    # Apply the exposure in linear light through a lookup table per bracket
+    levels = (np.arange(256, dtype=np.float32) / 255.0) ** 2.2
+    brackets = []
+    for stops in exposures:
+        lut = np.clip((levels * 2.0 ** stops) ** (1 / 2.2) * 255.0 + 0.5, 0, 255).astype(np.uint8)
+        brackets.append(cv2.LUT(pixels, lut))
+    fused = cv2.createMergeMertens().process(brackets)
+    return Image.fromarray(np.clip(fused * 255.0 + 0.5, 0, 255).astype(np.uint8))
+
+def correct_light(image: Image.Image, clip_limit: float = 2.0, grid_size: int = 8) -> Image.Image:
+    """
+    Evens out lighting with CLAHE (contrast-limited adaptive histogram equalization)
+    on the lightness channel, leaving colors untouched.
+
+    Args:
+        image (Image.Image): The input image.
+        clip_limit (float, optional): Contrast limit per tile; higher is stronger. Defaults to 2.0.
+        grid_size (int, optional): Tiles per side over which histograms are equalized. Defaults to 8.
+
+    Returns:
+        Image.Image: The corrected image.
+    """
+    lab = cv2.cvtColor(pil_to_numpy(image), cv2.COLOR_RGB2LAB)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(grid_size, grid_size))
+    lab[..., 0] = clahe.apply(np.ascontiguousarray(lab[..., 0]))
+    return Image.fromarray(cv2.cvtColor(lab, cv2.COLOR_LAB2RGB))
+
+# operation name -> implementation; the operations available in the "fast" tier
+FAST_OPERATIONS = {
+    "dehaze": dehaze,
+    "white_balance": white_balance,
+    "hdr": hdr,
+    "correct_light": correct_light,
+}
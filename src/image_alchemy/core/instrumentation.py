@@ -0,0 +1,350 @@
+# --- FILENAME: src/image_alchemy/core/instrumentation.py ---
+"""
+Tracing and metrics hooks for the stages of an ImageAlchemy request.
+
+The library reports nested spans (model loading, SAM encoding, control-image
+preprocessing, prompt encoding, diffusion and its individual denoising steps,
+inpaint preparation and compositing) and counters (model loads, offloads and
+evictions, cache hits and misses) through the active `Instrumentation`. The
+default one discards everything at the cost of a function call. Install a
+`Recorder` to collect them:
+
+    recorder = Recorder(exporters=[JsonLogExporter()])
+    set_instrumentation(recorder)
+    PrometheusExporter(recorder).serve(port=9464)
+
+Custom backends (e.g. OpenTelemetry) subclass `Instrumentation`.
+"""
+import contextvars
+import functools
+import itertools
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("image_alchemy_span", default=None)
+
+class Span:
+    """A timed, named stage with attributes. `parent_id` links it to the enclosing span."""
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start_time", "duration", "error")
+
+    def __init__(self, name: str, attributes: dict, trace_id: int, span_id: int, parent_id: int = None):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        """Adds attributes to the span, e.g. sizes only known once the stage has run."""
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class _NullSpan:
+    """Returned by the no-op instrumentation: a reusable context manager that does nothing."""
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Instrumentation:
+    """
+    The instrumentation interface. This base class is the default and records nothing.
+    """
+    enabled = False
+
+    def span(self, name: str, **attributes):
+        """Returns a context manager timing the stage `name`. Spans opened inside it become its children."""
+        return _NULL_SPAN
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Adds `value` to the counter `name`."""
+
+    def observe(self, name: str, value: float, **labels):
+        """Records one sample (e.g. a duration in seconds) of the histogram `name`."""
+
+    def step_callback(self, name: str = "diffusion.step"):
+        """Returns a diffusers `callback_on_step_end` timing each denoising step, or None."""
+        return None
+
+class _ActiveSpan:
+    __slots__ = ("recorder", "span", "token", "started")
+
+    def __init__(self, recorder: "Recorder", span: Span):
+        self.recorder = recorder
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        self.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.recorder._finish(self.span)
+        return False
+
+class _StepTimer:
+    """A diffusers step-end callback recording each denoising step as a child span."""
+    def __init__(self, recorder: "Recorder", name: str):
+        self.recorder = recorder
+        self.name = name
+        self.parent = _current_span.get()
+        self.last = time.perf_counter()
+
+    def __call__(self, pipeline, step: int, timestep, callback_kwargs: dict) -> dict:
+        now = time.perf_counter()
+        self.recorder.record_span(self.name, now - self.last, parent=self.parent, step=int(step))
+        self.last = now
+        return callback_kwargs
+
+class Recorder(Instrumentation):
+    """
+    Collects spans and counters in memory and forwards them to exporters.
+
+    Counters and span durations (as histograms, per span name) are aggregated
+    and available from `metrics()`. Every finished span and counter increment
+    is also handed to each exporter's `export_span` / `export_count`.
+    """
+    enabled = True
+
+    def __init__(self, exporters: List = (), buckets: tuple = DEFAULT_BUCKETS):
+        """
+        Args:
+            exporters (List, optional): Objects with `export_span(span)` and `export_count(name, value, labels)`.
+            buckets (tuple, optional): Histogram bucket bounds in seconds. Defaults to `DEFAULT_BUCKETS`.
+        """
+        self.exporters = list(exporters)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [count, sum, per-bucket counts]
+
+    def span(self, name: str, **attributes) -> _ActiveSpan:
+        parent = _current_span.get()
+        span_id = next(self._ids)
+        trace_id = parent.trace_id if parent is not None else span_id
+        return _ActiveSpan(self, Span(name, attributes, trace_id, span_id, parent.span_id if parent else None))
+
+    def record_span(self, name: str, duration: float, parent: Span = None, **attributes):
+        """Records an already finished span, e.g. one measured by a callback."""
+        parent = parent or _current_span.get()
+        span_id = next(self._ids)
+        span = Span(name, attributes, parent.trace_id if parent else span_id, span_id, parent.span_id if parent else None)
+        span.start_time -= duration
+        span.duration = duration
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        self.observe("span_seconds", span.duration, span=span.name)
+        if span.error is not None:
+            self.count("span_errors", span=span.name)
+        for exporter in self.exporters:
+            exporter.export_span(span)
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for exporter in self.exporters:
+            exporter.export_count(name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0, 0.0, [0] * len(self.buckets)]
+            histogram[0] += 1
+            histogram[1] += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[2][i] += 1
+
+    def step_callback(self, name: str = "diffusion.step") -> _StepTimer:
+        return _StepTimer(self, name)
+
+    def metrics(self) -> dict:
+        """Returns {"counters": {...}, "histograms": {...}} keyed by (name, sorted label pairs)."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {
+                    key: {"count": h[0], "sum": h[1], "buckets": dict(zip(self.buckets, h[2]))}
+                    for key, h in self._histograms.items()
+                },
+            }
+
+    def reset(self):
+        """Clears the aggregated metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+class JsonLogExporter:
+    """Writes every finished span (and optionally every counter increment) as one JSON line."""
+    def __init__(self, stream=None, include_counts: bool = True, min_duration: float = 0.0):
+        """
+        Args:
+            stream (optional): Text stream to write to. Defaults to sys.stderr.
+            include_counts (bool, optional): Also log counter increments (cache hits, model loads...). Defaults to True.
+            min_duration (float, optional): Skip spans shorter than this many seconds. Defaults to 0.
+        """
+        self.stream = stream
+        self.include_counts = include_counts
+        self.min_duration = min_duration
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            stream = self.stream or sys.stderr
+            stream.write(line + "\n")
+            stream.flush()
+
+    def export_span(self, span: Span):
+        if span.duration >= self.min_duration:
+            self._write({"type": "span", **span.as_dict()})
+
+    def export_count(self, name: str, value: float, labels: dict):
+        if self.include_counts:
+            self._write({"type": "count", "time": time.time(), "name": name, "value": value, "labels": labels})
+
+def _metric_name(name: str) -> str:
+    return "image_alchemy_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def _label_text(labels: tuple, extra: str = "") -> str:
+    parts = ['{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class PrometheusExporter:
+    """Renders a `Recorder`'s counters and histograms in the Prometheus text format, optionally over HTTP."""
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self._server = None
+
+    def render(self) -> str:
+        """Returns the current metrics as a Prometheus text exposition."""
+        metrics = self.recorder.metrics()
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(metrics["counters"].items()):
+            metric = _metric_name(name) + "_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_label_text(labels)} {value}")
+        for (name, labels), histogram in sorted(metrics["histograms"].items()):
+            metric = _metric_name(name)
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = list(histogram["buckets"].items()) + [("+Inf", histogram["count"])]
+            for bound, count in cumulative:
+                le = 'le="%s"' % bound
+                lines.append(f"{metric}_bucket{_label_text(labels, le)} {count}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {histogram['sum']}")
+            lines.append(f"{metric}_count{_label_text(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "0.0.0.0") -> "ThreadingHTTPServer":
+        """Serves `render()` at http://host:port/metrics from a daemon thread. Returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="prometheus-exporter", daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        """Stops the HTTP server started by `serve`."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+_instrumentation = Instrumentation()
+
+def set_instrumentation(instrumentation: Instrumentation = None) -> Instrumentation:
+    """Installs `instrumentation` process-wide (None restores the no-op default). Returns the previous one."""
+    global _instrumentation
+    previous = _instrumentation
+    _instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+    return previous
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+def span(name: str, **attributes):
+    """Opens a span on the active instrumentation."""
+    return _instrumentation.span(name, **attributes)
+
+def count(name: str, value: float = 1, **labels):
+    """Increments a counter on the active instrumentation."""
+    _instrumentation.count(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    """Records a histogram sample on the active instrumentation."""
+    _instrumentation.observe(name, value, **labels)
+
+def step_callback_kwargs() -> Dict[str, Callable]:
+    """Pipeline keyword arguments timing each denoising step; empty when instrumentation is off."""
+    callback = _instrumentation.step_callback()
+    return {} if callback is None else {"callback_on_step_end": callback}
+
+def traced(name: str):
+    """Decorator wrapping every call of a function in a span named `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _instrumentation.enabled:
+                return fn(*args, **kwargs)
+            with _instrumentation.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
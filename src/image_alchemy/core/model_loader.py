@@ -1,69 +1,301 @@
 # --- FILENAME: src/image_alchemy/core/model_loader.py ---
-import torch
-from diffusers import (
-    StableDiffusionControlNetPipeline,
-    StableDiffusionInpaintPipeline,
-    ControlNetModel,
-    AutoencoderKL,
-    UniPCMultistepScheduler
-)
-from segment_anything import sam_model_registry, SamPredictor
-import huggingface_hub
+import gc
+import inspect
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List
+
+from .cache import LRUCache
+from . import instrumentation, snapshot
+from ..utils.lazy import lazy_import
+
+# Imported on first use; diffusers, segment_anything and controlnet_aux are imported inside the getters
+torch = lazy_import("torch")
+
+DEFAULT_INPAINT_MODEL_ID = "stabilityai/stable-diffusion-2-inpainting"
+DEFAULT_BASE_MODEL_ID = "runwayml/stable-diffusion-v1-5"
+DEFAULT_SAM_CHECKPOINT = "sam_vit_h_4b8939.pth"
+
+def _iter_modules(model) -> list:
+    """
+    Returns the movable weight holders of a registered model.
+    Diffusers pipelines expose them through `components`, SamPredictor wraps its
+    network in `model`, and plain modules (or stand-ins with a `to` method) are their own holder.
+    """
+    components = getattr(model, "components", None)
+    if isinstance(components, dict):
+        return [c for c in components.values() if hasattr(c, "to")]
+    if not hasattr(model, "to") and hasattr(getattr(model, "model", None), "to"):
+        return [model.model]
+    if hasattr(model, "to"):
+        return [model]
+    return []
+
+def _module_nbytes(module) -> int:
+    """
+    Size of a module's parameters and buffers, or its `nbytes` attribute for stand-in models.
+    Wrappers that are not modules themselves (e.g. controlnet_aux annotators) are measured
+    through the modules they hold as attributes.
+    """
+    if hasattr(module, "parameters") and hasattr(module, "buffers"):
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if hasattr(module, "nbytes"):
+        return int(module.nbytes)
+    return sum(
+        _module_nbytes(value) for value in vars(module).values()
+        if hasattr(value, "parameters") and hasattr(value, "buffers")
+    )
+
+class _PendingLoad:
+    """A model load in progress that other threads can wait for."""
+    def __init__(self):
+        self.failed = False
+        self.error = None  # the exception the factory raised, if any
+        self._done = threading.Event()
+
+    def finish(self, failed: bool, error: BaseException = None):
+        self.failed = failed
+        self.error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
 
 class ModelLoader:
     """
     Handles the loading, caching, and management of all AI models.
     This class uses a lazy loading approach: a model is only loaded
     into memory when it's first requested.
+
+    Loaded models are kept in a registry ordered by last use. When a memory
+    budget is set, least-recently-used models are offloaded from the device to
+    CPU RAM and, under host memory pressure, evicted entirely (they are reloaded
+    from the on-disk cache on next use). Models pinned with `in_use` are never
+    offloaded or evicted.
     """
-    def __init__(self, device: str = 'cuda', cache_dir: str = None):
+    def __init__(
+        self,
+        device: str = 'cuda',
+        cache_dir: str = None,
+        sam_cache_bytes: int = 256 * 1024**2,
+        control_cache_bytes: int = 128 * 1024**2,
+        prompt_cache_entries: int = 256,
+        max_device_bytes: int = None,
+        max_host_bytes: int = None,
+        use_snapshots: bool = True
+    ):
+        """
+        Args:
+            device (str, optional): The device to load models on. Defaults to 'cuda'.
+            cache_dir (str, optional): The directory to cache downloaded models.
+            sam_cache_bytes (int, optional): Memory budget for cached SAM image embeddings.
+                                             Defaults to 256 MB (roughly 64 ViT-H embeddings).
+            control_cache_bytes (int, optional): Memory budget for cached ControlNet control images.
+                                                 Defaults to 128 MB.
+            prompt_cache_entries (int, optional): Maximum number of cached prompt embeddings. Defaults to 256.
+            max_device_bytes (int, optional): Budget for model weights on `device`. None means unbounded.
+            max_host_bytes (int, optional): Budget for model weights offloaded to CPU RAM
+                                            (or all weights when `device` is the CPU). None means unbounded.
+            use_snapshots (bool, optional): Load models from the fast snapshots written by `export_snapshots`
+                                            when present. Defaults to True.
+        """
         self.device = device
         self.cache_dir = cache_dir
-        self._models = {}
+        self.max_device_bytes = max_device_bytes
+        self.max_host_bytes = max_host_bytes
+        self.use_snapshots = use_snapshots
+        self.snapshot_dir = os.path.join(cache_dir or ".cache", "snapshots")
+        self._models = OrderedDict()  # key -> model, least recently used first
+        self._residency = {}          # key -> "device" or "cpu"
+        self._footprints = {}         # key -> {id(module): nbytes}
+        self._factories = {}          # key -> callable that (re)loads the model
+        self._pins = {}               # key -> number of active users
+        self._lock = threading.RLock()  # guards the registry; models are requested from several threads
+        self._loading = {}            # key -> _PendingLoad of an in-progress load
+        self._warmup = {}             # warmup target name -> Future of its load
+        self._stats = {"loads": 0, "reloads": 0, "hits": 0, "offloads": 0, "onloads": 0, "evictions": 0, "load_waits": 0,
+                       "snapshot_loads": 0}
+        self.sam_embedding_cache = LRUCache(max_bytes=sam_cache_bytes, name="sam_embeddings")
+        self.control_image_cache = LRUCache(max_bytes=control_cache_bytes, name="control_images")
+        self.prompt_embedding_cache = LRUCache(max_entries=prompt_cache_entries, name="prompt_embeddings")
+
+    def _get_or_load(self, key: str, factory: Callable, pins: Iterable[str] = ()):
+        """
+        Returns the registered model for `key`, loading it with `factory` if needed.
+        Offloaded models are moved back to the device and the budget is enforced afterwards.
+
+        `pins` are the registry keys of models the factory assembles the new model from.
+        They are pinned from the start of the load until the new model is registered,
+        so that loading one part cannot offload or evict another before they are joined.
+
+        The factory runs outside the registry lock, so different models load concurrently.
+        A caller asking for a model that another thread is already loading waits for
+        that load instead of starting a second one, and gets the loader's exception
+        if the factory raised one. If the model was evicted again before the waiter
+        got to it, the waiter loads it itself.
+        """
+        while True:
+            with self._lock:
+                if key in self._models:
+                    self._stats["hits"] += 1
+                    instrumentation.count("model.hits", model=key)
+                    if self._residency[key] != "device":
+                        self._move(key, self.device)
+                        self._residency[key] = "device"
+                        self._stats["onloads"] += 1
+                        instrumentation.count("model.onloads", model=key)
+                    self._models.move_to_end(key)
+                    self._enforce_budget(protect={key})
+                    return self._models[key]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = _PendingLoad()
+                    pins = list(pins)
+                    self._pin(pins)
+                    break
+                self._stats["load_waits"] += 1
+                instrumentation.count("model.load_waits", model=key)
+            loading.wait()
+            if loading.error is not None:
+                raise loading.error
+            if loading.failed:
+                return None
+
+        model = None
+        error = None
+        try:
+            with instrumentation.span("model.load", model=key):
+                model = factory()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                if model is not None:
+                    event = "reloads" if key in self._factories else "loads"
+                    self._stats[event] += 1
+                    instrumentation.count(f"model.{event}", model=key)
+                    self._models[key] = model
+                    self._residency[key] = "device"
+                    self._footprints[key] = {id(m): _module_nbytes(m) for m in _iter_modules(model)}
+                    self._factories[key] = factory
+                else:
+                    instrumentation.count("model.load_failures", model=key)
+                self._unpin(pins)
+                self._enforce_budget(protect={key})
+                del self._loading[key]
+                loading.finish(failed=model is None, error=error)
+        return model
+
+    def _snapshot_for(self, key: str) -> str:
+        """Path of the snapshot for a registry key, or None if snapshots are off or none was exported."""
+        if not self.use_snapshots:
+            return None
+        path = snapshot.snapshot_path(self.snapshot_dir, key)
+        if not snapshot.has_snapshot(path):
+            return None
+        return path
+
+    def _count_snapshot_load(self, key: str):
+        """Counts a model loaded from its snapshot; called once the load has returned."""
+        with self._lock:
+            self._stats["snapshot_loads"] += 1
+        instrumentation.count("model.snapshot_loads", model=key)
 
     def _load_model(self, model_name: str, model_class, **kwargs):
         """Generic model loader with caching."""
-        if model_name not in self._models:
-            print(f"Loading {model_name}...")
+        def factory():
+            snapshot_path = self._snapshot_for(model_name)
+            print(f"Loading {model_name}{' from snapshot' if snapshot_path else ''}...")
             try:
-                self._models[model_name] = model_class.from_pretrained(
+                if snapshot_path:
+                    model = model_class.from_pretrained(snapshot_path, **kwargs).to(self.device)
+                    self._count_snapshot_load(model_name)
+                    return model
+                return model_class.from_pretrained(
                     model_name, cache_dir=self.cache_dir, **kwargs
                 ).to(self.device)
             except Exception as e:
                 print(f"Failed to load {model_name}: {e}")
                 return None
-        return self._models[model_name]
-    
-    def get_sd_pipeline(self, model_id="stabilityai/stable-diffusion-2-inpainting"):
+        return self._get_or_load(model_name, factory)
+
+    def get_sd_pipeline(self, model_id=DEFAULT_INPAINT_MODEL_ID):
+        from diffusers import StableDiffusionInpaintPipeline
         return self._load_model(model_id, StableDiffusionInpaintPipeline, torch_dtype=torch.float16)
 
-    def get_controlnet_pipeline(self, base_model_id="runwayml/stable-diffusion-v1-5", controlnet_model_id="lllyasviel/control_v11p_sd15_inpaint"):
+    def get_shared_components(self, base_model_id=DEFAULT_BASE_MODEL_ID) -> dict:
+        """
+        Returns the UNet/VAE/text encoder/tokenizer (and friends) of a base model.
+        They are loaded once per base model and shared by every pipeline built on it.
+        """
+        key = f"{base_model_id}::components"
+
+        def factory():
+            from diffusers import StableDiffusionPipeline
+            snapshot_path = self._snapshot_for(key)
+            print(f"Loading shared components: {base_model_id}{' from snapshot' if snapshot_path else ''}")
+            pipeline = StableDiffusionPipeline.from_pretrained(
+                snapshot_path or base_model_id,
+                torch_dtype=torch.float16,
+                cache_dir=None if snapshot_path else self.cache_dir
+            ).to(self.device)
+            if snapshot_path:
+                self._count_snapshot_load(key)
+            return pipeline
+        base_pipeline = self._get_or_load(key, factory)
+        if base_pipeline is None:
+            raise RuntimeError(f"Failed to load the shared components of {base_model_id}")
+        return base_pipeline.components
+
+    def get_controlnet_pipeline(self, base_model_id=DEFAULT_BASE_MODEL_ID, controlnet_model_id="lllyasviel/control_v11p_sd15_inpaint"):
         pipeline_key = f"{base_model_id}+{controlnet_model_id}"
-        if pipeline_key not in self._models:
+        components_key = f"{base_model_id}::components"
+
+        def factory():
+            from diffusers import StableDiffusionControlNetImg2ImgPipeline, ControlNetModel, UniPCMultistepScheduler
             print(f"Loading ControlNet pipeline: {pipeline_key}")
             controlnet = self._load_model(controlnet_model_id, ControlNetModel, torch_dtype=torch.float16)
-            
-            pipeline = StableDiffusionControlNetPipeline.from_pretrained(
-                base_model_id,
+            components = self.get_shared_components(base_model_id)
+
+            # Only the ControlNet and the (stateful) scheduler are per-pipeline
+            accepted = inspect.signature(StableDiffusionControlNetImg2ImgPipeline.__init__).parameters
+            shared = {
+                name: component for name, component in components.items()
+                if name in accepted and name != "scheduler"
+            }
+            return StableDiffusionControlNetImg2ImgPipeline(
+                **shared,
                 controlnet=controlnet,
-                torch_dtype=torch.float16,
-                cache_dir=self.cache_dir
-            ).to(self.device)
-            pipeline.scheduler = UniPCMultistepScheduler.from_config(pipeline.scheduler.config)
-            self._models[pipeline_key] = pipeline
-        return self._models[pipeline_key]
-        
-    def get_sam_predictor(self, model_type="vit_h", checkpoint_name="sam_vit_h_4b8939.pth"):
+                scheduler=UniPCMultistepScheduler.from_config(components["scheduler"].config)
+            )
+        # Without the pins, loading the components under a tight budget could offload the ControlNet
+        return self._get_or_load(pipeline_key, factory, pins=(controlnet_model_id, components_key))
+
+    def get_sam_predictor(self, model_type="vit_h", checkpoint_name=DEFAULT_SAM_CHECKPOINT):
         predictor_key = f"sam_predictor_{model_type}"
-        if predictor_key not in self._models:
+
+        def factory():
+            snapshot_path = self._snapshot_for(predictor_key)
+            if snapshot_path:
+                print(f"Loading SAM model: {model_type} from snapshot")
+                predictor = snapshot.load_sam_snapshot(snapshot_path, model_type, self.device)
+                self._count_snapshot_load(predictor_key)
+                return predictor
+
+            from segment_anything import sam_model_registry, SamPredictor
             print(f"Loading SAM model: {model_type}")
             checkpoint_url = f"https://dl.fbaipublicfiles.com/segment_anything/{checkpoint_name}"
-            
+
             # Ensure cache directory exists
             sam_cache_dir = os.path.join(self.cache_dir or ".cache", "sam_models")
             os.makedirs(sam_cache_dir, exist_ok=True)
-            
+
             checkpoint_path = os.path.join(sam_cache_dir, checkpoint_name)
 
             if not os.path.exists(checkpoint_path):
@@ -71,17 +303,278 @@ class ModelLoader:
                 torch.hub.download_url_to_file(checkpoint_url, checkpoint_path)
 
             sam = sam_model_registry[model_type](checkpoint=checkpoint_path).to(self.device)
-            predictor = SamPredictor(sam)
-            self._models[predictor_key] = predictor
-        return self._models[predictor_key]
+            return SamPredictor(sam)
+        return self._get_or_load(predictor_key, factory)
+
+    def get_annotator(self, name: str):
+        """
+        Returns a ControlNet preprocessor ('canny' or 'hed').
+        Annotator weights are loaded once and kept in the model registry.
+        """
+        def factory():
+            from controlnet_aux import CannyDetector, HEDdetector
+            print(f"Loading annotator: {name}")
+            if name == "canny":
+                return CannyDetector()
+            if name == "hed":
+                return HEDdetector.from_pretrained('lllyasviel/Annotators', cache_dir=self.cache_dir).to(self.device)
+            raise ValueError(f"Unsupported annotator: {name}")
+        return self._get_or_load(f"annotator_{name}", factory)
+
+    def export_snapshots(self, keys: List[str] = None) -> List[str]:
+        """
+        Writes fast-load snapshots of loaded models under `<cache_dir>/snapshots`.
+        Later loads of these models (in any process using the same `cache_dir`)
+        memory-map the snapshot instead of rebuilding from the Hugging Face cache.
+
+        Base-model components, standalone diffusers models (inpainting pipelines,
+        ControlNets) and SAM predictors are snapshotted. ControlNet pipelines are not
+        stored themselves: they are assembled from their snapshotted parts, which keeps
+        the base model's weights shared between them. Annotators are skipped.
+
+        Args:
+            keys (List[str], optional): Registry keys to export. Defaults to every loaded model.
+
+        Returns:
+            List[str]: The snapshot directories written.
+        """
+        with self._lock:
+            keys = list(self._models) if keys is None else [key for key in keys if key in self._models]
+        written = []
+        for key in keys:
+            with self._lock:
+                model = self._models.get(key)
+            if model is None or key.startswith("annotator_") or "+" in key:
+                continue
+            path = snapshot.snapshot_path(self.snapshot_dir, key)
+            with self.in_use(key):
+                if key.startswith("sam_predictor_"):
+                    snapshot.save_sam_snapshot(model, path, key[len("sam_predictor_"):])
+                elif hasattr(model, "save_pretrained"):
+                    snapshot.save_pretrained_snapshot(model, path, key)
+                else:
+                    continue
+            print(f"Exported snapshot of {key} to {path}")
+            written.append(path)
+        return written
+
+    def _key_for(self, model) -> str:
+        for key, registered in self._models.items():
+            if registered is model:
+                return key
+        return None
+
+    @contextmanager
+    def in_use(self, *models):
+        """
+        Pins models (given as objects or registry keys) for the duration of a `with` block
+        so that loading other models cannot offload or evict them mid-inference.
+        """
+        with self._lock:
+            keys = [m if isinstance(m, str) else self._key_for(m) for m in models]
+            keys = [key for key in keys if key is not None]
+            self._pin(keys)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._unpin(keys)
+                self._enforce_budget()
+
+    def _pin(self, keys: Iterable[str]):
+        """Call with the lock held."""
+        for key in keys:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def _unpin(self, keys: Iterable[str]):
+        """Call with the lock held."""
+        for key in keys:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+
+    def _is_offloadable(self) -> bool:
+        return not str(self.device).startswith("cpu")
+
+    def _tier_bytes(self, tier: str) -> int:
+        """Bytes held by unique modules in a residency tier. Shared modules are counted once."""
+        device_modules = {}
+        for key, footprint in self._footprints.items():
+            if self._residency[key] == "device":
+                device_modules.update(footprint)
+        if tier == "device":
+            return sum(device_modules.values())
+        host_modules = {}
+        for key, footprint in self._footprints.items():
+            if self._residency[key] == "cpu":
+                host_modules.update(footprint)
+        host_bytes = sum(size for mid, size in host_modules.items() if mid not in device_modules)
+        if not self._is_offloadable():
+            host_bytes += sum(device_modules.values())
+        return host_bytes
+
+    def _evictable(self, protect: Iterable[str] = ()):
+        """Unpinned registry keys outside `protect`, in least-recently-used order."""
+        return [key for key in self._models if key not in protect and not self._pins.get(key)]
+
+    def _enforce_budget(self, protect: Iterable[str] = ()):
+        if self.max_device_bytes is not None and self._is_offloadable():
+            for key in self._evictable(protect):
+                if self._tier_bytes("device") <= self.max_device_bytes:
+                    break
+                if self._residency[key] == "device":
+                    self._offload(key)
+
+        host_budget = self.max_host_bytes
+        if not self._is_offloadable() and self.max_device_bytes is not None:
+            host_budget = self.max_device_bytes if host_budget is None else min(host_budget, self.max_device_bytes)
+        if host_budget is not None:
+            for key in self._evictable(protect):
+                if self._tier_bytes("host") <= host_budget:
+                    break
+                if self._residency[key] == "cpu" or not self._is_offloadable():
+                    self._evict(key)
+
+    def _move(self, key: str, device: str, skip_shared: bool = False):
+        """Moves a model's modules. With `skip_shared`, modules still used by device-resident models stay put."""
+        model = self._models[key]
+        shared = set()
+        if skip_shared:
+            for other, footprint in self._footprints.items():
+                if other != key and self._residency[other] == "device":
+                    shared.update(footprint)
+        for module in _iter_modules(model):
+            if id(module) not in shared:
+                module.to(device)
+        if hasattr(model, "reset_image"):
+            # SamPredictor keeps the last image embedding on the old device
+            model.reset_image()
+
+    def _offload(self, key: str):
+        print(f"Offloading {key} to CPU...")
+        self._move(key, "cpu", skip_shared=True)
+        self._residency[key] = "cpu"
+        self._stats["offloads"] += 1
+        instrumentation.count("model.offloads", model=key)
+        self._release_memory()
+
+    def _evict(self, key: str):
+        print(f"Evicting {key} from memory...")
+        del self._models[key]
+        del self._residency[key]
+        del self._footprints[key]
+        self._stats["evictions"] += 1
+        instrumentation.count("model.evictions", model=key)
+        self._release_memory()
+
+    def warmup(self, targets: Dict[str, Callable[["ModelLoader"], Any]], max_workers: int = 2) -> Dict[str, Future]:
+        """
+        Starts loading models in background threads and returns immediately.
+
+        Requests for a model that is still warming up wait for its load rather
+        than loading it a second time. Use `is_ready` / `wait_until_ready` to
+        check progress.
+
+        Args:
+            targets (Dict[str, Callable]): Name -> function that loads the model(s) through this loader.
+            max_workers (int, optional): Models loaded at the same time. Defaults to 2.
+
+        Returns:
+            Dict[str, Future]: One future per target, resolving to the loaded model.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-warmup")
+
+        def load(name, target):
+            start = time.perf_counter()
+            model = target(self)
+            if model is None:
+                raise RuntimeError(f"Warmup of {name!r} failed to load its model")
+            print(f"Warmed up {name} in {time.perf_counter() - start:.1f}s")
+            return model
+
+        futures = {name: executor.submit(load, name, target) for name, target in targets.items()}
+        executor.shutdown(wait=False)
+        with self._lock:
+            self._warmup.update(futures)
+        return futures
+
+    def warmup_status(self) -> Dict[str, str]:
+        """Returns "loading", "ready" or "failed: <reason>" for every warmup target."""
+        with self._lock:
+            warmup = dict(self._warmup)
+        status = {}
+        for name, future in warmup.items():
+            if not future.done():
+                status[name] = "loading"
+            elif future.exception() is not None:
+                status[name] = f"failed: {future.exception()}"
+            else:
+                status[name] = "ready"
+        return status
+
+    def is_ready(self, names: List[str] = None) -> bool:
+        """True once the given (default: all) warmup targets have finished loading, successfully or not."""
+        with self._lock:
+            futures = [f for name, f in self._warmup.items() if names is None or name in names]
+        return all(f.done() for f in futures)
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """
+        Blocks until every warmup target has finished loading.
+
+        Returns:
+            bool: True if all targets loaded successfully within `timeout`.
+        """
+        with self._lock:
+            futures = list(self._warmup.values())
+        done, not_done = wait(futures, timeout=timeout)
+        return not not_done and all(f.exception() is None for f in done)
+
+    def _release_memory(self):
+        gc.collect()
+        if 'cuda' in str(self.device) and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def memory_stats(self) -> dict:
+        """Returns the residency of every registered model and load/offload/eviction counters."""
+        with self._lock:
+            return {
+                "device": self.device,
+                "device_bytes": self._tier_bytes("device") if self._is_offloadable() else 0,
+                "host_bytes": self._tier_bytes("host"),
+                "max_device_bytes": self.max_device_bytes,
+                "max_host_bytes": self.max_host_bytes,
+                **self._stats,
+                "models": {
+                    key: {
+                        "residency": self._residency[key],
+                        "bytes": sum(self._footprints[key].values()),
+                        "pinned": bool(self._pins.get(key)),
+                    }
+                    for key in self._models
+                },
+            }
+
+    def cache_stats(self) -> dict:
+        """Returns hit/miss statistics for the caches owned by the loader."""
+        return {
+            "sam_embeddings": self.sam_embedding_cache.stats(),
+            "control_images": self.control_image_cache.stats(),
+            "prompt_embeddings": self.prompt_embedding_cache.stats(),
+        }
 
     def set_device(self, new_device: str):
         """Move all currently loaded models to a new device."""
-        self.device = new_device
-        for model_name, model in self._models.items():
-            if hasattr(model, 'to'):
+        with self._lock:
+            self.device = new_device
+            for model_name in self._models:
                 print(f"Moving {model_name} to {new_device}...")
-                model.to(new_device)
+                self._move(model_name, new_device)
+                self._residency[model_name] = "device"
+            # Cached embeddings live on the old device
+            self.sam_embedding_cache.clear()
+            self.prompt_embedding_cache.clear()
+            self._enforce_budget()
         # Clear VRAM on the old device if it was a GPU
         if 'cuda' in self.device and torch.cuda.is_available():
-            torch.cuda.empty_cache()
\ No newline at end of file
+            torch.cuda.empty_cache()
@@ -1,11 +1,137 @@
 # --- FILENAME: src/image_alchemy/core/pipelines.py ---
 import numpy as np
-import torch
-from PIL import Image
-from typing import List, Union
+from concurrent.futures import Executor
+from PIL import Image, ImageFilter
+from typing import Callable, List, Tuple, Union
 
+from . import instrumentation
+from .instrumentation import step_callback_kwargs
 from .model_loader import ModelLoader
-from ..utils.image_utils import pil_to_numpy, numpy_to_pil, create_mask_from_box
+from ..utils.image_utils import pil_to_numpy, numpy_to_pil, create_mask_from_box, image_content_hash
+from ..utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+torch = lazy_import("torch")
+
+DEFAULT_NEGATIVE_PROMPT = "low quality, blurry, ugly, deformed"
+# Size granularity of single-call inpainting. Batches that must reproduce single calls exactly use it too.
+INPAINT_BUCKET_STEP = 8
+
+def make_generators(seed: Union[int, List[int]], count: int) -> List["torch.Generator"]:
+    """
+    Returns `count` generators seeded `seed`, `seed + 1`, ..., or None when `seed` is None.
+    `seed` may also be a list with one seed per generator, where None draws a random seed.
+    The generators live on the CPU, so the initial noise (and with it the result) does not
+    depend on the device or on how images are grouped into batches.
+    """
+    if seed is None:
+        return None
+    seeds = list(seed) if isinstance(seed, (list, tuple)) else [seed + i for i in range(count)]
+    if all(s is None for s in seeds):
+        return None
+    generators = []
+    for s in seeds:
+        generator = torch.Generator(device="cpu")
+        if s is None:
+            generator.seed()
+        else:
+            generator.manual_seed(s)
+        generators.append(generator)
+    return generators
+
+def encode_prompt(model_loader: ModelLoader, pipeline, prompt: str, negative_prompt: str = None) -> Tuple["torch.Tensor", "torch.Tensor"]:
+    """
+    Encodes a prompt pair with the pipeline's text encoder, reusing cached embeddings when possible.
+
+    Embeddings are cached in `model_loader.prompt_embedding_cache` keyed by the text
+    encoder, the prompt and the negative prompt. Pipelines that share a text
+    encoder (see `ModelLoader.get_shared_components`) share cache entries too.
+
+    Args:
+        model_loader (ModelLoader): The model loader instance.
+        pipeline: A diffusers pipeline with a `text_encoder`.
+        prompt (str): The prompt.
+        negative_prompt (str, optional): The negative prompt. Defaults to None.
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]: `prompt_embeds` and `negative_prompt_embeds`.
+    """
+    text_encoder = pipeline.text_encoder
+    encoder_id = getattr(text_encoder.config, "_name_or_path", "") or str(id(text_encoder))
+    cache_key = (encoder_id, str(text_encoder.dtype), prompt, negative_prompt)
+
+    embeddings = model_loader.prompt_embedding_cache.get(cache_key)
+    if embeddings is None:
+        with instrumentation.span("prompt.encode"), torch.no_grad():
+            embeddings = pipeline.encode_prompt(
+                prompt,
+                device=pipeline.device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=True,
+                negative_prompt=negative_prompt
+            )
+        model_loader.prompt_embedding_cache.put(cache_key, embeddings)
+    return embeddings
+
+def prepare_sam_predictor(model_loader: ModelLoader, image: Image.Image, model_type: str = "vit_h"):
+    """
+    Returns a SAM predictor with `image` set, reusing a cached image embedding when possible.
+
+    The SAM image encoder dominates segmentation cost, so embeddings are cached in
+    `model_loader.sam_embedding_cache` keyed by the image content hash. A hit
+    skips the encoder entirely and only the (cheap) mask decoder runs afterwards.
+
+    Args:
+        model_loader (ModelLoader): The model loader instance.
+        image (Image.Image): The input image.
+        model_type (str, optional): The SAM backbone. Defaults to "vit_h".
+
+    Returns:
+        SamPredictor: A predictor ready for `predict` calls on `image`.
+    """
+    predictor = model_loader.get_sam_predictor(model_type=model_type)
+    cache_key = (model_type, image_content_hash(image))
+    cached = model_loader.sam_embedding_cache.get(cache_key)
+
+    if cached is not None:
+        features, original_size, input_size = cached
+        predictor.reset_image()
+        predictor.features = features
+        predictor.original_size = original_size
+        predictor.input_size = input_size
+        predictor.is_image_set = True
+    else:
+        with instrumentation.span("sam.encode", width=image.width, height=image.height):
+            predictor.set_image(pil_to_numpy(image))
+        model_loader.sam_embedding_cache.put(
+            cache_key, (predictor.features, predictor.original_size, predictor.input_size)
+        )
+    return predictor
+
+def get_control_image(model_loader: ModelLoader, image: Image.Image, annotator: str) -> Image.Image:
+    """
+    Computes the ControlNet control image for `image`, reusing a cached result when possible.
+
+    Control images are cached in `model_loader.control_image_cache` keyed by the
+    annotator and the image content hash, so parameter sweeps over one photo
+    pay for preprocessing once.
+
+    Args:
+        model_loader (ModelLoader): The model loader instance.
+        image (Image.Image): The input image.
+        annotator (str): The preprocessor to run ('canny' or 'hed').
+
+    Returns:
+        Image.Image: The control image.
+    """
+    cache_key = (annotator, image_content_hash(image))
+    control_image = model_loader.control_image_cache.get(cache_key)
+    if control_image is None:
+        preprocessor = model_loader.get_annotator(annotator)
+        with model_loader.in_use(preprocessor), instrumentation.span("control.preprocess", annotator=annotator):
+            control_image = preprocessor(image)
+        model_loader.control_image_cache.put(cache_key, control_image)
+    return control_image
 
 def run_sam_segmentation(
     model_loader: ModelLoader, 
@@ -25,38 +151,281 @@ def run_sam_segmentation(
     Returns:
         Image.Image: The generated binary mask as a PIL Image.
     """
-    predictor = model_loader.get_sam_predictor()
-    image_np = pil_to_numpy(image)
-    predictor.set_image(image_np)
-
     if input_box is None and input_points is None:
         raise ValueError("Either input_box or input_points must be provided for segmentation.")
 
-    box_np = np.array(input_box) if input_box else None
-    
-    masks, scores, _ = predictor.predict(
-        box=box_np,
-        multimask_output=False # Get the most likely mask
+    masks, _ = run_sam_segmentation_batch(
+        model_loader,
+        image,
+        input_boxes=[input_box] if input_box is not None else None,
+        input_points=[input_points] if input_points is not None else None
     )
-    
-    # Convert single mask (H, W) to (H, W, 1) and then to PIL
-    mask = masks[0] 
-    mask_pil = Image.fromarray(mask)
-    return mask_pil
+    return masks[0]
+
+def run_sam_segmentation_batch(
+    model_loader: ModelLoader,
+    image: Image.Image,
+    input_boxes: List[List[int]] = None,
+    input_points: List[List] = None,
+    multimask_output: bool = False
+) -> Tuple[List[Image.Image], np.ndarray]:
+    """
+    Segments several objects on one image with a single batched pass of the SAM mask decoder.
+
+    Prompt i is made of `input_boxes[i]` and/or `input_points[i]`. Point sets of
+    different lengths are padded with SAM's "not a point" label (-1), so they can
+    share one decoder call.
+
+    Args:
+        model_loader (ModelLoader): The model loader instance.
+        image (Image.Image): The input image.
+        input_boxes (List[List[int]], optional): Bounding boxes [[x1, y1, x2, y2], ...]. Defaults to None.
+        input_points (List[List], optional): One point set per prompt, each [[x, y, label], ...]. Defaults to None.
+        multimask_output (bool, optional): Let SAM propose three masks per prompt and keep
+                                           the highest scoring one. Defaults to False.
+
+    Returns:
+        Tuple[List[Image.Image], np.ndarray]: One binary mask per prompt and their predicted IoU scores.
+    """
+    if not input_boxes and not input_points:
+        raise ValueError("Either input_boxes or input_points must be provided for segmentation.")
+    if input_boxes and input_points and len(input_boxes) != len(input_points):
+        raise ValueError("input_boxes and input_points must describe the same number of prompts.")
+
+    predictor = prepare_sam_predictor(model_loader, image)
+    device = predictor.device
+
+    boxes_torch = None
+    if input_boxes:
+        boxes = torch.as_tensor(np.array(input_boxes, dtype=np.float32), device=device)
+        boxes_torch = predictor.transform.apply_boxes_torch(boxes, predictor.original_size)
+
+    coords_torch, labels_torch = None, None
+    if input_points:
+        max_points = max(len(points) for points in input_points)
+        coords = np.zeros((len(input_points), max_points, 2), dtype=np.float32)
+        labels = np.full((len(input_points), max_points), -1, dtype=np.int64)
+        for i, points in enumerate(input_points):
+            points_np = np.array(points, dtype=np.float32).reshape(-1, 3)
+            coords[i, :len(points_np)] = points_np[:, :2]
+            labels[i, :len(points_np)] = points_np[:, 2]
+        coords_torch = predictor.transform.apply_coords_torch(
+            torch.as_tensor(coords, device=device), predictor.original_size
+        )
+        labels_torch = torch.as_tensor(labels, device=device)
+
+    prompts = len(input_boxes or input_points)
+    with model_loader.in_use(predictor), instrumentation.span("sam.decode", prompts=prompts), torch.inference_mode():
+        masks, scores, _ = predictor.predict_torch(
+            point_coords=coords_torch,
+            point_labels=labels_torch,
+            boxes=boxes_torch,
+            multimask_output=multimask_output
+        )
+
+    # masks: (num_prompts, num_candidates, H, W); keep the best candidate per prompt
+    best = scores.argmax(dim=1)
+    index = torch.arange(masks.shape[0], device=masks.device)
+    masks_np = masks[index, best].cpu().numpy()
+    scores_np = scores[index, best].float().cpu().numpy()
+
+    return [Image.fromarray(mask) for mask in masks_np], scores_np
+
+def _tile_starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Start offsets of overlapping tiles covering [0, length). The last tile is aligned to the end."""
+    if length <= tile:
+        return [0]
+    stride = max(tile - overlap, 1)
+    return list(range(0, length - tile, stride)) + [length - tile]
+
+def _tile_weights(length: int, starts: List[int], tile: int, overlap: int) -> List[np.ndarray]:
+    """
+    1-D blending weights for each tile along one axis.
+    Weights ramp linearly across overlaps and are normalised to sum to one at every
+    position, so the separable 2-D product of both axes is a partition of unity.
+    """
+    weights = []
+    for start in starts:
+        size = min(tile, length - start)
+        w = np.ones(size, dtype=np.float32)
+        ramp_len = min(overlap, size)
+        if ramp_len > 0:
+            ramp = np.linspace(1.0 / (ramp_len + 1), 1.0, ramp_len, dtype=np.float32)
+            if start > 0:
+                w[:ramp_len] = np.minimum(w[:ramp_len], ramp)
+            if start + size < length:
+                w[-ramp_len:] = np.minimum(w[-ramp_len:], ramp[::-1])
+        weights.append(w)
+
+    total = np.zeros(length, dtype=np.float32)
+    for start, w in zip(starts, weights):
+        total[start:start + len(w)] += w
+    return [w / total[start:start + len(w)] for start, w in zip(starts, weights)]
+
+def run_tiled_img2img(
+    pipeline,
+    image: Image.Image,
+    control_fn: Callable[[Image.Image], Image.Image],
+    prompt_embeds: "torch.Tensor",
+    negative_prompt_embeds: "torch.Tensor",
+    tile_size: int = 512,
+    tile_overlap: int = 64,
+    batch_size: int = 1,
+    seed: int = None,
+    **pipeline_kwargs
+) -> Image.Image:
+    """
+    Runs a ControlNet img2img pipeline over overlapping tiles and blends the seams.
+
+    Tiles are processed row by row at the model's native resolution and the
+    finished rows are written straight into the output, so peak memory is bounded
+    by the tile size (one row of tiles for the blending buffer) rather than the image size.
+
+    Args:
+        pipeline: A ControlNet img2img pipeline.
+        image (Image.Image): The input image.
+        control_fn (Callable): Computes the control image for one tile.
+        prompt_embeds (torch.Tensor): Prompt embeddings for a single image.
+        negative_prompt_embeds (torch.Tensor): Negative prompt embeddings for a single image.
+        tile_size (int, optional): Tile edge in pixels, a multiple of 8. Defaults to 512.
+        tile_overlap (int, optional): Overlap between neighbouring tiles in pixels. Defaults to 64.
+        batch_size (int, optional): Number of tiles of a row diffused per pipeline call. Defaults to 1.
+        seed (int, optional): Seed for the initial noise. Tile i is seeded `seed + i`, so the
+                              result does not depend on `batch_size`. Defaults to None (random).
+        **pipeline_kwargs: Extra arguments for the pipeline (strength, steps, ...).
+
+    Returns:
+        Image.Image: The processed image, the same size as the input.
+    """
+    image = image.convert("RGB")
+    width, height = image.size
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    xs = _tile_starts(width, tile_w, tile_overlap)
+    ys = _tile_starts(height, tile_h, tile_overlap)
+    x_weights = _tile_weights(width, xs, tile_w, tile_overlap)
+    y_weights = _tile_weights(height, ys, tile_h, tile_overlap)
+
+    generators = make_generators(seed, len(xs) * len(ys))
+    output = np.empty((height, width, 3), dtype=np.uint8)
+    band, band_y = None, 0
+    for row, (y, wy) in enumerate(zip(ys, y_weights)):
+        # Rows above the new band are final once no later tile can reach them
+        new_band = np.zeros((tile_h, width, 3), dtype=np.float32)
+        if band is not None:
+            carried = band_y + tile_h - y
+            if carried > 0:
+                new_band[:carried] = band[y - band_y:]
+            output[band_y:y] = np.clip(np.rint(band[:y - band_y]), 0, 255).astype(np.uint8)
+        band, band_y = new_band, y
+
+        for i in range(0, len(xs), batch_size):
+            batch_xs = xs[i:i + batch_size]
+            batch_wx = x_weights[i:i + batch_size]
+            tiles = [image.crop((x, y, x + tile_w, y + tile_h)) for x in batch_xs]
+            n = len(tiles)
+            control_images = [control_fn(tile) for tile in tiles]
+            with instrumentation.span("diffusion", batch=n, width=tile_w, height=tile_h, tiled=True):
+                results = pipeline(
+                    prompt_embeds=prompt_embeds.repeat(n, 1, 1),
+                    negative_prompt_embeds=negative_prompt_embeds.repeat(n, 1, 1),
+                    image=tiles,
+                    control_image=control_images,
+                    height=tile_h // 8 * 8,
+                    width=tile_w // 8 * 8,
+                    generator=generators[row * len(xs) + i:row * len(xs) + i + n] if generators else None,
+                    **pipeline_kwargs,
+                    **step_callback_kwargs()
+                ).images
+            with instrumentation.span("tile.blend", batch=n):
+                for x, wx, result in zip(batch_xs, batch_wx, results):
+                    if result.size != (tile_w, tile_h):
+                        result = result.resize((tile_w, tile_h), Image.LANCZOS)
+                    weight = wy[:, None, None] * wx[None, :, None]
+                    band[:, x:x + tile_w] += np.asarray(result, dtype=np.float32) * weight
+
+    output[band_y:] = np.clip(np.rint(band[:height - band_y]), 0, 255).astype(np.uint8)
+    return Image.fromarray(output)
+
+def _native_resolution(pipeline, default: int = 512) -> int:
+    """The edge length the pipeline's UNet was trained at."""
+    try:
+        return pipeline.unet.config.sample_size * pipeline.vae_scale_factor
+    except AttributeError:
+        return default
+
+def _fit_to_area(size: tuple, edge: int, step: int = 8) -> tuple:
+    """Scales `size` to roughly edge x edge pixels, keeping the aspect ratio and multiples of `step`."""
+    w, h = size
+    scale = (edge * edge / float(w * h)) ** 0.5
+    return max(step, int(round(w * scale / step)) * step), max(step, int(round(h * scale / step)) * step)
+
+def _mask_region(mask: Image.Image, context_margin: int) -> tuple:
+    """Bounding box of the mask grown by `context_margin`, clamped to the image. None for an empty mask."""
+    bbox = mask.point(lambda p: 255 if p > 0 else 0).getbbox()
+    if bbox is None:
+        return None
+    x1, y1, x2, y2 = bbox
+    w, h = mask.size
+    return (max(0, x1 - context_margin), max(0, y1 - context_margin), min(w, x2 + context_margin), min(h, y2 + context_margin))
+
+def _prepare_inpaint(image: Image.Image, mask: Image.Image, region: str, context_margin: int) -> tuple:
+    """
+    Normalises an (image, mask) pair and picks the region to diffuse.
+
+    Returns:
+        tuple: (image, mask, box), or (image, None, None) when the mask is empty.
+    """
+    if region not in ("full", "crop", "auto"):
+        raise ValueError(f"Unsupported region mode: {region}")
+
+    # Ensure image and mask have the same size and mode
+    image = image.convert("RGB")
+    mask = mask.convert("L")
+    if mask.size != image.size:
+        mask = mask.resize(image.size, Image.NEAREST)
+
+    box = (0, 0) + image.size
+    if region != "full":
+        crop_box = _mask_region(mask, context_margin)
+        if crop_box is None:
+            return image, None, None
+        crop_area = (crop_box[2] - crop_box[0]) * (crop_box[3] - crop_box[1])
+        if region == "crop" or crop_area < 0.5 * image.width * image.height:
+            box = crop_box
+    return image, mask, box
+
+def _composite_inpaint(image: Image.Image, mask: Image.Image, box: tuple, result: Image.Image, feather_radius: int) -> Image.Image:
+    """Pastes the generated pixels back; everything outside the (feathered) mask stays untouched."""
+    image_region = image.crop(box)
+    mask_region = mask.crop(box)
+    result_region = result.resize(image_region.size, Image.LANCZOS)
+    alpha = mask_region.filter(ImageFilter.GaussianBlur(feather_radius)) if feather_radius else mask_region
+    output = image.copy()
+    output.paste(Image.composite(result_region, image_region, alpha), box[:2])
+    return output
 
 def run_inpaint_pipeline(
     model_loader: ModelLoader,
     image: Image.Image,
     mask: Image.Image,
     prompt: str,
-    negative_prompt: str = "low quality, blurry, ugly, deformed",
+    negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
     strength: float = 1.0,
     guidance_scale: float = 7.5,
-    num_inference_steps: int = 30
+    num_inference_steps: int = 30,
+    region: str = "full",
+    context_margin: int = 64,
+    feather_radius: int = 8,
+    seed: int = None
 ) -> Image.Image:
     """
     Runs a generic inpainting pipeline.
 
+    In "crop" region mode only the mask's bounding box plus `context_margin` is
+    diffused, at the model's native resolution, and the result is composited back
+    into the full-resolution original with a feathered mask. "auto" picks "crop"
+    when that region covers less than half of the image.
+
     Args:
         model_loader (ModelLoader): The model loader instance.
         image (Image.Image): The source image.
@@ -66,34 +435,201 @@ def run_inpaint_pipeline(
         strength (float, optional): Denoising strength. Defaults to 1.0.
         guidance_scale (float, optional): CFG scale. Defaults to 7.5.
         num_inference_steps (int, optional): Number of diffusion steps. Defaults to 30.
+        region (str, optional): "full", "crop" or "auto". Defaults to "full".
+        context_margin (int, optional): Context pixels kept around the mask in crop mode. Defaults to 64.
+        feather_radius (int, optional): Blur radius of the compositing mask. Defaults to 8.
+        seed (int, optional): Seed for the initial noise. Defaults to None (random).
 
     Returns:
-        Image.Image: The inpainted image.
+        Image.Image: The inpainted image, at the resolution of `image`.
     """
-    # Using a standard SD inpainting model for robustness
-    pipeline = model_loader.get_sd_pipeline()
-    
-    # Ensure image and mask have the same size and mode
-    image = image.convert("RGB").resize(mask.size)
-
-    result_image = pipeline(
-        prompt=prompt,
-        image=image,
-        mask_image=mask,
+    return run_inpaint_batch(
+        model_loader,
+        [(image, mask, prompt)],
         negative_prompt=negative_prompt,
         strength=strength,
         guidance_scale=guidance_scale,
         num_inference_steps=num_inference_steps,
-    ).images[0]
+        batch_size=1,
+        bucket_step=INPAINT_BUCKET_STEP,
+        region=region,
+        context_margin=context_margin,
+        feather_radius=feather_radius,
+        seed=seed
+    )[0]
 
-    return result_image
+def run_inpaint_batch(
+    model_loader: ModelLoader,
+    items: List[Tuple[Image.Image, Image.Image, str]],
+    negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+    strength: float = 1.0,
+    guidance_scale: float = 7.5,
+    num_inference_steps: int = 30,
+    batch_size: int = 4,
+    bucket_step: int = 64,
+    region: str = "full",
+    context_margin: int = 64,
+    feather_radius: int = 8,
+    seed: Union[int, List[int]] = None
+) -> List[Image.Image]:
+    """
+    Inpaints many (image, mask, prompt) items with batched pipeline calls.
+
+    Each item's diffusion region is scaled to the model's native area and snapped
+    to multiples of `bucket_step`; items landing in the same resolution bucket are
+    diffused together, up to `batch_size` per call. Results are composited back at
+    each item's original resolution and returned in input order.
+
+    Args:
+        model_loader (ModelLoader): The model loader instance.
+        items (List[Tuple[Image.Image, Image.Image, str]]): (image, mask, prompt) triples.
+        negative_prompt (str, optional): The negative prompt shared by all items. Defaults to "low quality...".
+        strength (float, optional): Denoising strength. Defaults to 1.0.
+        guidance_scale (float, optional): CFG scale. Defaults to 7.5.
+        num_inference_steps (int, optional): Number of diffusion steps. Defaults to 30.
+        batch_size (int, optional): Maximum items per pipeline call. Defaults to 4.
+        bucket_step (int, optional): Resolution granularity of the buckets. Coarser steps give
+                                     fewer, fuller buckets at a small cost in aspect ratio. Defaults to 64.
+        region (str, optional): "full", "crop" or "auto", see `run_inpaint_pipeline`. Defaults to "full".
+        context_margin (int, optional): Context pixels kept around the mask in crop mode. Defaults to 64.
+        feather_radius (int, optional): Blur radius of the compositing mask. Defaults to 8.
+        seed (Union[int, List[int]], optional): Seed for the initial noise. Item i is seeded `seed + i`,
+                                                so each result does not depend on how items are batched.
+                                                A list gives one seed per item. Defaults to None (random).
+
+    Returns:
+        List[Image.Image]: The inpainted images, in input order.
+    """
+    # Using a standard SD inpainting model for robustness
+    pipeline = model_loader.get_sd_pipeline()
+    edge = _native_resolution(pipeline)
+
+    with instrumentation.span("inpaint.prepare", items=len(items)):
+        prepared = [_prepare_inpaint(image, mask, region, context_margin) for image, mask, _ in items]
+    generators = make_generators(seed, len(items))
+    results = [None] * len(items)
+    buckets = {}
+    for index, (image, mask, box) in enumerate(prepared):
+        if mask is None:
+            results[index] = image.copy()
+            continue
+        size = _fit_to_area((box[2] - box[0], box[3] - box[1]), edge, bucket_step)
+        buckets.setdefault(size, []).append(index)
+
+    with model_loader.in_use(pipeline):
+        for (width, height), indices in buckets.items():
+            for i in range(0, len(indices), batch_size):
+                chunk = indices[i:i + batch_size]
+                embeddings = [encode_prompt(model_loader, pipeline, items[index][2], negative_prompt) for index in chunk]
+                with instrumentation.span("inpaint.resize", batch=len(chunk)):
+                    chunk_images = [prepared[index][0].crop(prepared[index][2]).resize((width, height), Image.LANCZOS) for index in chunk]
+                    chunk_masks = [prepared[index][1].crop(prepared[index][2]).resize((width, height), Image.NEAREST) for index in chunk]
+                with instrumentation.span("diffusion", batch=len(chunk), width=width, height=height):
+                    images = pipeline(
+                        prompt_embeds=torch.cat([e[0] for e in embeddings]),
+                        negative_prompt_embeds=torch.cat([e[1] for e in embeddings]),
+                        image=chunk_images,
+                        mask_image=chunk_masks,
+                        height=height,
+                        width=width,
+                        strength=strength,
+                        guidance_scale=guidance_scale,
+                        num_inference_steps=num_inference_steps,
+                        generator=[generators[index] for index in chunk] if generators else None,
+                        **step_callback_kwargs()
+                    ).images
+                with instrumentation.span("inpaint.composite", batch=len(chunk)):
+                    for index, result in zip(chunk, images):
+                        image, mask, box = prepared[index]
+                        results[index] = _composite_inpaint(image, mask, box, result, feather_radius)
+
+    return results
+
+def _zoom_canvas_geometry(size: tuple, zoom_factor: float) -> tuple:
+    """Canvas size and paste offset of the previous frame for one zoom-out step."""
+    w, h = size
+    new_w, new_h = int(w * zoom_factor), int(h * zoom_factor)
+    return new_w, new_h, (new_w - w) // 2, (new_h - h) // 2
+
+def _interpolate_zoom_frame(previous: np.ndarray, keyframe: np.ndarray, alpha: np.ndarray, geometry: tuple, t: float) -> np.ndarray:
+    """
+    Renders the view at fraction `t` of the way from `previous` to `keyframe`.
+
+    `keyframe` is the outpainted canvas (downscaled to the frame size) that contains
+    `previous` at its centre. The view box shrinks geometrically from the full
+    keyframe (t=1) to the region covered by `previous` (t=0); inside that region
+    the sharper `previous` frame is blended over the upscaled keyframe.
+    """
+    h, w = previous.shape[:2]
+    new_w, new_h, paste_x, paste_y = geometry
+    sx, sy = w / new_w, h / new_h
+    # View box size relative to the keyframe, and its origin moving linearly with the size
+    scale_x, scale_y = sx ** (1.0 - t), sy ** (1.0 - t)
+    lam_x = (scale_x - sx) / (1.0 - sx) if sx < 1.0 else 1.0
+    lam_y = (scale_y - sy) / (1.0 - sy) if sy < 1.0 else 1.0
+    origin_x, origin_y = paste_x * sx * (1.0 - lam_x), paste_y * sy * (1.0 - lam_y)
+
+    keyframe_to_view = np.float32([[1.0 / scale_x, 0, -origin_x / scale_x], [0, 1.0 / scale_y, -origin_y / scale_y]])
+    previous_to_view = np.float32([
+        [sx / scale_x, 0, (paste_x * sx - origin_x) / scale_x],
+        [0, sy / scale_y, (paste_y * sy - origin_y) / scale_y],
+    ])
+    base = cv2.warpAffine(keyframe, keyframe_to_view, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+    inner = cv2.warpAffine(previous, previous_to_view, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+    weight = cv2.warpAffine(alpha, previous_to_view, (w, h), flags=cv2.INTER_LINEAR, borderValue=0)[..., None]
+    return (base * (1.0 - weight) + inner * weight + 0.5).astype(np.uint8)
+
+def interpolate_zoom_frames(
+    previous: Image.Image,
+    keyframe: Image.Image,
+    zoom_factor: float,
+    num_frames: int,
+    executor: Executor = None,
+    feather: int = 4
+) -> List[Image.Image]:
+    """
+    Synthesizes the frames between two consecutive zoom keyframes without diffusion.
+
+    Frames are geometric crop-and-resample views of `keyframe` with `previous`
+    blended in where it is visible, evenly spaced in log-scale so the apparent
+    zoom speed is constant.
+
+    Args:
+        previous (Image.Image): The earlier keyframe.
+        keyframe (Image.Image): The next keyframe, produced by `generative_zoom_step(previous, zoom_factor, output_size=previous.size)`.
+        zoom_factor (float): The zoom factor used to produce `keyframe`.
+        num_frames (int): Number of intermediate frames to synthesize.
+        executor (Executor, optional): Pool to render frames in parallel. OpenCV releases
+                                       the GIL, so a thread pool scales across CPU cores. Defaults to None.
+        feather (int, optional): Width in pixels of the blend between the two keyframes. Defaults to 4.
+
+    Returns:
+        List[Image.Image]: The intermediate frames, in playback order.
+    """
+    previous_np = np.asarray(previous.convert("RGB"), dtype=np.float32)
+    keyframe_np = np.asarray(keyframe.convert("RGB").resize(previous.size, Image.LANCZOS), dtype=np.float32)
+    geometry = _zoom_canvas_geometry(previous.size, zoom_factor)
+
+    # Alpha of `previous` with a soft edge so the seam between keyframes is not visible
+    h, w = previous_np.shape[:2]
+    ramp_x = np.clip(np.minimum(np.arange(w), np.arange(w)[::-1]) / max(feather, 1), 0, 1)
+    ramp_y = np.clip(np.minimum(np.arange(h), np.arange(h)[::-1]) / max(feather, 1), 0, 1)
+    alpha = (ramp_y[:, None] * ramp_x[None, :]).astype(np.float32)
+
+    ts = [(i + 1) / (num_frames + 1) for i in range(num_frames)]
+    render = lambda t: Image.fromarray(_interpolate_zoom_frame(previous_np, keyframe_np, alpha, geometry, t))
+    if executor is None:
+        return [render(t) for t in ts]
+    return list(executor.map(render, ts))
 
 def generative_zoom_step(
     model_loader: ModelLoader,
     image: Image.Image,
     prompt: str,
     zoom_factor: float = 1.25,
-    steps: int = 25
+    steps: int = 25,
+    output_size: tuple = None,
+    seed: int = None
 ) -> Image.Image:
     """
     Performs one step of a generative zoom (outpainting).
@@ -105,23 +641,26 @@ def generative_zoom_step(
         prompt (str): The prompt for the scene.
         zoom_factor (float, optional): How much to zoom out. Defaults to 1.25.
         steps (int, optional): Inference steps. Defaults to 25.
+        output_size (tuple, optional): (width, height) to downscale the outpainted canvas to,
+                                       which keeps the working resolution fixed across steps.
+                                       Defaults to None (the canvas grows by `zoom_factor`).
+        seed (int, optional): Seed for the initial noise. Defaults to None (random).
 
     Returns:
         Image.Image: The next frame in the zoom sequence.
     """
     w, h = image.size
-    new_w, new_h = int(w * zoom_factor), int(h * zoom_factor)
-    
-    # Create a larger canvas and paste the current image in the center
-    canvas = Image.new("RGB", (new_w, new_h))
-    paste_x = (new_w - w) // 2
-    paste_y = (new_h - h) // 2
-    canvas.paste(image, (paste_x, paste_y))
-    
-    # Create a mask for the area to be outpainted
-    mask = Image.new("L", (new_w, new_h), 255)
-    mask_paste = Image.new("L", (w,h), 0)
-    mask.paste(mask_paste, (paste_x, paste_y))
+    new_w, new_h, paste_x, paste_y = _zoom_canvas_geometry(image.size, zoom_factor)
+
+    with instrumentation.span("zoom.canvas", width=new_w, height=new_h):
+        # Create a larger canvas and paste the current image in the center
+        canvas = Image.new("RGB", (new_w, new_h))
+        canvas.paste(image, (paste_x, paste_y))
+
+        # Create a mask for the area to be outpainted
+        mask = Image.new("L", (new_w, new_h), 255)
+        mask_paste = Image.new("L", (w,h), 0)
+        mask.paste(mask_paste, (paste_x, paste_y))
     
     # Use the inpainting pipeline to "outpaint" the new areas
     outpainted_image = run_inpaint_pipeline(
@@ -129,7 +668,10 @@ def generative_zoom_step(
         image=canvas,
         mask=mask,
         prompt=prompt,
-        num_inference_steps=steps
+        num_inference_steps=steps,
+        seed=seed
     )
-    
+
+    if output_size is not None and outpainted_image.size != tuple(output_size):
+        outpainted_image = outpainted_image.resize(tuple(output_size), Image.LANCZOS)
     return outpainted_image
\ No newline at end of file
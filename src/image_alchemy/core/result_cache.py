@@ -0,0 +1,246 @@
+# --- FILENAME: src/image_alchemy/core/result_cache.py ---
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Sequence
+
+from PIL import Image
+
+from . import instrumentation
+from ..utils.image_utils import image_content_hash
+
+# Bump when a change to the library alters the output for identical inputs
+RESULT_CACHE_VERSION = 1
+
+def _canonical(value: Any) -> Any:
+    """
+    Converts an operation argument into a JSON-serialisable value that identifies it.
+    Images are replaced by their content hash.
+    """
+    if isinstance(value, Image.Image):
+        return {"image": image_content_hash(value)}
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if hasattr(value, "tolist"):  # np.ndarray / np scalars
+        return _canonical(value.tolist())
+    raise TypeError(f"Cannot build a result cache key from a {type(value).__name__}")
+
+class ResultCache:
+    """
+    A content-addressed, size-capped cache of operation results on local disk.
+
+    Results are stored as PNG files named after the hash of everything that
+    determines them (input image content, operation, parameters, model ids and
+    seed). Files are written to a temporary name and atomically renamed into
+    place, so several processes can share one directory: readers only ever see
+    complete files, and concurrent writers of the same key write identical bytes.
+    Every hit refreshes the file's modification time, and the least recently used
+    files are deleted once the directory grows beyond `max_bytes`.
+    """
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024**3):
+        """
+        Args:
+            directory (str): Directory holding the cached results. Created if missing.
+            max_bytes (int, optional): Size cap of the directory. Defaults to 2 GB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._approx_bytes = self._scan_bytes()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, operation: str, params: dict, models: Sequence[str] = ()) -> str:
+        """
+        Returns the key for a result.
+
+        Raises:
+            TypeError: If a parameter has no stable representation.
+        """
+        payload = json.dumps(
+            {
+                "version": RESULT_CACHE_VERSION,
+                "operation": operation,
+                "params": _canonical(params),
+                "models": list(models),
+            },
+            sort_keys=True,
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".png")
+
+    def get(self, key: str) -> Image.Image:
+        """Returns the cached result for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            instrumentation.count("result_cache.misses")
+            return None
+        try:
+            os.utime(path)
+        except OSError:  # evicted by another process since it was read; the data is still good
+            pass
+        with self._lock:
+            self.hits += 1
+        instrumentation.count("result_cache.hits")
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def put(self, key: str, image: Image.Image):
+        """Stores a result, then evicts least recently used results beyond the size cap."""
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", compress_level=1)
+        data = buffer.getvalue()
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._approx_bytes += len(data)
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _entries(self) -> list:
+        """(mtime, size, path) of every cached result."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """
+        Deletes the least recently used results until the directory is 10% below the cap.
+        The in-process size estimate is resynchronised from disk, since other processes
+        may have added or removed files.
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._approx_bytes = total
+
+    def clear(self):
+        """Deletes every cached result. Counters are kept."""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._approx_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss/eviction counters and the approximate size on disk."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": "results",
+                "directory": self.directory,
+                "bytes": self._approx_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def cached_result(models: Sequence[str] = ()) -> Callable:
+    """
+    Decorator for module methods that return a single image.
+
+    When the module's `result_cache` is set, results are looked up and stored under
+    a key built from the operation name, every bound argument, `models`, the
+    model loader's device and the module attributes named by its `result_key_settings`
+    (engine settings such as the tile size that change the output). A `tier` argument
+    is keyed by the tier it resolves to (see `EnhancementModule.resolve_tier`).
+    Calls with `seed=None` are not deterministic and always run uncached, as are
+    calls whose arguments have no stable representation.
+
+    Args:
+        models (Sequence[str], optional): Ids of the models the operation runs on.
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+        operation = method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "result_cache", None)
+            if cache is None:
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop("self")
+            if "seed" in params and params["seed"] is None:
+                return method(self, *args, **kwargs)
+            params["device"] = str(self.model_loader.device)
+            settings = {name: getattr(self, name) for name in getattr(self, "result_key_settings", ())}
+            if settings:
+                params["settings"] = settings
+            if "tier" in params and hasattr(self, "resolve_tier"):
+                params["tier"] = self.resolve_tier(params["tier"])
+            try:
+                key = cache.make_key(operation, params, models)
+            except TypeError:
+                return method(self, *args, **kwargs)
+
+            result = cache.get(key)
+            if result is None:
+                result = method(self, *args, **kwargs)
+                cache.put(key, result)
+            return result
+        return wrapper
+    return decorator
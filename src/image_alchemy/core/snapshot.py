@@ -0,0 +1,82 @@
+# --- FILENAME: src/image_alchemy/core/snapshot.py ---
+"""
+Local snapshots of loaded models for fast process start.
+
+A snapshot is a directory holding a model's weights as safetensors files, already
+converted to the dtype the loader runs them in, plus a `snapshot.json` marker.
+Diffusers models and pipelines are written with `save_pretrained`, and SAM with a
+single state-dict file. Loading a snapshot memory-maps the weights instead of
+reading and converting checkpoint files. Several processes on one host then share
+the page cache for the file contents. On the CPU, the mapped tensors become the
+model's parameters without a copy.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from ..utils.lazy import lazy_import
+
+torch = lazy_import("torch")
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+MARKER = "snapshot.json"
+SAM_WEIGHTS = "sam.safetensors"
+
+def snapshot_path(root: str, key: str) -> str:
+    """Directory of the snapshot for a model registry key."""
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9._-]+", "--", key))
+
+def has_snapshot(path: str) -> bool:
+    """True if `path` holds a complete snapshot of the current version."""
+    try:
+        with open(os.path.join(path, MARKER)) as f:
+            return json.load(f).get("version") == SNAPSHOT_VERSION
+    except (OSError, ValueError):
+        return False
+
+def _write_directory(path: str, write, kind: str, key: str):
+    """Writes into a temporary sibling directory and renames it into place once complete."""
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        write(tmp_path)
+        with open(os.path.join(tmp_path, MARKER), "w") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "kind": kind, "key": key, "created": time.time()}, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+def save_pretrained_snapshot(model, path: str, key: str):
+    """Snapshots a diffusers model or pipeline (weights in their current dtype)."""
+    _write_directory(path, lambda tmp: model.save_pretrained(tmp, safe_serialization=True), "diffusers", key)
+
+def save_sam_snapshot(predictor, path: str, model_type: str):
+    """Snapshots the network of a `SamPredictor`."""
+    from safetensors.torch import save_file
+
+    def write(tmp):
+        state = {name: t.detach().contiguous() for name, t in predictor.model.state_dict().items()}
+        save_file(state, os.path.join(tmp, SAM_WEIGHTS), metadata={"model_type": model_type})
+    _write_directory(path, write, "sam", f"sam_{model_type}")
+
+def load_sam_snapshot(path: str, model_type: str, device: str):
+    """
+    Builds a `SamPredictor` from a snapshot. The network is created on the meta
+    device and its parameters are assigned from the memory-mapped file, so no
+    random initialisation or copy happens before the move to `device`.
+    """
+    from safetensors.torch import load_file
+    from segment_anything import sam_model_registry, SamPredictor
+
+    with torch.device("meta"):
+        sam = sam_model_registry[model_type]()
+    sam.load_state_dict(load_file(os.path.join(path, SAM_WEIGHTS)), assign=True)
+    return SamPredictor(sam.to(device))
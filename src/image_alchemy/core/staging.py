@@ -0,0 +1,206 @@
+# --- FILENAME: src/image_alchemy/core/staging.py ---
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+_DONE = object()
+
+def _call_timed(fn: Callable, item: Any) -> tuple:
+    """Runs `fn(item)` and returns (result, seconds). Module-level so process pools can pickle it."""
+    start = time.perf_counter()
+    result = fn(item)
+    return result, time.perf_counter() - start
+
+class StageStats:
+    """Busy time and throughput of one pipeline stage."""
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0  # time the stage sat idle waiting on a neighbour
+        self._lock = threading.Lock()
+
+    def record(self, busy: float, wait: float = 0.0):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += busy
+            self.wait_seconds += wait
+
+    def as_dict(self, wall_seconds: float) -> dict:
+        with self._lock:
+            capacity = wall_seconds * self.workers
+            return {
+                "workers": self.workers,
+                "items": self.items,
+                "busy_seconds": self.busy_seconds,
+                "wait_seconds": self.wait_seconds,
+                "utilization": self.busy_seconds / capacity if capacity else 0.0,
+            }
+
+class StagedPipeline:
+    """
+    Runs preprocess -> infer -> postprocess over a stream of items with the stages overlapped.
+
+    Preprocessing and postprocessing run in worker pools and are connected to a
+    single inference thread by bounded queues, so item N is diffused while item
+    N+1 is being prepared and item N-1 encoded. Results come out in input order.
+    Per-stage utilization (busy time divided by wall time and workers) shows which
+    pool is the bottleneck: an inference utilization well below 1 with a large
+    inference `wait_seconds` means more preprocessing workers are needed.
+
+    Example:
+        staged = StagedPipeline(load_and_prepare, run_model, encode, preprocess_workers=4)
+        for result in staged.run(paths):
+            ...
+        print(staged.stats())
+    """
+    def __init__(
+        self,
+        preprocess: Callable[[Any], Any],
+        infer: Callable[[Any], Any],
+        postprocess: Callable[[Any], Any] = None,
+        preprocess_workers: int = 2,
+        postprocess_workers: int = 1,
+        queue_size: int = 4,
+        preprocess_executor: Executor = None
+    ):
+        """
+        Args:
+            preprocess (Callable): CPU work before inference (decoding, conversions, control images).
+            infer (Callable): The model call. Always runs on one dedicated thread.
+            postprocess (Callable, optional): CPU work after inference (compositing, encoding). Defaults to None.
+            preprocess_workers (int, optional): Preprocessing threads. Defaults to 2.
+            postprocess_workers (int, optional): Postprocessing threads. Defaults to 1.
+            queue_size (int, optional): Items buffered between neighbouring stages. Bounds memory
+                                        use and how far preprocessing may run ahead. Defaults to 4.
+            preprocess_executor (Executor, optional): Pool for preprocessing instead of a thread pool,
+                                                      e.g. a ProcessPoolExecutor for GIL-bound Python
+                                                      code. `preprocess` must then be picklable. Defaults to None.
+        """
+        self.preprocess = preprocess
+        self.infer = infer
+        self.postprocess = postprocess
+        self.preprocess_workers = preprocess_workers
+        self.postprocess_workers = postprocess_workers
+        self.queue_size = queue_size
+        self.preprocess_executor = preprocess_executor
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stages = {
+            "preprocess": StageStats("preprocess", self.preprocess_workers),
+            "infer": StageStats("infer", 1),
+            "postprocess": StageStats("postprocess", self.postprocess_workers if self.postprocess else 0),
+        }
+        self._started = None
+        self._finished = None
+
+    def _postprocess_timed(self, item: Any) -> Any:
+        result, seconds = _call_timed(self.postprocess, item)
+        self._stages["postprocess"].record(seconds)
+        return result
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Yields the postprocessed result of every item, in input order.
+        An exception in any stage is re-raised here and stops the pipeline.
+        """
+        self._reset_stats()
+        self._started = time.perf_counter()
+        own_pre = self.preprocess_executor is None
+        pre_pool = self.preprocess_executor or ThreadPoolExecutor(self.preprocess_workers, thread_name_prefix="stage-pre")
+        post_pool = ThreadPoolExecutor(max(1, self.postprocess_workers), thread_name_prefix="stage-post")
+        prepared = queue.Queue(self.queue_size)
+        finished = queue.Queue(self.queue_size)
+        stop = threading.Event()
+
+        def put(q, value):
+            # Gives up once the consumer has stopped, so no thread stays blocked on a full queue
+            while not stop.is_set():
+                try:
+                    q.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def feed():
+            try:
+                for item in items:
+                    future = pre_pool.submit(_call_timed, self.preprocess, item)
+                    if not put(prepared, future):
+                        return
+            except Exception as e:
+                failed = Future()
+                failed.set_exception(e)
+                put(prepared, failed)
+            put(prepared, _DONE)
+
+        def infer_loop():
+            while True:
+                start = time.perf_counter()
+                future = get(prepared)
+                if future is _DONE:
+                    put(finished, _DONE)
+                    return
+                try:
+                    value, seconds = future.result()
+                    self._stages["preprocess"].record(seconds)
+                    waited = time.perf_counter() - start
+                    busy_start = time.perf_counter()
+                    result = self.infer(value)
+                    self._stages["infer"].record(time.perf_counter() - busy_start, waited)
+                except Exception as e:
+                    result_future = Future()
+                    result_future.set_exception(e)
+                    put(finished, result_future)
+                    return
+                if self.postprocess is None:
+                    result_future = Future()
+                    result_future.set_result(result)
+                else:
+                    result_future = post_pool.submit(self._postprocess_timed, result)
+                if not put(finished, result_future):
+                    return
+
+        threads = [
+            threading.Thread(target=feed, name="stage-feed", daemon=True),
+            threading.Thread(target=infer_loop, name="stage-infer", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                future = finished.get()
+                if future is _DONE:
+                    break
+                yield future.result()
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            if own_pre:
+                pre_pool.shutdown(wait=True, cancel_futures=True)
+            post_pool.shutdown(wait=True, cancel_futures=True)
+            self._finished = time.perf_counter()
+
+    def stats(self) -> dict:
+        """Returns wall time and per-stage items, busy time, wait time and utilization of the last run."""
+        if self._started is None:
+            return {}
+        wall = (self._finished or time.perf_counter()) - self._started
+        stats = {"wall_seconds": wall}
+        for name, stage in self._stages.items():
+            stats[name] = stage.as_dict(wall)
+        return stats
@@ -0,0 +1,202 @@
+# --- FILENAME: src/image_alchemy/core/stubs.py ---
+"""
+Lightweight stand-ins for the diffusion, SAM and annotator models.
+
+They implement just enough of the diffusers / segment_anything interfaces for
+every ImageAlchemy code path to run on a CPU in milliseconds without downloading
+weights, which makes them suitable for exercising services, schedulers and
+benchmarks end to end. Outputs are cheap deterministic image transforms, not
+real model results.
+
+Example:
+    alchemy = ImageAlchemy(model_loader=StubModelLoader(call_latency=0.05))
+"""
+import time
+import threading
+import zlib
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from .model_loader import ModelLoader, DEFAULT_INPAINT_MODEL_ID, DEFAULT_BASE_MODEL_ID, DEFAULT_SAM_CHECKPOINT
+from ..utils.lazy import lazy_import
+
+torch = lazy_import("torch")
+
+class _Config:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+class _Output:
+    def __init__(self, images):
+        self.images = images
+
+class StubTextEncoder:
+    """Mimics the attributes of a CLIP text encoder that prompt caching relies on."""
+    def __init__(self, name: str):
+        self.config = _Config(_name_or_path=name)
+        self.dtype = torch.float32
+
+class StubDiffusionPipeline:
+    """
+    Stands in for the inpainting and ControlNet img2img pipelines.
+
+    A call sleeps `call_latency + image_latency * batch_size` seconds, so batching
+    amortizes the fixed cost the way it does on a GPU, then returns the input
+    images perturbed by noise drawn from the given generators. Inpainting calls
+    fill the masked area with noise around the image's mean color.
+    """
+    def __init__(self, name: str, call_latency: float = 0.0, image_latency: float = 0.0):
+        self.name = name
+        self.call_latency = call_latency
+        self.image_latency = image_latency
+        self.text_encoder = StubTextEncoder(name)
+        self.unet = _Config(config=_Config(sample_size=64))
+        self.vae_scale_factor = 8
+        self.device = torch.device("cpu")
+        self.components = {}
+        self.batch_sizes = []  # size of every call, to observe batching
+        self._lock = threading.Lock()
+
+    def encode_prompt(self, prompt, device=None, num_images_per_prompt=1, do_classifier_free_guidance=True, negative_prompt=None):
+        def embed(text):
+            seed = zlib.crc32((text or "").encode())
+            return torch.randn((1, 77, 16), generator=torch.Generator().manual_seed(seed))
+        return embed(prompt), embed(negative_prompt)
+
+    def __call__(
+        self,
+        prompt_embeds=None,
+        negative_prompt_embeds=None,
+        image=None,
+        mask_image=None,
+        control_image=None,
+        height=None,
+        width=None,
+        strength=1.0,
+        generator=None,
+        num_inference_steps=25,
+        callback_on_step_end=None,
+        **kwargs
+    ) -> _Output:
+        images = image if isinstance(image, list) else [image]
+        masks = mask_image if isinstance(mask_image, list) else [mask_image] * len(images)
+        generators = generator if isinstance(generator, list) else [generator] * len(images)
+        with self._lock:
+            self.batch_sizes.append(len(images))
+        # Spread the latency over the denoising steps, int(steps * strength) as in diffusers' img2img
+        steps = max(1, int(num_inference_steps * strength))
+        latency = self.call_latency + self.image_latency * len(images)
+        for step in range(steps):
+            if latency:
+                time.sleep(latency / steps)
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, 999 - step, {})
+
+        outputs = []
+        for img, mask, gen in zip(images, masks, generators):
+            img = img.convert("RGB")
+            if width and height and img.size != (width, height):
+                img = img.resize((width, height), Image.BILINEAR)
+            pixels = np.asarray(img, dtype=np.float32)
+            noise = torch.randn(pixels.shape, generator=gen).numpy()
+            result = pixels + noise * 8.0 * strength
+            if mask is not None:
+                inside = np.asarray(mask.convert("L").resize(img.size, Image.NEAREST), dtype=np.float32)[..., None] / 255.0
+                fill = pixels.reshape(-1, 3).mean(axis=0) + noise * 16.0
+                result = result * (1.0 - inside) + fill * inside
+            outputs.append(Image.fromarray(np.clip(result, 0, 255).astype(np.uint8)))
+        return _Output(outputs)
+
+class _IdentityTransform:
+    def apply_boxes_torch(self, boxes, original_size):
+        return boxes
+
+    def apply_coords_torch(self, coords, original_size):
+        return coords
+
+class StubSamPredictor:
+    """
+    Stands in for `segment_anything.SamPredictor`.
+    Boxes segment to themselves and foreground points to discs around them.
+    """
+    def __init__(self, call_latency: float = 0.0):
+        self.call_latency = call_latency
+        self.device = torch.device("cpu")
+        self.transform = _IdentityTransform()
+        self.reset_image()
+
+    def reset_image(self):
+        self.features = None
+        self.original_size = None
+        self.input_size = None
+        self.is_image_set = False
+
+    def set_image(self, image: np.ndarray):
+        time.sleep(self.call_latency)
+        h, w = image.shape[:2]
+        self.features = torch.from_numpy(image[::16, ::16].astype(np.float32)).contiguous()
+        self.original_size = (h, w)
+        self.input_size = (h, w)
+        self.is_image_set = True
+
+    def predict_torch(self, point_coords=None, point_labels=None, boxes=None, multimask_output=False):
+        h, w = self.original_size
+        n = boxes.shape[0] if boxes is not None else point_coords.shape[0]
+        masks = torch.zeros((n, 1, h, w), dtype=torch.bool)
+        ys, xs = torch.meshgrid(torch.arange(h), torch.arange(w), indexing="ij")
+        for i in range(n):
+            if boxes is not None:
+                x1, y1, x2, y2 = [int(v) for v in boxes[i].tolist()]
+                masks[i, 0, max(0, y1):y2, max(0, x1):x2] = True
+            if point_coords is not None:
+                radius = max(1, min(h, w) // 8)
+                for (x, y), label in zip(point_coords[i].tolist(), point_labels[i].tolist()):
+                    if label == 1:
+                        masks[i, 0] |= (xs - x) ** 2 + (ys - y) ** 2 <= radius ** 2
+        return masks, torch.ones((n, 1)), None
+
+class StubAnnotator:
+    """Stands in for the controlnet_aux preprocessors: an edge map of the input."""
+    def __call__(self, image: Image.Image) -> Image.Image:
+        return image.convert("L").filter(ImageFilter.FIND_EDGES).convert("RGB")
+
+class StubModelLoader(ModelLoader):
+    """
+    A `ModelLoader` whose getters return stub models. Registry, budgets and caches
+    behave exactly as with real models.
+    """
+    def __init__(self, device: str = "cpu", call_latency: float = 0.0, image_latency: float = 0.0, **kwargs):
+        """
+        Args:
+            device (str, optional): Reported device. Stubs always compute on the CPU. Defaults to "cpu".
+            call_latency (float, optional): Simulated fixed cost of a pipeline call in seconds. Defaults to 0.
+            image_latency (float, optional): Simulated cost per image in a pipeline call. Defaults to 0.
+            **kwargs: Passed on to `ModelLoader`.
+        """
+        super().__init__(device=device, **kwargs)
+        self.call_latency = call_latency
+        self.image_latency = image_latency
+
+    def get_sd_pipeline(self, model_id=DEFAULT_INPAINT_MODEL_ID):
+        return self._get_or_load(model_id, lambda: StubDiffusionPipeline(model_id, self.call_latency, self.image_latency))
+
+    def get_controlnet_pipeline(self, base_model_id=DEFAULT_BASE_MODEL_ID, controlnet_model_id="lllyasviel/control_v11p_sd15_inpaint"):
+        pipeline_key = f"{base_model_id}+{controlnet_model_id}"
+        return self._get_or_load(
+            pipeline_key, lambda: StubDiffusionPipeline(base_model_id, self.call_latency, self.image_latency)
+        )
+
+    def get_sam_predictor(self, model_type="vit_h", checkpoint_name=DEFAULT_SAM_CHECKPOINT):
+        return self._get_or_load(f"sam_predictor_{model_type}", lambda: StubSamPredictor(self.call_latency))
+
+    def get_annotator(self, name: str):
+        return self._get_or_load(f"annotator_{name}", StubAnnotator)
+
+def stub_alchemy(device: str = "cpu", call_latency: float = 0.0, image_latency: float = 0.0):
+    """
+    Builds an `ImageAlchemy` engine on stub models. Being a module-level function it can be
+    pickled, e.g. as the `alchemy_factory` of an `AlchemyPool` (use functools.partial for latencies).
+    """
+    from ..alchemy import ImageAlchemy
+    return ImageAlchemy(model_loader=StubModelLoader(device=device, call_latency=call_latency, image_latency=image_latency))
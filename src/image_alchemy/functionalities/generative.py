@@ -1,23 +1,41 @@
 # --- FILENAME: src/image_alchemy/functionalities/generative.py ---
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from typing import Union, List
-from ..core.model_loader import ModelLoader
-from ..core.pipelines import run_sam_segmentation, run_inpaint_pipeline, generative_zoom_step
+from typing import Iterator, Union, List
+from ..core.model_loader import ModelLoader, DEFAULT_INPAINT_MODEL_ID, DEFAULT_SAM_CHECKPOINT
+from ..core.pipelines import run_sam_segmentation, run_inpaint_pipeline, generative_zoom_step, interpolate_zoom_frames
+from ..core.instrumentation import traced
+from ..core.result_cache import cached_result
+from ..utils.image_utils import pil_to_numpy
+from ..utils.video_utils import FrameWriter
 from .manipulation import ManipulationModule
 
 class GenerativeModule:
     """
     Provides functions for generative tasks like background replacement and zoom.
     """
-    def __init__(self, model_loader: ModelLoader):
+    def __init__(self, model_loader: ModelLoader, max_workers: int = None):
+        """
+        Args:
+            model_loader (ModelLoader): The model loader instance.
+            max_workers (int, optional): Threads used to synthesize interpolated zoom frames.
+                                         Defaults to the number of CPU cores.
+        """
         self.model_loader = model_loader
         self.manipulation = ManipulationModule(model_loader)
+        self.max_workers = max_workers or os.cpu_count()
+        self.result_cache = None  # set by ImageAlchemy when result caching is enabled
 
+    @traced("generative.generate_background")
+    @cached_result((DEFAULT_INPAINT_MODEL_ID, DEFAULT_SAM_CHECKPOINT))
     def generate_background(
         self, 
         image: Image.Image, 
         foreground_mask: Union[Image.Image, List[int]], 
-        background_prompt: str
+        background_prompt: str,
+        seed: int = None
     ) -> Image.Image:
         """
         Replaces the background of an image with a generated scene.
@@ -32,33 +50,107 @@ class GenerativeModule:
             self.model_loader,
             image,
             background_mask,
-            background_prompt
+            background_prompt,
+            seed=seed
         )
 
+    @traced("generative.generative_zoom")
     def generative_zoom(
         self, 
         image: Image.Image, 
         prompt: str,
         num_steps: int = 10,
-        zoom_factor: float = 1.15
+        zoom_factor: float = 1.15,
+        interpolation_factor: int = 1,
+        seed: int = None
     ) -> List[Image.Image]:
         """
         Creates a sequence of images for a "generative zoom" effect.
+        For long sequences prefer `iter_generative_zoom` or `generative_zoom_to_file`,
+        which do not keep every frame in memory.
+        """
+        return list(self.iter_generative_zoom(
+            image, prompt, num_steps=num_steps, zoom_factor=zoom_factor,
+            interpolation_factor=interpolation_factor, seed=seed
+        ))
+
+    def iter_generative_zoom(
+        self,
+        image: Image.Image,
+        prompt: str,
+        num_steps: int = 10,
+        zoom_factor: float = 1.15,
+        steps: int = 25,
+        interpolation_factor: int = 1,
+        seed: int = None
+    ) -> Iterator[Image.Image]:
+        """
+        Yields the frames of a "generative zoom" as they are produced, starting with `image`.
+        Every outpainted canvas is downscaled back to the input size, so each step
+        is diffused at the same resolution and frames can be streamed to a video.
+
+        With `interpolation_factor` n > 1, only every n-th frame is a diffused keyframe
+        (zooming out by `zoom_factor` ** n); the frames in between are synthesized by
+        geometric interpolation. The output still advances by `zoom_factor` per frame,
+        with n times fewer diffusion runs. When n does not divide `num_steps`, the last
+        keyframe zooms out only by the remaining frames, so the sequence ends on it.
+
+        With a `seed`, keyframe i is seeded `seed + i`.
+        """
+        interpolation_factor = max(1, int(interpolation_factor))
+        num_keyframes = math.ceil(num_steps / interpolation_factor)
+
+        current_image = image.convert("RGB")
+        yield current_image
+        emitted = 0
+        # Threads are only started once frames are interpolated, and stop when the generator is closed
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="zoom-interp") as executor:
+            for i in range(num_keyframes):
+                frames = min(interpolation_factor, num_steps - emitted)
+                keyframe_zoom = zoom_factor ** frames
+                print(f"Generating zoom keyframe {i+1}/{num_keyframes}...")
+                next_keyframe = generative_zoom_step(
+                    self.model_loader,
+                    current_image,
+                    prompt,
+                    zoom_factor=keyframe_zoom,
+                    steps=steps,
+                    output_size=image.size,
+                    seed=None if seed is None else seed + i
+                )
+                if frames > 1:
+                    yield from interpolate_zoom_frames(
+                        current_image, next_keyframe, keyframe_zoom, frames - 1, executor=executor
+                    )
+                emitted += frames
+                current_image = next_keyframe
+                yield current_image
+
+    @traced("generative.generative_zoom_to_file")
+    def generative_zoom_to_file(
+        self,
+        image: Image.Image,
+        prompt: str,
+        path: str,
+        num_steps: int = 10,
+        zoom_factor: float = 1.15,
+        fps: float = 12,
+        interpolation_factor: int = 1,
+        seed: int = None
+    ) -> int:
+        """
+        Renders a "generative zoom" straight into an MP4 or GIF file, one frame at a time.
+
+        Returns:
+            int: The number of frames written.
         """
-        frames = [image]
-        current_image = image
-        for i in range(num_steps):
-            print(f"Generating zoom frame {i+1}/{num_steps}...")
-            next_frame = generative_zoom_step(
-                self.model_loader,
-                current_image,
-                prompt,
-                zoom_factor=zoom_factor
-            )
-            frames.append(next_frame)
-            current_image = next_frame
-        
-        return frames
+        with FrameWriter(path, fps=fps) as writer:
+            for frame in self.iter_generative_zoom(
+                image, prompt, num_steps=num_steps, zoom_factor=zoom_factor,
+                interpolation_factor=interpolation_factor, seed=seed
+            ):
+                writer.write(frame)
+        return writer.frame_count
 
     # Style Transfer would be implemented here, likely using a ControlNet-based
     # img2img approach with a high denoising strength and a descriptive style prompt.
\ No newline at end of file
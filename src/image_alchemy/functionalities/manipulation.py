@@ -1,9 +1,28 @@
 # --- FILENAME: src/image_alchemy/functionalities/manipulation.py ---
-from PIL import Image
-from typing import Union, List
-from ..core.model_loader import ModelLoader
-from ..core.pipelines import run_sam_segmentation, run_inpaint_pipeline
-from ..utils.image_utils import create_mask_from_box, combine_image_and_mask
+import numbers
+import numpy as np
+from PIL import Image, ImageFilter
+from typing import Union, List, Tuple
+from ..core.model_loader import ModelLoader, DEFAULT_INPAINT_MODEL_ID, DEFAULT_SAM_CHECKPOINT
+from ..core.pipelines import (
+    run_sam_segmentation,
+    run_sam_segmentation_batch,
+    run_inpaint_pipeline,
+    run_inpaint_batch,
+    encode_prompt,
+    DEFAULT_NEGATIVE_PROMPT
+)
+from ..core.instrumentation import traced
+from ..core.result_cache import cached_result
+from ..utils.image_utils import create_mask_from_box, combine_image_and_mask, transplant_object
+
+REMOVE_OBJECT_PROMPT = "photorealistic background, no objects"
+INPAINT_MODELS = (DEFAULT_INPAINT_MODEL_ID, DEFAULT_SAM_CHECKPOINT)
+
+def _is_box(value) -> bool:
+    """True for one bounding box [x1, y1, x2, y2]: a list or tuple of four numbers, numpy scalars included."""
+    return (isinstance(value, (list, tuple)) and len(value) == 4
+            and all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in value))
 
 class ManipulationModule:
     """
@@ -11,54 +30,153 @@ class ManipulationModule:
     """
     def __init__(self, model_loader: ModelLoader):
         self.model_loader = model_loader
+        self.result_cache = None  # set by ImageAlchemy when result caching is enabled
 
-    def _get_mask(self, image: Image.Image, mask_input: Union[Image.Image, List[int]]) -> Image.Image:
-        """Helper to get a mask from either a direct mask image or a bounding box."""
+    def _get_mask(self, image: Image.Image, mask_input: Union[Image.Image, List[int], List[List[int]]]) -> Image.Image:
+        """
+        Helper to get a mask from a direct mask image, a bounding box or a list of bounding boxes.
+        Several boxes are segmented in one batched SAM pass and merged into a single mask.
+        """
         if isinstance(mask_input, Image.Image):
             return mask_input.convert("L")
-        elif isinstance(mask_input, list) and len(mask_input) == 4:
+        if isinstance(mask_input, np.ndarray):
+            mask_input = mask_input.tolist()
+        if _is_box(mask_input):
              # Use SAM for a precise mask from the bounding box
-            return run_sam_segmentation(self.model_loader, image, input_box=mask_input)
+            return run_sam_segmentation(self.model_loader, image, input_box=list(mask_input))
+        elif isinstance(mask_input, (list, tuple)) and mask_input and all(_is_box(box) for box in mask_input):
+            masks, _ = run_sam_segmentation_batch(self.model_loader, image, input_boxes=[list(box) for box in mask_input])
+            return Image.fromarray(np.logical_or.reduce([np.array(mask) for mask in masks]))
         else:
-            raise ValueError("mask_input must be a PIL Image or a bounding box list [x1, y1, x2, y2]")
+            raise ValueError("mask_input must be a PIL Image, a bounding box list [x1, y1, x2, y2] or a list of such boxes")
 
-    def inpaint(self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str) -> Image.Image:
+    def precompute_prompt_embeddings(self):
+        """
+        Encodes the built-in manipulation prompts ahead of time.
+        Note: This loads the inpainting pipeline.
+        """
+        pipeline = self.model_loader.get_sd_pipeline()
+        encode_prompt(self.model_loader, pipeline, REMOVE_OBJECT_PROMPT, DEFAULT_NEGATIVE_PROMPT)
+
+    @traced("manipulation.inpaint")
+    @cached_result(INPAINT_MODELS)
+    def inpaint(self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str, seed: int = None) -> Image.Image:
         """
         Fills in a masked area of an image based on a prompt.
         """
         mask_image = self._get_mask(image, mask)
-        return run_inpaint_pipeline(self.model_loader, image, mask_image, prompt)
+        return run_inpaint_pipeline(self.model_loader, image, mask_image, prompt, region="auto", seed=seed)
+
+    @traced("manipulation.inpaint_batch")
+    def inpaint_batch(
+        self,
+        items: List[Tuple[Image.Image, Union[Image.Image, List[int]], str]],
+        batch_size: int = 4,
+        seed: int = None
+    ) -> List[Image.Image]:
+        """
+        Inpaints many (image, mask, prompt) items, batching items of similar resolution together.
+        Results are returned in input order. With a `seed`, item i is seeded `seed + i`.
+        """
+        batch = [(image, self._get_mask(image, mask), prompt) for image, mask, prompt in items]
+        return run_inpaint_batch(self.model_loader, batch, batch_size=batch_size, region="auto", seed=seed)
 
-    def remove_object(self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str = "photorealistic background, no objects") -> Image.Image:
+    @traced("manipulation.remove_object")
+    @cached_result(INPAINT_MODELS)
+    def remove_object(
+        self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str = REMOVE_OBJECT_PROMPT, seed: int = None
+    ) -> Image.Image:
         """
         Removes an object from an image, filling the space with a plausible background.
         """
         mask_image = self._get_mask(image, mask)
         # The prompt should describe the background to fill in
-        return run_inpaint_pipeline(self.model_loader, image, mask_image, prompt)
+        return run_inpaint_pipeline(self.model_loader, image, mask_image, prompt, region="auto", seed=seed)
 
-    def add_object(self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str) -> Image.Image:
+    @traced("manipulation.add_object")
+    def add_object(self, image: Image.Image, mask: Union[Image.Image, List[int]], prompt: str, seed: int = None) -> Image.Image:
         """
         Adds an object to a masked area of an image. Alias for inpaint.
         """
-        return self.inpaint(image, mask, prompt)
+        return self.inpaint(image, mask, prompt, seed=seed)
 
+    @traced("manipulation.reposition_object")
+    @cached_result(INPAINT_MODELS)
     def reposition_object(
         self, 
         image: Image.Image, 
         source_mask: Union[Image.Image, List[int]], 
         destination_mask: Union[Image.Image, List[int]],
-        object_prompt: str
+        object_prompt: str,
+        fused: bool = False,
+        background_prompt: str = REMOVE_OBJECT_PROMPT,
+        strength: float = 0.85,
+        seed: int = None
     ) -> Image.Image:
         """
         Moves an object from a source location to a destination location.
+
+        By default the object is removed and then re-added in two inpainting passes.
+        With `fused=True` the source mask is computed once and the original object pixels
+        are transplanted into the destination (keeping their aspect ratio) as initialization.
+        Both regions are then diffused in one batched pipeline call, each with its own
+        prompt: the vacated area with `background_prompt`, the destination with `object_prompt`,
+        so the object is not regenerated where it used to be. Where the regions overlap the
+        object wins. `background_prompt` and `strength` only apply to the fused mode.
         """
+        if fused:
+            return self._reposition_object_fused(
+                image, source_mask, destination_mask, object_prompt, background_prompt, strength, seed
+            )
+
         print("Step 1: Removing object from source location...")
         # First, remove the object from its original location
-        removed_image = self.remove_object(image, source_mask)
+        removed_image = self.remove_object(image, source_mask, seed=seed)
 
         print("Step 2: Adding object to destination location...")
         # Then, add the object to the new location
-        final_image = self.add_object(removed_image, destination_mask, object_prompt)
+        final_image = self.add_object(removed_image, destination_mask, object_prompt, seed=seed)
+
+        return final_image
+
+    def _reposition_object_fused(
+        self,
+        image: Image.Image,
+        source_mask: Union[Image.Image, List[int]],
+        destination_mask: Union[Image.Image, List[int]],
+        object_prompt: str,
+        background_prompt: str,
+        strength: float,
+        seed: int = None
+    ) -> Image.Image:
+        """Single-pass variant of `reposition_object`."""
+        if isinstance(destination_mask, Image.Image):
+            destination = destination_mask.convert("L").resize(image.size, Image.NEAREST)
+            destination_box = destination.getbbox()
+            if destination_box is None:
+                raise ValueError("destination_mask is empty.")
+        elif _is_box(destination_mask):
+            destination, destination_box = None, list(destination_mask)
+        else:
+            # The object is transplanted to one place, so a list of boxes has no single destination
+            raise ValueError("In fused mode destination_mask must be a PIL Image or one bounding box [x1, y1, x2, y2]")
+        source = self._get_mask(image, source_mask)
 
-        return final_image
\ No newline at end of file
+        init_image, vacated_mask, object_mask = transplant_object(image, source, destination_box)
+        object_np = np.array(object_mask)
+        if destination is not None:
+            object_np = np.maximum(object_np, np.array(destination))
+        # One prompt per region: a shared prompt would also ask for the object in the vacated area
+        vacated_np = np.where(object_np > 0, 0, np.array(vacated_mask)).astype(np.uint8)
+        object_mask = Image.fromarray(object_np)
+        items = [(init_image, object_mask, object_prompt)]
+        if vacated_np.any():
+            items.append((init_image, Image.fromarray(vacated_np), background_prompt))
+        results = run_inpaint_batch(
+            self.model_loader, items, strength=strength, batch_size=len(items), region="auto", seed=seed
+        )
+        if len(results) == 1:
+            return results[0]
+        # Each result only differs from init_image inside its own (feathered) mask
+        alpha = object_mask.filter(ImageFilter.GaussianBlur(8))
+        return Image.composite(results[0], results[1], alpha)
@@ -0,0 +1,351 @@
+# --- FILENAME: src/image_alchemy/pool.py ---
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Callable, List
+
+import numpy as np
+from PIL import Image
+
+from .core import instrumentation
+
+MODULES = ("enhancement", "manipulation", "generative")
+
+logger = logging.getLogger(__name__)
+
+class WorkerCrashed(RuntimeError):
+    """Raised for a task whose worker process died more often than the pool's `max_retries` allows."""
+
+class _SharedImage:
+    """A picklable reference to an image's pixels in a shared memory segment."""
+    __slots__ = ("name", "shape", "mode")
+
+    def __init__(self, name: str, shape: tuple, mode: str):
+        self.name = name
+        self.shape = shape
+        self.mode = mode
+
+def _share_image(image: Image.Image) -> tuple:
+    """Copies an image into a new shared memory segment. Returns (reference, segment)."""
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    pixels = np.asarray(image)
+    segment = shared_memory.SharedMemory(create=True, size=max(1, pixels.nbytes))
+    np.ndarray(pixels.shape, dtype=np.uint8, buffer=segment.buf)[...] = pixels
+    return _SharedImage(segment.name, pixels.shape, image.mode), segment
+
+def _read_image(ref: _SharedImage, unlink: bool = False) -> Image.Image:
+    """Copies an image out of shared memory, optionally releasing the segment."""
+    segment = shared_memory.SharedMemory(name=ref.name)
+    try:
+        pixels = np.ndarray(ref.shape, dtype=np.uint8, buffer=segment.buf).copy()
+    finally:
+        segment.close()
+        if unlink:
+            segment.unlink()
+    return Image.fromarray(pixels, ref.mode)
+
+def _pack(value: Any, segments: list) -> Any:
+    """Replaces images in `value` (and in lists, tuples and dicts within it) by shared memory references."""
+    if isinstance(value, Image.Image):
+        ref, segment = _share_image(value)
+        segments.append(segment)
+        return ref
+    if isinstance(value, (list, tuple)):
+        return type(value)(_pack(v, segments) for v in value)
+    if isinstance(value, dict):
+        return {k: _pack(v, segments) for k, v in value.items()}
+    return value
+
+def _unpack(value: Any, unlink: bool = False) -> Any:
+    """Inverse of `_pack`."""
+    if isinstance(value, _SharedImage):
+        return _read_image(value, unlink)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unpack(v, unlink) for v in value)
+    if isinstance(value, dict):
+        return {k: _unpack(v, unlink) for k, v in value.items()}
+    return value
+
+def _worker_main(index: int, device: str, threads: int, factory: Callable, tasks: mp.Queue, results: mp.Queue):
+    """Entry point of a worker process: builds its own engine, then serves tasks until it gets None."""
+    if threads:
+        # Must be set before torch is imported to bound the intra-op thread pools
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(threads)
+    if factory is None:
+        from .alchemy import ImageAlchemy
+        alchemy = ImageAlchemy(device=device)
+    else:
+        alchemy = factory(device)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, operation, packed = task
+        segments = []
+        # Payloads are pickled here rather than by the queue's feeder thread, where a
+        # pickling error would be lost and the task would never finish
+        try:
+            module_name, _, method_name = operation.partition(".")
+            method = getattr(getattr(alchemy, module_name), method_name)
+            payload = _pack(method(**_unpack(packed)), segments)
+            for segment in segments:
+                segment.close()  # the parent reads and unlinks them
+            ok, data = True, pickle.dumps(payload)
+        except Exception as e:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+            try:
+                data = pickle.dumps(e)
+                pickle.loads(data)  # exceptions with custom constructors pickle but do not unpickle
+            except Exception:
+                data = pickle.dumps(RuntimeError(f"{type(e).__name__}: {e}"))
+            ok = False
+        results.put((task_id, index, ok, data))
+
+class _Task:
+    __slots__ = ("task_id", "operation", "packed", "segments", "future", "attempts", "worker")
+
+    def __init__(self, task_id, operation, packed, segments, future):
+        self.task_id = task_id
+        self.operation = operation
+        self.packed = packed
+        self.segments = segments
+        self.future = future
+        self.attempts = 0
+        self.worker = None
+
+class AlchemyPool:
+    """
+    Runs ImageAlchemy operations on a pool of worker processes, each with its own
+    engine and `ModelLoader` pinned to one device.
+
+    Tasks go to the worker with the fewest tasks in flight. Images in the
+    arguments and results travel through shared memory segments rather than
+    being pickled through a pipe. A worker that dies is restarted, and its
+    in-flight tasks are retried on the pool up to `max_retries` times.
+
+    Example:
+        with AlchemyPool(devices=["cuda:0", "cuda:1"]) as pool:
+            futures = [pool.submit("enhancement.denoise", image=image, seed=0) for image in images]
+            results = [f.result() for f in futures]
+    """
+    def __init__(
+        self,
+        devices: List[str] = None,
+        num_workers: int = 2,
+        threads_per_worker: int = None,
+        alchemy_factory: Callable = None,
+        max_retries: int = 1,
+        start_method: str = "spawn"
+    ):
+        """
+        Args:
+            devices (List[str], optional): One worker per entry, e.g. ["cuda:0", "cuda:1"] or ["cpu"] * 4.
+                                           Defaults to every CUDA device, or `num_workers` CPU workers.
+            num_workers (int, optional): Number of CPU workers when `devices` is None and no GPU is present.
+                                         Defaults to 2.
+            threads_per_worker (int, optional): Intra-op CPU threads per worker. Defaults to
+                                                the CPU count divided by the number of CPU workers.
+            alchemy_factory (Callable, optional): Picklable callable building a worker's engine from its
+                                                  device, e.g. `core.stubs.stub_alchemy`. Defaults to
+                                                  `ImageAlchemy(device=device)`.
+            max_retries (int, optional): How often a task is resubmitted after its worker died. Defaults to 1.
+            start_method (str, optional): multiprocessing start method. "spawn" is required for CUDA.
+                                          Defaults to "spawn".
+        """
+        if devices is None:
+            import torch
+            count = torch.cuda.device_count()
+            devices = [f"cuda:{i}" for i in range(count)] if count else ["cpu"] * num_workers
+        self.devices = list(devices)
+        cpu_workers = sum(1 for d in self.devices if d == "cpu")
+        if threads_per_worker is None and cpu_workers:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // cpu_workers)
+        self.threads_per_worker = threads_per_worker
+        self.alchemy_factory = alchemy_factory
+        self.max_retries = max_retries
+        self._context = mp.get_context(start_method)
+        self._results = self._context.Queue()
+        self._lock = threading.Lock()
+        self._tasks = {}  # task id -> _Task
+        self._ids = itertools.count()
+        self._workers = [None] * len(self.devices)
+        self._queues = [None] * len(self.devices)
+        self._inflight = [0] * len(self.devices)
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "retried": 0, "restarts": 0}
+        self._closed = False
+        for index in range(len(self.devices)):
+            self._start_worker(index)
+        self._collector = threading.Thread(target=self._collect, name="alchemy-pool-collector", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index: int):
+        device = self.devices[index]
+        threads = self.threads_per_worker if device == "cpu" else None
+        self._queues[index] = self._context.Queue()
+        self._workers[index] = self._context.Process(
+            target=_worker_main,
+            args=(index, device, threads, self.alchemy_factory, self._queues[index], self._results),
+            name=f"alchemy-worker-{index}",
+            daemon=True
+        )
+        self._workers[index].start()
+
+    def submit(self, operation: str, **params) -> Future:
+        """
+        Schedules an operation ("module.method") on the least-loaded worker.
+
+        Returns:
+            Future: Resolves to the operation's result.
+        """
+        module_name, _, method_name = operation.partition(".")
+        if module_name not in MODULES or not method_name or method_name.startswith("_"):
+            raise ValueError(f"Unknown operation: {operation}")
+        if self._closed:
+            raise RuntimeError("The pool is closed.")
+        segments = []
+        task = _Task(next(self._ids), operation, _pack(params, segments), segments, Future())
+        with self._lock:
+            self._tasks[task.task_id] = task
+            self._stats["submitted"] += 1
+            self._dispatch(task)
+        return task.future
+
+    def run(self, operation: str, **params) -> Any:
+        """Runs an operation and waits for its result."""
+        return self.submit(operation, **params).result()
+
+    def map(self, operation: str, images: List[Image.Image], **params) -> List[Any]:
+        """Runs an operation on every image, spread over the workers. Results are in input order."""
+        futures = [self.submit(operation, image=image, **params) for image in images]
+        return [future.result() for future in futures]
+
+    def _dispatch(self, task: _Task):
+        """Sends a task to the worker with the fewest tasks in flight. Call with the lock held."""
+        index = min(range(len(self._workers)), key=lambda i: self._inflight[i])
+        task.worker = index
+        task.attempts += 1
+        self._inflight[index] += 1
+        self._queues[index].put((task.task_id, task.operation, task.packed))
+
+    def _finish(self, task: _Task, ok: bool, payload: Any):
+        for segment in task.segments:
+            segment.close()
+            segment.unlink()
+        if ok:
+            try:
+                result = _unpack(payload, unlink=True)
+            except Exception as e:
+                ok, payload = False, e
+        if ok:
+            self._stats["completed"] += 1
+            task.future.set_result(result)
+        else:
+            self._stats["failed"] += 1
+            task.future.set_exception(payload)
+
+    def _collect(self):
+        """Resolves futures from worker results and restarts workers that died."""
+        while True:
+            try:
+                message = self._results.get(timeout=0.2)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):  # the queue was torn down
+                return
+            except Exception:
+                logger.exception("Dropped a worker result that could not be read")
+                message = None
+            with self._lock:
+                try:
+                    if message is not None:
+                        self._receive(*message)
+                    if self._closed:
+                        if not self._tasks:
+                            return
+                        continue
+                    self._check_workers()
+                except Exception:
+                    # The collector must keep running, or every pending future would hang
+                    logger.exception("Error while collecting worker results")
+
+    def _receive(self, task_id: int, index: int, ok: bool, data: bytes):
+        """Resolves a task from its worker's pickled result. Call with the lock held."""
+        try:
+            payload = pickle.loads(data)
+        except Exception as e:
+            ok, payload = False, RuntimeError(f"Could not read the result of task {task_id}: {type(e).__name__}: {e}")
+        task = self._tasks.get(task_id)
+        if task is not None and task.worker == index:
+            del self._tasks[task_id]
+            self._inflight[index] -= 1
+            self._finish(task, ok, payload)
+        elif ok:
+            _unpack(payload, unlink=True)  # stale result of a retried task; release its segments
+
+    def _check_workers(self):
+        """Restarts dead workers and retries or fails their tasks. Call with the lock held."""
+        for index, process in enumerate(self._workers):
+            if process.is_alive():
+                continue
+            logger.warning("Worker %d (%s) exited with code %s; restarting it.", index, self.devices[index], process.exitcode)
+            instrumentation.count("pool.worker_restarts", device=self.devices[index])
+            self._stats["restarts"] += 1
+            self._inflight[index] = 0
+            self._start_worker(index)
+            for task in [t for t in self._tasks.values() if t.worker == index]:
+                if task.attempts <= self.max_retries:
+                    self._stats["retried"] += 1
+                    self._dispatch(task)
+                else:
+                    del self._tasks[task.task_id]
+                    self._finish(task, False, WorkerCrashed(
+                        f"Worker {index} died while running {task.operation} ({task.attempts} attempts)"
+                    ))
+
+    def stats(self) -> dict:
+        """Returns task counters, worker restarts and the tasks in flight per worker."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers"] = [
+                {"device": device, "pid": process.pid, "alive": process.is_alive(), "inflight": inflight}
+                for device, process, inflight in zip(self.devices, self._workers, self._inflight)
+            ]
+        return stats
+
+    def close(self, timeout: float = 30):
+        """Lets the workers finish their queued tasks, then stops them."""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            for tasks in self._queues:
+                tasks.put(None)
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout)
+        with self._lock:
+            for task in list(self._tasks.values()):
+                self._finish(task, False, WorkerCrashed("The pool was closed before the task finished"))
+            self._tasks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,312 @@
+# --- FILENAME: src/image_alchemy/service.py ---
+import asyncio
+import inspect
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from typing import Any, Hashable, List
+
+from .alchemy import ImageAlchemy
+from .core.pipelines import run_inpaint_batch, INPAINT_BUCKET_STEP
+from .functionalities.enhancement import BATCH_OPERATIONS
+from .functionalities.manipulation import REMOVE_OBJECT_PROMPT
+
+MODULES = ("enhancement", "manipulation", "generative")
+
+# Arguments `enhance_batch` can apply to a whole batch, when the single-call method takes them too
+ENHANCE_BATCH_PARAMS = {"image", "strength", "prompt", "seed", "tier"}
+
+# Inpainting operations served by `run_inpaint_batch` -> their default prompt (None: required)
+INPAINT_OPERATIONS = {
+    "manipulation.inpaint": None,
+    "manipulation.add_object": None,
+    "manipulation.remove_object": REMOVE_OBJECT_PROMPT,
+}
+
+class ServiceOverloaded(RuntimeError):
+    """Raised by `AlchemyService.submit` when the request queue is full and `block=False`."""
+
+class _Request:
+    __slots__ = ("operation", "params", "future", "batch_key")
+
+    def __init__(self, operation: str, params: dict, future: asyncio.Future, batch_key: Hashable):
+        self.operation = operation
+        self.params = params
+        self.future = future
+        self.batch_key = batch_key
+
+class AlchemyService:
+    """
+    An asyncio front end to an `ImageAlchemy` engine.
+
+    Requests name an operation as "module.method" (e.g. "enhancement.denoise")
+    and pass its arguments as keywords. A scheduler task collects compatible
+    requests (same operation, parameters and resolution) for up to `batch_window`
+    seconds and runs them as one batched pipeline call; everything else runs one
+    request at a time. Models run on a dedicated worker thread, so the event loop
+    is never blocked by inference.
+
+    The queue holds at most `max_pending` requests. `submit` waits for room
+    (or raises `ServiceOverloaded` with `block=False`), and a timeout covers the
+    whole wait. A request that times out or is cancelled before its batch starts
+    is dropped from the batch; one that is already running completes, but its
+    result is discarded.
+
+    Example:
+        async with AlchemyService(ImageAlchemy()) as service:
+            result = await service.submit("enhancement.denoise", image=image, seed=0, timeout=60)
+    """
+    def __init__(
+        self,
+        alchemy: ImageAlchemy,
+        max_batch_size: int = 4,
+        batch_window: float = 0.02,
+        max_pending: int = 64,
+        default_timeout: float = None,
+        workers: int = 1
+    ):
+        """
+        Args:
+            alchemy (ImageAlchemy): The engine that runs the operations.
+            max_batch_size (int, optional): Maximum requests per batched pipeline call. Defaults to 4.
+            batch_window (float, optional): Seconds the first request of a batch waits for
+                                            compatible requests to join it. Defaults to 0.02.
+            max_pending (int, optional): Capacity of the request queue. Defaults to 64.
+            default_timeout (float, optional): Timeout in seconds of requests that do not set one.
+                                               Defaults to None (no timeout).
+            workers (int, optional): Worker threads, i.e. batches running at the same time.
+                                     Keep 1 unless every model fits on the device at once. Defaults to 1.
+        """
+        self.alchemy = alchemy
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+        self.workers = workers
+        self._scheduler = None
+        self._executor = None
+        self._queue = None
+        self._slots = None
+        self._groups = {}  # batch key -> (dispatch deadline, requests) collected by the scheduler
+        self._running = set()
+        self._single_ids = itertools.count()
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0,
+            "cancelled": 0, "batches": 0, "batched_requests": 0, "max_batch_size": 0,
+        }
+
+    async def start(self):
+        """Starts the scheduler and the worker threads."""
+        if self._scheduler is not None:
+            return
+        self._queue = asyncio.Queue(self.max_pending)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="alchemy-service")
+        self._scheduler = asyncio.get_running_loop().create_task(self._schedule())
+
+    async def stop(self):
+        """Stops accepting work, cancels queued requests and waits for running batches to finish."""
+        if self._scheduler is None:
+            return
+        self._scheduler.cancel()
+        try:
+            await self._scheduler
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+        # Requests the scheduler already took off the queue but had not dispatched yet
+        for _, requests in self._groups.values():
+            for request in requests:
+                request.future.cancel()
+        self._groups.clear()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self._scheduler = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def submit(self, operation: str, timeout: float = None, block: bool = True, **params) -> Any:
+        """
+        Runs an operation and returns its result.
+
+        Args:
+            operation (str): "module.method", e.g. "manipulation.remove_object".
+            timeout (float, optional): Seconds until `asyncio.TimeoutError`, including the time
+                                       spent queued. Defaults to the service's `default_timeout`.
+            block (bool, optional): Wait for room when the queue is full instead of
+                                    raising `ServiceOverloaded`. Defaults to True.
+            **params: Keyword arguments of the operation.
+
+        Returns:
+            Any: The operation's return value.
+        """
+        if self._scheduler is None:
+            raise RuntimeError("The service is not running; call start() first.")
+        self._resolve(operation)
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(operation, params, future, self._batch_key(operation, params))
+        self._stats["submitted"] += 1
+
+        async def enqueue_and_wait():
+            if block:
+                await self._queue.put(request)
+            else:
+                try:
+                    self._queue.put_nowait(request)
+                except asyncio.QueueFull:
+                    self._stats["rejected"] += 1
+                    raise ServiceOverloaded(f"{self.max_pending} requests are already pending")
+            return await future
+
+        try:
+            return await asyncio.wait_for(enqueue_and_wait(), timeout if timeout is not None else self.default_timeout)
+        except asyncio.TimeoutError:
+            self._stats["timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def stats(self) -> dict:
+        """Returns request and batching counters and the current queue depth."""
+        stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize() if self._queue is not None else 0
+        stats["mean_batch_size"] = stats["batched_requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _resolve(self, operation: str):
+        """Returns the bound method for "module.method", rejecting anything else."""
+        module_name, _, method_name = operation.partition(".")
+        if module_name not in MODULES or not method_name or method_name.startswith("_"):
+            raise ValueError(f"Unknown operation: {operation}")
+        method = getattr(getattr(self.alchemy, module_name), method_name, None)
+        if not callable(method):
+            raise ValueError(f"Unknown operation: {operation}")
+        return method
+
+    def _batch_key(self, operation: str, params: dict) -> Hashable:
+        """
+        Requests with equal keys can share a pipeline call. None means the request runs on its own.
+        """
+        image = params.get("image")
+        if not isinstance(image, Image.Image):
+            return None
+        module_name, _, method_name = operation.partition(".")
+        if module_name == "enhancement" and method_name in BATCH_OPERATIONS:
+            # Arguments the method does not take (e.g. a prompt for denoise) make the request run
+            # on its own, so that it fails as the direct call would
+            accepted = set(inspect.signature(getattr(self.alchemy.enhancement, method_name)).parameters)
+            if not set(params) <= ENHANCE_BATCH_PARAMS & accepted:
+                return None
+            if max(image.size) > 2 * self.alchemy.enhancement.tile_size:
+                return None  # tiled; batching happens across tiles instead
+            return (
+                "enhance", method_name, image.size, image.mode,
+                params.get("strength"), params.get("prompt"), params.get("tier")
+            )
+        if operation in INPAINT_OPERATIONS:
+            if not set(params) <= {"image", "mask", "prompt", "seed"}:
+                return None
+            if params.get("prompt", INPAINT_OPERATIONS[operation]) is None:
+                return None
+            return ("inpaint", image.size)
+        return None
+
+    async def _schedule(self):
+        loop = asyncio.get_running_loop()
+        groups = self._groups
+
+        def add(request):
+            if request.future.done():  # timed out or cancelled while queued
+                return
+            key = request.batch_key
+            if key is None:
+                key = ("single", next(self._single_ids))
+            if key not in groups:
+                groups[key] = (loop.time() + (self.batch_window if request.batch_key is not None else 0.0), [])
+            groups[key][1].append(request)
+
+        while True:
+            timeout = None
+            if groups:
+                timeout = max(0.0, min(deadline for deadline, _ in groups.values()) - loop.time())
+            try:
+                add(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                pass
+
+            now = loop.time()
+            ready = [key for key, (deadline, requests) in groups.items()
+                     if deadline <= now or len(requests) >= self.max_batch_size]
+            for key in ready:
+                await self._slots.acquire()
+                # Requests that arrived while every worker was busy can still join
+                while not self._queue.empty():
+                    add(self._queue.get_nowait())
+                deadline, requests = groups.pop(key)
+                batch = [r for r in requests[:self.max_batch_size] if not r.future.done()]
+                if len(requests) > self.max_batch_size:
+                    groups[key] = (deadline, requests[self.max_batch_size:])
+                if not batch:
+                    self._slots.release()
+                    continue
+                task = loop.create_task(self._run(batch))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[_Request]):
+        loop = asyncio.get_running_loop()
+        kind = batch[0].batch_key[0] if batch[0].batch_key else None
+        calls = [(r.operation, r.params) for r in batch]
+        self._stats["batches"] += 1
+        self._stats["batched_requests"] += len(batch)
+        self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+        try:
+            results = await loop.run_in_executor(self._executor, self._execute, kind, calls)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            self._stats["failed"] += len(batch)
+        else:
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+            self._stats["completed"] += len(batch)
+        finally:
+            self._slots.release()
+
+    def _execute(self, kind: str, calls: list) -> list:
+        """Runs one batch on a worker thread."""
+        if kind == "enhance":
+            operation, params = calls[0]
+            return self.alchemy.enhancement.enhance_batch(
+                operation.partition(".")[2],
+                [p["image"] for _, p in calls],
+                strength=params.get("strength"),
+                prompt=params.get("prompt"),
+                seeds=[p.get("seed") for _, p in calls],
+                tier=params.get("tier")
+            )
+        if kind == "inpaint":
+            manipulation = self.alchemy.manipulation
+            items = [
+                (p["image"], manipulation._get_mask(p["image"], p["mask"]), p.get("prompt", INPAINT_OPERATIONS[op]))
+                for op, p in calls
+            ]
+            return run_inpaint_batch(
+                self.alchemy.model_loader, items, batch_size=len(items), bucket_step=INPAINT_BUCKET_STEP,
+                region="auto", seed=[p.get("seed") for _, p in calls]
+            )
+        operation, params = calls[0]
+        return [self._resolve(operation)(**params)]
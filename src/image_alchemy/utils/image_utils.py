@@ -1,7 +1,12 @@
 # --- FILENAME: src/image_alchemy/utils/image_utils.py ---
+import hashlib
+import io
 import numpy as np
 from PIL import Image
-from typing import List
+from typing import List, Tuple, Union
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
 
 def pil_to_numpy(image: Image.Image) -> np.ndarray:
     """Convert a PIL Image to a NumPy array."""
@@ -11,6 +16,28 @@ def numpy_to_pil(array: np.ndarray) -> Image.Image:
     """Convert a NumPy array to a PIL Image."""
     return Image.fromarray(array.astype(np.uint8))
 
+def load_image(source: Union[str, bytes, Image.Image]) -> Image.Image:
+    """Decodes an image from a file path or encoded bytes; PIL Images pass through. Returns RGB."""
+    if isinstance(source, Image.Image):
+        return source.convert("RGB")
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        return image.convert("RGB")
+
+def encode_image(image: Image.Image, format: str = "PNG", **save_kwargs) -> bytes:
+    """Encodes a PIL Image to bytes in the given format (e.g. "PNG", "JPEG", "WEBP")."""
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **save_kwargs)
+    return buffer.getvalue()
+
+def image_content_hash(image: Image.Image) -> str:
+    """Returns a hex digest identifying the pixel content of a PIL Image."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
 def create_mask_from_box(image_size: tuple, box: List[int]) -> Image.Image:
     """Creates a binary mask image from a bounding box."""
     width, height = image_size
@@ -29,4 +56,56 @@ def combine_image_and_mask(image: Image.Image, mask: Image.Image) -> Image.Image
     red_overlay = Image.new("RGBA", image.size, (255, 0, 0, 0))
     red_overlay.paste((255,0,0,128), mask=mask.convert("L"))
 
-    return Image.alpha_composite(image_rgba, red_overlay)
\ No newline at end of file
+    return Image.alpha_composite(image_rgba, red_overlay)
+
+def transplant_object(
+    image: Image.Image,
+    source_mask: Image.Image,
+    destination_box: List[int],
+    dilation: int = 7
+) -> Tuple[Image.Image, Image.Image, Image.Image]:
+    """
+    Moves the pixels under `source_mask` into `destination_box` as the initialization
+    for a single inpainting pass. The object keeps its aspect ratio: it is scaled to
+    fit the box and centered in it. The vacated area is pre-filled with a fast classical
+    (Telea) inpaint so the diffusion model starts from a plausible background.
+
+    Returns:
+        Tuple[Image.Image, Image.Image, Image.Image]: The initialized image and the
+        (dilated) masks of the vacated source region and of the placed object.
+    """
+    image_np = np.array(image.convert("RGB"))
+    source = np.array(source_mask.convert("L")) > 127
+    if not source.any():
+        raise ValueError("source_mask is empty; there is no object to move.")
+
+    ys, xs = np.nonzero(source)
+    x1, y1, x2, y2 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+    object_np = image_np[y1:y2, x1:x2]
+    object_mask = source[y1:y2, x1:x2].astype(np.uint8) * 255
+
+    kernel = np.ones((dilation, dilation), np.uint8)
+    source_region = cv2.dilate(source.astype(np.uint8) * 255, kernel)
+    init_np = cv2.inpaint(image_np, source_region, 5, cv2.INPAINT_TELEA)
+
+    height, width = source.shape
+    bx1, by1 = max(0, int(destination_box[0])), max(0, int(destination_box[1]))
+    bx2, by2 = min(width, int(destination_box[2])), min(height, int(destination_box[3]))
+    if bx2 <= bx1 or by2 <= by1:
+        raise ValueError("destination_box does not overlap the image.")
+    scale = min((bx2 - bx1) / (x2 - x1), (by2 - by1) / (y2 - y1))
+    object_width = min(bx2 - bx1, max(1, round((x2 - x1) * scale)))
+    object_height = min(by2 - by1, max(1, round((y2 - y1) * scale)))
+    dx1 = bx1 + (bx2 - bx1 - object_width) // 2
+    dy1 = by1 + (by2 - by1 - object_height) // 2
+    dx2, dy2 = dx1 + object_width, dy1 + object_height
+    object_np = cv2.resize(object_np, (object_width, object_height), interpolation=cv2.INTER_LINEAR)
+    object_mask = cv2.resize(object_mask, (object_width, object_height), interpolation=cv2.INTER_NEAREST)
+    region = init_np[dy1:dy2, dx1:dx2]
+    region[:] = np.where(object_mask[..., None] > 127, object_np, region)
+
+    destination_region = np.zeros_like(source_region)
+    destination_region[dy1:dy2, dx1:dx2] = object_mask
+    destination_region = cv2.dilate(destination_region, kernel)
+
+    return Image.fromarray(init_np), Image.fromarray(source_region), Image.fromarray(destination_region)
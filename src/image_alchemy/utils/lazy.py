@@ -0,0 +1,33 @@
+# --- FILENAME: src/image_alchemy/utils/lazy.py ---
+import importlib
+import types
+
+class LazyModule(types.ModuleType):
+    """
+    A module placeholder that imports the real module on first attribute access.
+
+    Heavy dependencies (torch, diffusers, OpenCV, matplotlib, ...) are bound this
+    way at module level, so `import image_alchemy` stays fast and a process only
+    pays for the libraries its code path actually touches.
+    """
+    def __init__(self, name: str):
+        super().__init__(name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self) -> types.ModuleType:
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns `name` if it is already imported, otherwise a `LazyModule` for it."""
+    module = importlib.sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
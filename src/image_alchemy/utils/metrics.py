@@ -0,0 +1,321 @@
+# --- FILENAME: src/image_alchemy/utils/metrics.py ---
+"""
+Headless image quality metrics for scoring pipeline outputs in bulk.
+
+Every metric is computed with whole-array NumPy/OpenCV operations, with no
+per-pixel Python and no plotting. `compare` scores one (before, after) pair:
+SSIM, PSNR and color histogram distance, plus the same metrics inside and
+outside a mask (e.g. the inpainted region versus the context that should be
+untouched). `compare_batch` streams the scores of many pairs, optionally on
+a process pool. `write_metrics` streams them to CSV or JSON Lines. With
+`fast=True` images are first downsampled, which is enough to rank outputs
+or catch regressions.
+
+Example:
+    rows = compare_batch(zip(reference_paths, output_paths), fast=True, workers=4)
+    write_metrics(rows, "scores.csv")
+"""
+import csv
+import itertools
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .image_utils import load_image
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+ImageLike = Union[str, bytes, Image.Image, np.ndarray]
+
+SSIM_WINDOW = 7  # uniform window, as in skimage.metrics.structural_similarity
+FAST_MAX_SIDE = 256
+
+def _as_rgb(image: ImageLike) -> np.ndarray:
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            image = image[..., None]
+        if image.shape[2] == 1:
+            return np.repeat(image, 3, axis=2)
+        # Alpha is dropped, as PIL's convert("RGB") does for RGBA images
+        return image[..., :3]
+    return np.asarray(load_image(image))
+
+def _as_mask(mask: ImageLike) -> np.ndarray:
+    if isinstance(mask, np.ndarray):
+        return (mask if mask.ndim == 2 else mask[..., 0]) > 0
+    if isinstance(mask, Image.Image):
+        return np.asarray(mask.convert("L")) > 127
+    return np.asarray(load_image(mask))[..., 0] > 127
+
+def prepare_pair(
+    before: ImageLike,
+    after: ImageLike,
+    mask: ImageLike = None,
+    fast: bool = False,
+    max_side: int = FAST_MAX_SIDE
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decodes a pair (and mask) into uint8 RGB arrays of the same size.
+    `after` (and the mask) are resized to `before`; with `fast`, all are downsampled
+    so that the longer side is at most `max_side`.
+    """
+    before, after = _as_rgb(before), _as_rgb(after)
+    mask = _as_mask(mask) if mask is not None else None
+    height, width = before.shape[:2]
+    if fast and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        before = cv2.resize(before, (width, height), interpolation=cv2.INTER_AREA)
+    if after.shape[:2] != (height, width):
+        after = cv2.resize(after, (width, height), interpolation=cv2.INTER_AREA)
+    if mask is not None and mask.shape != (height, width):
+        mask = cv2.resize(mask.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST).astype(bool)
+    return before, after, mask
+
+def to_gray(pixels: np.ndarray) -> np.ndarray:
+    """Luma of a uint8 RGB array as float64."""
+    return pixels.astype(np.float64) @ np.array([0.299, 0.587, 0.114])
+
+def ssim_map(before: np.ndarray, after: np.ndarray, data_range: float = 255.0) -> np.ndarray:
+    """
+    Per-pixel SSIM of two gray-scale arrays (Wang et al.) over a 7x7 uniform window
+    with sample covariance and reflected borders, matching skimage's defaults.
+    """
+    before = before.astype(np.float64)
+    after = after.astype(np.float64)
+    size = (SSIM_WINDOW, SSIM_WINDOW)
+    n = SSIM_WINDOW * SSIM_WINDOW
+    cov_norm = n / (n - 1)
+
+    def mean(x):
+        return cv2.boxFilter(x, -1, size, borderType=cv2.BORDER_REFLECT)
+
+    mu_b, mu_a = mean(before), mean(after)
+    var_b = cov_norm * (mean(before * before) - mu_b * mu_b)
+    var_a = cov_norm * (mean(after * after) - mu_a * mu_a)
+    cov = cov_norm * (mean(before * after) - mu_b * mu_a)
+    c1 = (0.01 * data_range) ** 2
+    c2 = (0.03 * data_range) ** 2
+    return ((2 * mu_b * mu_a + c1) * (2 * cov + c2)) / ((mu_b ** 2 + mu_a ** 2 + c1) * (var_b + var_a + c2))
+
+def _mean_ssim(s: np.ndarray, mask: np.ndarray = None) -> float:
+    if mask is not None:
+        return float(s[mask].mean()) if mask.any() else float("nan")
+    pad = (SSIM_WINDOW - 1) // 2  # border pixels are excluded, as in skimage
+    return float(s[pad:-pad or None, pad:-pad or None].mean())
+
+def ssim(before: np.ndarray, after: np.ndarray, mask: np.ndarray = None) -> float:
+    """Mean SSIM of two uint8 RGB arrays on luma, optionally only over `mask`."""
+    return _mean_ssim(ssim_map(to_gray(before), to_gray(after)), mask)
+
+def psnr(before: np.ndarray, after: np.ndarray, mask: np.ndarray = None, data_range: float = 255.0) -> float:
+    """Peak signal-to-noise ratio in dB, optionally only over `mask`. Identical inputs give inf."""
+    diff = before.astype(np.float64) - after.astype(np.float64)
+    squared = diff * diff
+    if mask is not None:
+        if not mask.any():
+            return float("nan")
+        squared = squared[mask]
+    mse = squared.mean()
+    return float("inf") if mse == 0 else float(10 * np.log10(data_range ** 2 / mse))
+
+def channel_histograms(pixels: np.ndarray, bins: int = 256, mask: np.ndarray = None) -> np.ndarray:
+    """Per-channel pixel counts, shape (3, bins), optionally only over `mask`."""
+    values = pixels[mask] if mask is not None else pixels.reshape(-1, 3)
+    index = values.astype(np.int64) * bins // 256 + np.arange(3) * bins
+    return np.bincount(index.ravel(), minlength=3 * bins).reshape(3, bins)
+
+def histogram_distance(
+    before: np.ndarray, after: np.ndarray, mask: np.ndarray = None, bins: int = 64, method: str = "bhattacharyya"
+) -> float:
+    """
+    Distance between the color distributions of two images, averaged over channels.
+
+    Args:
+        method (str, optional): "bhattacharyya" (0 = identical, 1 = disjoint) or "emd" (earth mover's
+                                distance in units of the full intensity range). Defaults to "bhattacharyya".
+    """
+    h_before = channel_histograms(before, bins, mask).astype(np.float64)
+    h_after = channel_histograms(after, bins, mask).astype(np.float64)
+    total_b = h_before.sum(axis=1, keepdims=True)
+    total_a = h_after.sum(axis=1, keepdims=True)
+    if not total_b.all() or not total_a.all():
+        return float("nan")
+    p, q = h_before / total_b, h_after / total_a
+    if method == "bhattacharyya":
+        coefficient = np.sqrt(p * q).sum(axis=1)
+        return float(np.sqrt(np.clip(1 - coefficient, 0, None)).mean())
+    if method == "emd":
+        return float(np.abs(np.cumsum(p - q, axis=1)).sum(axis=1).mean() / bins)
+    raise ValueError(f"Unsupported histogram distance: {method}")
+
+def compare(
+    before: ImageLike,
+    after: ImageLike,
+    mask: ImageLike = None,
+    fast: bool = False,
+    max_side: int = FAST_MAX_SIDE,
+    bins: int = 64
+) -> Dict[str, float]:
+    """
+    Scores one (before, after) pair.
+
+    Args:
+        before (ImageLike): Reference image (path, encoded bytes, PIL Image or uint8 array).
+        after (ImageLike): Image to score. Resized to `before` if needed.
+        mask (ImageLike, optional): Region of interest (white). Adds "<metric>_mask" and
+                                    "<metric>_outside" scores. Defaults to None.
+        fast (bool, optional): Downsample to `max_side` before scoring. Defaults to False.
+        max_side (int, optional): Longer side in fast mode. Defaults to 256.
+        bins (int, optional): Histogram bins per channel. Defaults to 64.
+
+    Returns:
+        Dict[str, float]: "ssim", "psnr" and "hist_distance" (plus masked variants).
+    """
+    before, after, mask = prepare_pair(before, after, mask, fast, max_side)
+    # One SSIM map serves the whole-image and the masked scores
+    s = ssim_map(to_gray(before), to_gray(after))
+    scores = {
+        "width": before.shape[1],
+        "height": before.shape[0],
+        "ssim": _mean_ssim(s),
+        "psnr": psnr(before, after),
+        "hist_distance": histogram_distance(before, after, bins=bins),
+    }
+    if mask is not None:
+        for suffix, region in (("mask", mask), ("outside", ~mask)):
+            scores[f"ssim_{suffix}"] = _mean_ssim(s, region)
+            scores[f"psnr_{suffix}"] = psnr(before, after, region)
+            scores[f"hist_distance_{suffix}"] = histogram_distance(before, after, region, bins=bins)
+    return scores
+
+def _compare_item(item: tuple) -> Dict[str, float]:
+    """Scores one batch item; module-level so process pools can pickle it."""
+    index, name, before, after, mask, options = item
+    try:
+        row = {"index": index, "name": name, **compare(before, after, mask, **options), "error": None}
+    except Exception as e:
+        row = {"index": index, "name": name, "error": f"{type(e).__name__}: {e}"}
+    return row
+
+def _compare_chunk(chunk: list) -> List[Dict[str, float]]:
+    return [_compare_item(item) for item in chunk]
+
+def compare_batch(
+    pairs: Iterable[Tuple],
+    masks: Iterable[ImageLike] = None,
+    fast: bool = False,
+    max_side: int = FAST_MAX_SIDE,
+    bins: int = 64,
+    workers: int = None,
+    chunk_size: int = 8
+) -> Iterator[Dict[str, float]]:
+    """
+    Scores many (before, after) pairs, yielding one row per pair in input order.
+
+    Pairs may be given as (before, after) or (name, before, after). Paths are the
+    cheapest inputs for a process pool, since workers decode them themselves.
+    `pairs` is consumed lazily: with a pool, at most 2 * `workers` chunks are in
+    flight, so memory stays bounded however many pairs there are.
+    A pair that fails to load or score yields a row with an "error" message
+    instead of stopping the batch.
+
+    Args:
+        pairs (Iterable[Tuple]): The pairs to score.
+        masks (Iterable[ImageLike], optional): One mask per pair (or None). Defaults to None.
+        fast (bool, optional): Downsample before scoring, see `compare`. Defaults to False.
+        max_side (int, optional): Longer side in fast mode. Defaults to 256.
+        bins (int, optional): Histogram bins per channel. Defaults to 64.
+        workers (int, optional): Processes to spread the work over. None or 1 scores in this process.
+        chunk_size (int, optional): Pairs sent to a worker at a time. Defaults to 8.
+
+    Yields:
+        Dict[str, float]: "index", "name", the scores of `compare` and "error".
+    """
+    options = {"fast": fast, "max_side": max_side, "bins": bins}
+    masks = iter(masks) if masks is not None else None
+
+    def items():
+        for index, pair in enumerate(pairs):
+            if len(pair) == 3:
+                name, before, after = pair
+            else:
+                before, after = pair
+                name = before if isinstance(before, str) else str(index)
+            mask = next(masks) if masks is not None else None
+            yield index, name, before, after, mask, options
+
+    if not workers or workers <= 1:
+        yield from map(_compare_item, items())
+        return
+    # Unlike Executor.map, which submits the whole iterable up front, keep a bounded window of chunks
+    items = items()
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = list(itertools.islice(items, chunk_size))
+            if chunk:
+                in_flight.append(pool.submit(_compare_chunk, chunk))
+            if not in_flight:
+                return
+            if not chunk or len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+
+def write_metrics(rows: Iterable[Dict], path: str) -> int:
+    """
+    Streams metric rows to a ".csv" or ".json"/".jsonl" (JSON Lines) file as they arrive.
+    CSV columns are taken from the first successful row. JSON has no infinity, so the
+    infinite PSNR of identical regions is written as null there (and as "inf" in CSV).
+
+    Returns:
+        int: The number of rows written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    as_csv = path.lower().endswith(".csv")
+    count = 0
+    writer = None
+    pending = []  # failed rows seen before the first successful one, which fixes the CSV columns
+    with open(path, "w", newline="") as f:
+        for row in rows:
+            count += 1
+            if not as_csv:
+                finite = {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in row.items()}
+                f.write(json.dumps(finite, allow_nan=False) + "\n")
+                f.flush()
+                continue
+            if writer is None:
+                if row.get("error"):
+                    pending.append(row)
+                    continue
+                writer = csv.DictWriter(f, fieldnames=list(row), restval="", extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(pending)
+            writer.writerow(row)
+            f.flush()
+        if as_csv and writer is None and pending:
+            writer = csv.DictWriter(f, fieldnames=list(pending[0]))
+            writer.writeheader()
+            writer.writerows(pending)
+    return count
+
+def summarize(rows: Iterable[Dict], keys: List[str] = ("ssim", "psnr", "hist_distance")) -> Dict[str, Dict[str, float]]:
+    """Mean, min and max of each metric over rows without errors (infinite PSNRs are skipped)."""
+    values = {key: [] for key in keys}
+    for row in rows:
+        if row.get("error"):
+            continue
+        for key in keys:
+            value = row.get(key)
+            if value is not None and np.isfinite(value):
+                values[key].append(value)
+    return {
+        key: {"mean": float(np.mean(v)), "min": float(np.min(v)), "max": float(np.max(v)), "count": len(v)}
+        for key, v in values.items() if v
+    }
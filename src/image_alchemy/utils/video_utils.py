@@ -0,0 +1,83 @@
+# --- FILENAME: src/image_alchemy/utils/video_utils.py ---
+import os
+import numpy as np
+from PIL import Image, GifImagePlugin
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+class FrameWriter:
+    """
+    Writes frames to an MP4 or GIF file as they are produced.
+
+    Frames are encoded and flushed one at a time, so a long sequence never has
+    to be held in memory. The container is chosen from the file extension.
+
+    Example:
+        with FrameWriter("zoom.mp4", fps=12) as writer:
+            for frame in frames:
+                writer.write(frame)
+    """
+    def __init__(self, path: str, fps: float = 12, loop: int = 0):
+        """
+        Args:
+            path (str): Output file, ending in .mp4 or .gif.
+            fps (float, optional): Frames per second. Defaults to 12.
+            loop (int, optional): GIF loop count, 0 loops forever. Defaults to 0.
+        """
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.format = os.path.splitext(path)[1].lower().lstrip(".")
+        if self.format not in ("mp4", "gif"):
+            raise ValueError(f"Unsupported video format: {self.format}. Use .mp4 or .gif")
+        self.size = None
+        self.frame_count = 0
+        self._writer = None
+
+    def write(self, frame: Image.Image):
+        """Encodes one frame. Frames of a different size are resized to the first frame's size."""
+        frame = frame.convert("RGB")
+        if self.size is None:
+            self.size = frame.size
+            self._open()
+        elif frame.size != self.size:
+            frame = frame.resize(self.size, Image.LANCZOS)
+
+        if self.format == "mp4":
+            self._writer.write(cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR))
+        else:
+            quantized = frame.quantize(256)
+            for chunk in GifImagePlugin.getdata(quantized, duration=int(1000 / self.fps), include_color_table=True):
+                self._writer.write(chunk)
+            self._writer.flush()
+        self.frame_count += 1
+
+    def _open(self):
+        if self.format == "mp4":
+            self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, self.size)
+            if not self._writer.isOpened():
+                raise IOError(f"Could not open video writer for {self.path}")
+        else:
+            self._writer = open(self.path, "wb")
+            # The global header only describes the canvas; every frame carries its own palette
+            header, _ = GifImagePlugin.getheader(Image.new("P", self.size), info={"loop": self.loop})
+            for chunk in header:
+                self._writer.write(chunk)
+
+    def close(self):
+        """Finalises the file."""
+        if self._writer is None:
+            return
+        if self.format == "mp4":
+            self._writer.release()
+        else:
+            self._writer.write(b";")  # GIF trailer
+            self._writer.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,9 +1,9 @@
 # --- FILENAME: src/image_alchemy/utils/visualization.py ---
-import matplotlib.pyplot as plt
 from PIL import Image
-import numpy as np
-from skimage.metrics import structural_similarity as ssim
-import cv2
+from . import metrics
+from .lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
 
 def compare_images(
     image_before: Image.Image,
@@ -30,28 +30,30 @@ def compare_images(
 def plot_difference_map(
     image_before: Image.Image,
     image_after: Image.Image,
+    mask: Image.Image = None,
     figsize: tuple = (18, 6)
 ):
     """
-    Displays the original image, the modified image, and a heatmap of their differences.
+    Displays the original image, the modified image, and a heatmap of their differences
+    (the per-pixel SSIM map of `metrics.ssim_map`; darker is more changed).
     """
-    before_np = np.array(image_before.convert('L'))
-    after_np = np.array(image_after.resize(image_before.size).convert('L'))
-
-    # Calculate SSIM and difference map
-    ssim_score, diff = ssim(before_np, after_np, full=True)
-    diff = (diff * 255).astype("uint8")
+    before_np, after_np, mask_np = metrics.prepare_pair(image_before, image_after, mask)
+    scores = metrics.compare(before_np, after_np, mask_np)
+    diff = metrics.ssim_map(metrics.to_gray(before_np), metrics.to_gray(after_np))
 
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=figsize)
-    ax1.imshow(image_before)
+    ax1.imshow(before_np)
     ax1.set_title("Original")
     ax1.axis('off')
 
-    ax2.imshow(image_after)
-    ax2.set_title(f"Modified\nSSIM: {ssim_score:.4f}")
+    title = f"Modified\nSSIM: {scores['ssim']:.4f}  PSNR: {scores['psnr']:.2f} dB"
+    if mask_np is not None:
+        title += f"\nMasked SSIM: {scores['ssim_mask']:.4f}  Outside: {scores['ssim_outside']:.4f}"
+    ax2.imshow(after_np)
+    ax2.set_title(title)
     ax2.axis('off')
 
-    diff_plot = ax3.imshow(diff, cmap='viridis')
+    diff_plot = ax3.imshow(diff, cmap='viridis', vmin=-1, vmax=1)
     ax3.set_title("Difference Map")
     ax3.axis('off')
     fig.colorbar(diff_plot, ax=ax3)
@@ -67,23 +69,23 @@ def plot_histogram_comparison(
     """
     Plots the color histograms of two images to show changes in color distribution.
     """
-    before_cv = cv2.cvtColor(np.array(image_before), cv2.COLOR_RGB_BGR)
-    after_cv = cv2.cvtColor(np.array(image_after), cv2.COLOR_RGB_BGR)
+    before_np, after_np, _ = metrics.prepare_pair(image_before, image_after)
+    hist_before = metrics.channel_histograms(before_np)
+    hist_after = metrics.channel_histograms(after_np)
+    distance = metrics.histogram_distance(before_np, after_np)
 
-    colors = ('b', 'g', 'r')
+    colors = ('r', 'g', 'b')
     plt.figure(figsize=figsize)
-    
+
+    for i, color in enumerate(colors):
+        plt.plot(hist_before[i], color=color, linestyle='--')
     for i, color in enumerate(colors):
-        hist_before = cv2.calcHist([before_cv], [i], None, [256], [0, 256])
-        plt.plot(hist_before, color=color, linestyle='--')
-        
-        hist_after = cv2.calcHist([after_cv], [i], None, [256], [0, 256])
-        plt.plot(hist_after, color=color)
+        plt.plot(hist_after[i], color=color)
 
-    plt.title('Histogram Comparison (Dashed=Before, Solid=After)')
+    plt.title(f'Histogram Comparison (Dashed=Before, Solid=After)\nBhattacharyya distance: {distance:.4f}')
     plt.xlabel('Pixel Intensity')
     plt.ylabel('Count')
     plt.xlim([0, 256])
-    plt.legend(['Blue (Before)', 'Green (Before)', 'Red (Before)', 'Blue (After)', 'Green (After)', 'Red (After)'])
+    plt.legend(['Red (Before)', 'Green (Before)', 'Blue (Before)', 'Red (After)', 'Green (After)', 'Blue (After)'])
     plt.grid(True, alpha=0.3)
-    plt.show()
\ No newline at end of file
+    plt.show()
@@ -0,0 +1,88 @@
+# --- FILENAME: tests/test_cli.py ---
+"""The bulk processing command line, run on stub models."""
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy import alchemy as alchemy_module
+from image_alchemy import cli
+from image_alchemy.core.stubs import StubModelLoader
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Makes the CLI build stub engines; returns the list of engines built."""
+    built = []
+    engine_class = alchemy_module.ImageAlchemy
+
+    def fake_engine(**kwargs):
+        built.append(engine_class(model_loader=StubModelLoader()))
+        return built[-1]
+
+    monkeypatch.setattr(alchemy_module, "ImageAlchemy", fake_engine)
+    return built
+
+def write_images(directory, names):
+    os.makedirs(directory, exist_ok=True)
+    for i, name in enumerate(names):
+        pixels = np.random.RandomState(i).randint(0, 256, (32, 48, 3)).astype(np.uint8)
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.fromarray(pixels).save(path)
+
+def read_entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_manifest_skips_finished_items(tmp_path, engines):
+    inputs, outputs = str(tmp_path / "in"), str(tmp_path / "out")
+    write_images(inputs, ["a.png", "b.jpg", "nested/c.png"])
+    argv = ["enhancement.denoise", inputs, "-o", outputs, "--seed", "0", "-p", "strength=0.5"]
+
+    assert cli.main(argv) == 0
+    entries = read_entries(os.path.join(outputs, "manifest.jsonl"))
+    assert sorted(e["input"] for e in entries if e["status"] == "done") == ["a.png", "b.jpg", os.path.join("nested", "c.png")]
+    assert os.path.exists(os.path.join(outputs, "nested", "c.png"))
+
+    # Nothing is left to do, so no engine is built
+    assert cli.main(argv) == 0
+    assert len(engines) == 1
+
+    # A missing output is redone even though the manifest lists it
+    os.remove(os.path.join(outputs, "b.png"))
+    assert cli.main(argv) == 0
+    assert len(engines) == 2
+    assert read_entries(os.path.join(outputs, "manifest.jsonl"))[-1]["input"] == "b.jpg"
+
+def test_shards_split_the_inputs(tmp_path, engines):
+    inputs, outputs = str(tmp_path / "in"), str(tmp_path / "out")
+    names = [f"{i}.png" for i in range(8)]
+    write_images(inputs, names)
+    shards = []
+    for index in range(2):
+        argv = ["enhancement.denoise", inputs, "-o", outputs, "--seed", "0", "--num-shards", "2", "--shard-index", str(index)]
+        assert cli.main(argv) == 0
+        shards.append({e["input"] for e in read_entries(os.path.join(outputs, f"manifest-{index}-of-2.jsonl"))})
+    assert not shards[0] & shards[1]
+    assert shards[0] | shards[1] == set(names)
+    assert sorted(os.listdir(outputs)) == sorted(names + ["manifest-0-of-2.jsonl", "manifest-1-of-2.jsonl"])
+
+@pytest.mark.parametrize("layout", [
+    {"first": ["x.png"], "second": ["x.png"]},  # the same relative path under two input directories
+    {"first": ["x.png", "x.jpg"]},               # two inputs with the same output name
+])
+def test_colliding_outputs_are_rejected(tmp_path, engines, capsys, layout):
+    for directory, names in layout.items():
+        write_images(str(tmp_path / directory), names)
+    argv = ["enhancement.denoise", *[str(tmp_path / d) for d in layout], "-o", str(tmp_path / "out")]
+    assert cli.main(argv) == 2
+    assert "Conflicting inputs" in capsys.readouterr().err
+    assert not engines and not os.path.exists(tmp_path / "out")
+
+def test_malformed_param_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["enhancement.denoise", str(tmp_path), "-o", str(tmp_path / "out"), "-p", "strength"])
+    assert exit_info.value.code == 2
+    assert "expected KEY=VALUE" in capsys.readouterr().err
@@ -0,0 +1,46 @@
+# --- FILENAME: tests/test_enhancement.py ---
+"""Streaming enhancement (`iter_enhance`) on stub models."""
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.core import classical
+from image_alchemy.core.stubs import stub_alchemy
+
+def make_image(seed: int) -> Image.Image:
+    return Image.fromarray(np.random.RandomState(seed).randint(0, 256, (48, 64, 3)).astype(np.uint8))
+
+def loaded_models(alchemy) -> set:
+    return set(alchemy.model_loader.memory_stats()["models"])
+
+def test_unknown_operation_fails_on_call():
+    alchemy = stub_alchemy()
+    with pytest.raises(ValueError):
+        alchemy.enhancement.iter_enhance("dehaze_everything", [make_image(0)])
+    assert not loaded_models(alchemy)
+
+def test_models_load_on_call():
+    alchemy = stub_alchemy()
+    results = alchemy.enhancement.iter_enhance("denoise", [make_image(0)])
+    assert any("+" in key for key in loaded_models(alchemy))
+    assert len(list(results)) == 1
+
+def test_results_match_single_calls():
+    alchemy = stub_alchemy()
+    images = [make_image(i) for i in range(3)]
+    streamed = list(alchemy.enhancement.iter_enhance("denoise", [(image, i) for i, image in enumerate(images)]))
+    for i, (image, result) in enumerate(zip(images, streamed)):
+        assert np.array_equal(np.asarray(result), np.asarray(alchemy.enhancement.denoise(image, seed=i)))
+
+def test_fast_tier_runs_the_classical_algorithm():
+    alchemy = stub_alchemy()
+    images = [make_image(i) for i in range(3)]
+    streamed = list(alchemy.enhancement.iter_enhance("correct_light", images, tier="fast"))
+    assert not loaded_models(alchemy)
+    for image, result in zip(images, streamed):
+        assert np.array_equal(np.asarray(result), np.asarray(classical.correct_light(image)))
+
+def test_quality_tier_diffuses_correct_light():
+    alchemy = stub_alchemy()
+    list(alchemy.enhancement.iter_enhance("correct_light", [make_image(0)], tier="quality"))
+    assert any("+" in key for key in loaded_models(alchemy))
@@ -0,0 +1,33 @@
+# --- FILENAME: tests/test_generative_zoom.py ---
+"""Keyframe scheduling of `iter_generative_zoom` on stub pipelines."""
+import threading
+
+import pytest
+from PIL import Image
+
+from image_alchemy.core.stubs import stub_alchemy
+
+@pytest.mark.parametrize("num_steps, interpolation_factor, keyframes", [
+    (4, 1, 4),
+    (4, 2, 2),
+    (5, 2, 3),
+    (7, 3, 3),
+    (1, 4, 1),
+])
+def test_every_keyframe_is_emitted(num_steps, interpolation_factor, keyframes):
+    alchemy = stub_alchemy()
+    frames = alchemy.generative.generative_zoom(
+        Image.new("RGB", (64, 48), (90, 120, 150)), "a forest",
+        num_steps=num_steps, interpolation_factor=interpolation_factor, seed=0
+    )
+    assert len(frames) == num_steps + 1
+    assert len(alchemy.model_loader.get_sd_pipeline().batch_sizes) == keyframes
+
+def test_interpolation_threads_stop_with_the_generator():
+    alchemy = stub_alchemy()
+    frames = alchemy.generative.iter_generative_zoom(
+        Image.new("RGB", (64, 48)), "a forest", num_steps=6, interpolation_factor=3
+    )
+    next(frames), next(frames)
+    frames.close()
+    assert not [t for t in threading.enumerate() if t.name.startswith("zoom-interp")]
@@ -0,0 +1,153 @@
+# --- FILENAME: tests/test_instrumentation.py ---
+"""Spans, counters and exporters of `core.instrumentation`."""
+import io
+import json
+import urllib.request
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.core import instrumentation
+from image_alchemy.core.instrumentation import Instrumentation, JsonLogExporter, PrometheusExporter, Recorder
+from image_alchemy.core.stubs import stub_alchemy
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+        self.counts = []
+
+    def export_span(self, span):
+        self.spans.append(span)
+
+    def export_count(self, name, value, labels):
+        self.counts.append((name, value, labels))
+
+@pytest.fixture
+def exporter():
+    """Installs a `Recorder` feeding a `CollectingExporter` for the duration of a test."""
+    exporter = CollectingExporter()
+    previous = instrumentation.set_instrumentation(Recorder(exporters=[exporter], buckets=(0.1, 1.0)))
+    yield exporter
+    instrumentation.set_instrumentation(previous)
+
+def spans_by_name(exporter) -> dict:
+    return {span.name: span for span in exporter.spans}
+
+def test_nested_spans_form_a_tree(exporter):
+    with instrumentation.span("request", user="a") as request:
+        with instrumentation.span("load"):
+            pass
+        with pytest.raises(ValueError):
+            with instrumentation.span("encode") as encode:
+                encode.set(tokens=77)
+                raise ValueError("bad prompt")
+        request.set(status="failed")
+    with instrumentation.span("next"):
+        pass
+
+    spans = spans_by_name(exporter)
+    # Children finish first
+    assert [span.name for span in exporter.spans] == ["load", "encode", "request", "next"]
+    assert spans["request"].parent_id is None
+    assert spans["load"].parent_id == spans["encode"].parent_id == spans["request"].span_id
+    assert spans["load"].trace_id == spans["encode"].trace_id == spans["request"].trace_id
+    assert spans["next"].trace_id != spans["request"].trace_id
+    assert spans["request"].attributes == {"user": "a", "status": "failed"}
+    assert spans["encode"].attributes == {"tokens": 77}
+    assert spans["encode"].error == "ValueError: bad prompt"
+    assert spans["request"].duration >= spans["load"].duration + spans["encode"].duration
+
+def test_counters_and_histograms_are_aggregated(exporter):
+    recorder = instrumentation.get_instrumentation()
+    instrumentation.count("model.loads", model="sam")
+    instrumentation.count("model.loads", 2, model="sam")
+    instrumentation.count("model.loads", model="sd")
+    instrumentation.observe("latency", 0.05)
+    instrumentation.observe("latency", 0.5)
+
+    metrics = recorder.metrics()
+    assert metrics["counters"][("model.loads", (("model", "sam"),))] == 3
+    assert metrics["counters"][("model.loads", (("model", "sd"),))] == 1
+    latency = metrics["histograms"][("latency", ())]
+    assert latency["count"] == 2 and latency["sum"] == pytest.approx(0.55)
+    assert latency["buckets"] == {0.1: 1, 1.0: 2}
+    assert exporter.counts[0] == ("model.loads", 1, {"model": "sam"})
+
+    recorder.reset()
+    assert recorder.metrics() == {"counters": {}, "histograms": {}}
+
+def test_prometheus_text(exporter):
+    recorder = instrumentation.get_instrumentation()
+    instrumentation.count("cache.hits", cache='sam "embeddings"')
+    instrumentation.observe("span_seconds", 0.5, span="diffusion")
+
+    text = PrometheusExporter(recorder).render()
+    assert "# TYPE image_alchemy_cache_hits_total counter" in text
+    assert 'image_alchemy_cache_hits_total{cache="sam \\"embeddings\\""} 1' in text
+    assert "# TYPE image_alchemy_span_seconds histogram" in text
+    assert 'image_alchemy_span_seconds_bucket{span="diffusion",le="0.1"} 0' in text
+    assert 'image_alchemy_span_seconds_bucket{span="diffusion",le="1.0"} 1' in text
+    assert 'image_alchemy_span_seconds_bucket{span="diffusion",le="+Inf"} 1' in text
+    assert 'image_alchemy_span_seconds_count{span="diffusion"} 1' in text
+
+def test_prometheus_endpoint(exporter):
+    prometheus = PrometheusExporter(instrumentation.get_instrumentation())
+    instrumentation.count("cache.hits")
+    server = prometheus.serve(port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.read().decode() == prometheus.render()
+    finally:
+        prometheus.shutdown()
+
+def test_json_log_exporter():
+    stream = io.StringIO()
+    recorder = Recorder(exporters=[JsonLogExporter(stream)])
+    with recorder.span("diffusion", batch=2):
+        recorder.count("cache.misses", cache="prompts")
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r["type"], r["name"]) for r in records] == [("count", "cache.misses"), ("span", "diffusion")]
+    assert records[1]["attributes"] == {"batch": 2}
+
+def test_default_records_nothing():
+    assert type(instrumentation.get_instrumentation()) is Instrumentation
+    assert not instrumentation.get_instrumentation().enabled
+    with instrumentation.span("anything", size=1) as span:
+        span.set(more=2)
+    assert span is instrumentation._NULL_SPAN
+    instrumentation.count("anything")
+    instrumentation.observe("anything", 1.0)
+    assert instrumentation.step_callback_kwargs() == {}
+
+def test_traced_wraps_calls_in_a_span(exporter):
+    @instrumentation.traced("work")
+    def work(x):
+        """Doubles x."""
+        with instrumentation.span("inner"):
+            return 2 * x
+
+    assert work(21) == 42
+    assert work.__doc__ == "Doubles x."
+    spans = spans_by_name(exporter)
+    assert spans["inner"].parent_id == spans["work"].span_id
+
+    instrumentation.set_instrumentation(None)
+    assert work(1) == 2
+    assert len(exporter.spans) == 2
+
+def test_denoising_steps_are_children_of_the_diffusion_span(exporter):
+    alchemy = stub_alchemy()
+    image = Image.fromarray(np.zeros((48, 64, 3), np.uint8))
+    alchemy.enhancement.denoise(image, strength=0.4, seed=0)
+
+    spans = spans_by_name(exporter)
+    steps = [span for span in exporter.spans if span.name == "diffusion.step"]
+    # The stub runs int(25 steps * strength) denoising steps, as diffusers' img2img does
+    assert [span.attributes["step"] for span in steps] == list(range(10))
+    assert {span.parent_id for span in steps} == {spans["diffusion"].span_id}
+    assert spans["diffusion"].trace_id == spans["enhancement.denoise"].trace_id
+    counters = instrumentation.get_instrumentation().metrics()["counters"]
+    for key in alchemy.model_loader.memory_stats()["models"]:
+        assert counters[("model.loads", (("model", key),))] == 1
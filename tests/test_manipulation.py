@@ -0,0 +1,86 @@
+# --- FILENAME: tests/test_manipulation.py ---
+"""Mask handling of `ManipulationModule` on stub models."""
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.core.stubs import stub_alchemy
+from image_alchemy.functionalities import manipulation
+from image_alchemy.utils.image_utils import transplant_object
+
+def test_fused_reposition_accepts_a_destination_box():
+    alchemy = stub_alchemy()
+    image = Image.new("RGB", (96, 64), (40, 90, 160))
+    result = alchemy.manipulation.reposition_object(
+        image, [8, 8, 32, 32], [56, 24, 80, 48], "a vase", fused=True, seed=0
+    )
+    assert result.size == image.size
+
+def test_fused_reposition_rejects_several_destination_boxes():
+    alchemy = stub_alchemy()
+    with pytest.raises(ValueError, match="one bounding box"):
+        alchemy.manipulation.reposition_object(
+            Image.new("RGB", (96, 64)), [8, 8, 32, 32], [[56, 8, 80, 32], [56, 32, 80, 56]], "a vase", fused=True
+        )
+    # Rejected before the source mask was segmented
+    assert not alchemy.model_loader.memory_stats()["models"]
+
+@pytest.mark.parametrize("box", [
+    (8, 8, 40, 32),
+    [np.int64(8), np.int32(8), np.float32(40), np.float64(32)],
+    np.array([8, 8, 40, 32]),
+])
+def test_boxes_may_be_tuples_or_numpy_numbers(box):
+    alchemy = stub_alchemy()
+    image = Image.new("RGB", (96, 64), (40, 90, 160))
+    expected = np.array(alchemy.manipulation._get_mask(image, [8, 8, 40, 32]))
+    assert np.array_equal(np.array(alchemy.manipulation._get_mask(image, box)), expected)
+
+def test_several_boxes_may_be_a_tuple_of_tuples():
+    alchemy = stub_alchemy()
+    image = Image.new("RGB", (96, 64), (40, 90, 160))
+    boxes = [[8, 8, 32, 32], [56, 24, 80, 48]]
+    expected = np.array(alchemy.manipulation._get_mask(image, boxes))
+    numpy_boxes = tuple(tuple(np.int64(v) for v in box) for box in boxes)
+    assert np.array_equal(np.array(alchemy.manipulation._get_mask(image, numpy_boxes)), expected)
+
+def test_fused_reposition_accepts_a_numpy_destination_box():
+    alchemy = stub_alchemy()
+    image = Image.new("RGB", (96, 64), (40, 90, 160))
+    destination = tuple(np.int64(v) for v in (56, 24, 80, 48))
+    assert alchemy.manipulation.reposition_object(image, (8, 8, 32, 32), destination, "a vase", fused=True).size == image.size
+
+def test_fused_reposition_prompts_each_region_separately(monkeypatch):
+    alchemy = stub_alchemy()
+    calls = []
+    original = manipulation.run_inpaint_batch
+
+    def recording_batch(model_loader, items, **kwargs):
+        calls.append(items)
+        return original(model_loader, items, **kwargs)
+
+    monkeypatch.setattr(manipulation, "run_inpaint_batch", recording_batch)
+    image = Image.new("RGB", (96, 64), (40, 90, 160))
+    source = Image.new("L", image.size)
+    source.paste(255, (8, 8, 24, 40))
+    result = alchemy.manipulation.reposition_object(
+        image, source, [56, 16, 88, 56], "a vase", fused=True, background_prompt="empty wall", seed=0
+    )
+    assert result.size == image.size
+    # Both regions are diffused in one call
+    assert len(calls) == 1 and alchemy.model_loader.get_sd_pipeline().batch_sizes == [2]
+    (_, object_mask, object_prompt), (_, vacated_mask, background_prompt) = calls[0]
+    assert (object_prompt, background_prompt) == ("a vase", "empty wall")
+    object_mask, vacated_mask = np.array(object_mask) > 0, np.array(vacated_mask) > 0
+    assert vacated_mask[8:40, 8:24].all() and not vacated_mask[:, 48:].any()
+    assert object_mask[20:52, 64:80].all() and not object_mask[:, :48].any()
+
+def test_transplanted_object_keeps_its_aspect_ratio():
+    image = np.zeros((64, 96, 3), np.uint8)
+    image[8:40, 8:24] = 255  # a 16x32 object
+    source = Image.fromarray(image[..., 0])
+    init, _, object_mask = transplant_object(Image.fromarray(image), source, [48, 0, 96, 64], dilation=1)
+    # Scaled by 2 to fit the box's height, centered horizontally
+    ys, xs = np.nonzero(np.array(object_mask))
+    assert (xs.min(), xs.max() + 1, ys.min(), ys.max() + 1) == (56, 88, 0, 64)
+    assert np.array(init)[:, 56:88].min() == 255
@@ -0,0 +1,98 @@
+# --- FILENAME: tests/test_metrics.py ---
+"""Tests of the headless quality metrics."""
+import csv
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.utils import metrics
+
+def make_pair(seed: int = 0, shape: tuple = (60, 80, 3)):
+    rng = np.random.RandomState(seed)
+    before = rng.randint(0, 256, shape).astype(np.uint8)
+    after = np.clip(before + rng.normal(0, 12, shape), 0, 255).astype(np.uint8)
+    return before, after
+
+def test_ssim_and_psnr_match_scikit_image():
+    skimage_metrics = pytest.importorskip("skimage.metrics")
+    before, after = make_pair()
+    gray_before, gray_after = metrics.to_gray(before), metrics.to_gray(after)
+    expected = skimage_metrics.structural_similarity(gray_before, gray_after, data_range=255)
+    assert metrics.ssim(before, after) == pytest.approx(expected, abs=1e-9)
+    assert metrics.psnr(before, after) == pytest.approx(
+        skimage_metrics.peak_signal_noise_ratio(before, after, data_range=255)
+    )
+
+def test_identical_images():
+    before, _ = make_pair()
+    scores = metrics.compare(before, before)
+    assert scores["ssim"] == pytest.approx(1.0)
+    assert scores["psnr"] == float("inf")
+    assert scores["hist_distance"] == 0.0
+
+def test_alpha_channel_is_dropped():
+    before, after = make_pair()
+    rgba = np.dstack([after, np.full(after.shape[:2], 128, np.uint8)])
+    assert metrics.compare(before, rgba) == metrics.compare(before, after)
+    assert metrics.compare(before, rgba) == metrics.compare(Image.fromarray(before), Image.fromarray(rgba))
+
+def test_masked_scores():
+    before, after = make_pair()
+    after[:30] = before[:30]  # the top half is untouched
+    mask = np.zeros(before.shape[:2], bool)
+    mask[30:] = True
+    scores = metrics.compare(before, after, mask)
+    assert scores["psnr_outside"] == float("inf")
+    assert scores["psnr_mask"] < scores["psnr"]
+
+def test_fast_mode_downsamples():
+    before, after = make_pair(shape=(600, 800, 3))
+    scores = metrics.compare(before, after, fast=True, max_side=200)
+    assert (scores["width"], scores["height"]) == (200, 150)
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_batch_rows_are_ordered_and_errors_are_reported(workers):
+    pairs = [(f"pair{i}",) + make_pair(i) for i in range(10)]
+    pairs.insert(4, ("missing", "/nonexistent/before.png", "/nonexistent/after.png"))
+    rows = list(metrics.compare_batch(pairs, workers=workers, chunk_size=3))
+    assert [row["index"] for row in rows] == list(range(11))
+    assert [row["name"] for row in rows][4:6] == ["missing", "pair4"]
+    assert rows[4]["error"].startswith("FileNotFoundError")
+    assert all(row["error"] is None for i, row in enumerate(rows) if i != 4)
+
+def test_batch_consumes_pairs_lazily():
+    consumed = []
+
+    def pairs():
+        for i in range(100):
+            consumed.append(i)
+            yield make_pair(i)
+
+    rows = metrics.compare_batch(pairs(), workers=2, chunk_size=4)
+    next(rows)
+    assert len(consumed) <= 2 * 2 * 4
+    assert len(list(rows)) == 99
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_write_metrics(tmp_path, suffix):
+    pairs = [("missing", "/nonexistent.png", "/nonexistent.png")] + [(f"pair{i}",) + make_pair(i) for i in range(3)]
+    path = str(tmp_path / f"scores{suffix}")
+    assert metrics.write_metrics(metrics.compare_batch(pairs), path) == 4
+    with open(path) as f:
+        if suffix == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f]
+    assert [row["name"] for row in rows] == ["missing", "pair0", "pair1", "pair2"]
+    assert float(rows[1]["ssim"]) == pytest.approx(metrics.compare(*make_pair(0))["ssim"])
+
+def test_json_lines_write_infinite_psnr_as_null(tmp_path):
+    before, _ = make_pair()
+    path = str(tmp_path / "scores.jsonl")
+    metrics.write_metrics(metrics.compare_batch([("same", before, before)]), path)
+    with open(path) as f:
+        text = f.read()
+    assert "Infinity" not in text
+    assert json.loads(text)["psnr"] is None
@@ -0,0 +1,215 @@
+# --- FILENAME: tests/test_model_loader.py ---
+"""Tests of the model registry's memory budget policy, using stand-in models."""
+import threading
+import time
+
+from image_alchemy.core import model_loader as model_loader_module
+from image_alchemy.core.model_loader import ModelLoader
+
+MB = 1024**2
+
+class FakeModel:
+    """A stand-in model: `nbytes` of weights that can be moved between devices."""
+    def __init__(self, nbytes: int = 100 * MB):
+        self.nbytes = nbytes
+        self.device = None
+
+    def to(self, device):
+        self.device = device
+        return self
+
+def load(loader: ModelLoader, key: str, nbytes: int = 100 * MB):
+    return loader._get_or_load(key, lambda: FakeModel(nbytes).to(loader.device))
+
+def residency(loader: ModelLoader) -> dict:
+    return {key: info["residency"] for key, info in loader.memory_stats()["models"].items()}
+
+def test_device_budget_offloads_least_recently_used():
+    loader = ModelLoader(device="cuda", max_device_bytes=250 * MB)
+    a = load(loader, "a")
+    load(loader, "b")
+    load(loader, "c")
+    assert residency(loader) == {"a": "cpu", "b": "device", "c": "device"}
+    assert a.device == "cpu"
+
+    # Using "a" again brings it back and offloads the now least recently used "b"
+    assert load(loader, "a") is a
+    assert a.device == "cuda"
+    assert residency(loader) == {"b": "cpu", "c": "device", "a": "device"}
+    stats = loader.memory_stats()
+    assert (stats["offloads"], stats["onloads"], stats["loads"]) == (2, 1, 3)
+
+def test_host_budget_evicts_least_recently_offloaded():
+    loader = ModelLoader(device="cuda", max_device_bytes=100 * MB, max_host_bytes=100 * MB)
+    load(loader, "a")
+    load(loader, "b")
+    load(loader, "c")
+    assert residency(loader) == {"b": "cpu", "c": "device"}
+    assert loader.memory_stats()["evictions"] == 1
+
+    # An evicted model is reloaded through its factory
+    load(loader, "a")
+    stats = loader.memory_stats()
+    assert stats["reloads"] == 1
+    assert residency(loader) == {"c": "cpu", "a": "device"}
+
+def test_cpu_device_evicts_directly():
+    loader = ModelLoader(device="cpu", max_device_bytes=150 * MB)
+    load(loader, "a")
+    load(loader, "b")
+    assert residency(loader) == {"b": "device"}
+    stats = loader.memory_stats()
+    assert (stats["offloads"], stats["evictions"]) == (0, 1)
+
+def test_shared_modules_are_counted_once():
+    # 400 MB if the shared UNet were counted per pipeline, 300 MB of unique modules
+    loader = ModelLoader(device="cuda", max_device_bytes=350 * MB)
+    shared = FakeModel()
+
+    class Pipeline:
+        def __init__(self):
+            self.components = {"unet": shared, "controlnet": FakeModel()}
+
+    loader._get_or_load("p1", Pipeline)
+    loader._get_or_load("p2", Pipeline)
+    assert loader.memory_stats()["device_bytes"] == 300 * MB
+    assert residency(loader) == {"p1": "device", "p2": "device"}
+
+def test_pinned_models_are_not_offloaded():
+    loader = ModelLoader(device="cuda", max_device_bytes=100 * MB)
+    a = load(loader, "a")
+    with loader.in_use(a):
+        load(loader, "b")
+        assert residency(loader)["a"] == "device"
+        assert loader.memory_stats()["models"]["a"]["pinned"]
+        load(loader, "c")  # "b" is the only unpinned model it may displace
+        assert residency(loader) == {"a": "device", "b": "cpu", "c": "device"}
+    # Leaving the block enforces the budget again
+    assert residency(loader) == {"a": "cpu", "b": "cpu", "c": "device"}
+
+def test_pinned_models_are_not_evicted():
+    loader = ModelLoader(device="cpu", max_device_bytes=100 * MB)
+    load(loader, "a")
+    with loader.in_use("a"):
+        load(loader, "b")
+        assert set(residency(loader)) == {"a", "b"}
+    assert set(residency(loader)) == {"b"}
+
+def test_waiter_reloads_a_model_evicted_before_it_woke(monkeypatch):
+    loader = ModelLoader(device="cuda")
+    release = threading.Event()
+    results = {}
+
+    def slow_factory():
+        release.wait()
+        return FakeModel()
+
+    original_wait = model_loader_module._PendingLoad.wait
+
+    def wait_then_evict(pending):
+        original_wait(pending)
+        with loader._lock:
+            if "a" in loader._models:
+                loader._evict("a")
+
+    monkeypatch.setattr(model_loader_module._PendingLoad, "wait", wait_then_evict)
+    loader_thread = threading.Thread(target=lambda: results.setdefault("loader", loader._get_or_load("a", slow_factory)))
+    loader_thread.start()
+    while "a" not in loader._loading:
+        time.sleep(0.001)
+    waiter_thread = threading.Thread(target=lambda: results.setdefault("waiter", loader._get_or_load("a", FakeModel)))
+    waiter_thread.start()
+    while loader.memory_stats()["load_waits"] == 0:
+        time.sleep(0.001)
+    release.set()
+    loader_thread.join(5)
+    waiter_thread.join(5)
+
+    assert isinstance(results["waiter"], FakeModel)
+    stats = loader.memory_stats()
+    assert (stats["loads"], stats["evictions"], stats["reloads"]) == (1, 1, 1)
+
+def test_waiter_gets_none_when_the_load_fails():
+    loader = ModelLoader(device="cuda")
+    release = threading.Event()
+    results = {}
+
+    def failing_factory():
+        release.wait()
+        return None
+
+    loader_thread = threading.Thread(target=lambda: results.setdefault("loader", loader._get_or_load("a", failing_factory)))
+    loader_thread.start()
+    while "a" not in loader._loading:
+        time.sleep(0.001)
+    waiter_thread = threading.Thread(target=lambda: results.setdefault("waiter", loader._get_or_load("a", FakeModel)))
+    waiter_thread.start()
+    while loader.memory_stats()["load_waits"] == 0:
+        time.sleep(0.001)
+    release.set()
+    loader_thread.join(5)
+    waiter_thread.join(5)
+
+    assert results == {"loader": None, "waiter": None}
+
+def test_parts_of_an_assembled_model_stay_on_the_device():
+    # Room for one part only: without pins, loading the second part offloads the first
+    loader = ModelLoader(device="cuda", max_device_bytes=100 * MB)
+
+    class Pipeline:
+        def __init__(self):
+            self.parts = [load(loader, "part1"), load(loader, "part2")]
+            assert [part.device for part in self.parts] == ["cuda", "cuda"]
+            self.components = {"part1": self.parts[0], "part2": self.parts[1]}
+
+    pipeline = loader._get_or_load("pipeline", Pipeline, pins=("part1", "part2"))
+    assert [part.device for part in pipeline.parts] == ["cuda", "cuda"]
+    assert residency(loader)["pipeline"] == "device"
+    assert not loader._pins
+
+def test_waiter_gets_the_loaders_exception():
+    loader = ModelLoader(device="cuda")
+    release = threading.Event()
+    results = {}
+
+    def raising_factory():
+        release.wait()
+        raise OSError("checkpoint not found")
+
+    def request(name, factory):
+        try:
+            results[name] = loader._get_or_load("a", factory)
+        except OSError as e:
+            results[name] = e
+
+    loader_thread = threading.Thread(target=request, args=("loader", raising_factory))
+    loader_thread.start()
+    while "a" not in loader._loading:
+        time.sleep(0.001)
+    waiter_thread = threading.Thread(target=request, args=("waiter", FakeModel))
+    waiter_thread.start()
+    while loader.memory_stats()["load_waits"] == 0:
+        time.sleep(0.001)
+    release.set()
+    loader_thread.join(5)
+    waiter_thread.join(5)
+
+    assert isinstance(results["waiter"], OSError)
+    assert results["waiter"] is results["loader"]
+    assert not loader._loading
+
+def test_only_successful_snapshot_loads_are_counted(monkeypatch):
+    monkeypatch.setattr(model_loader_module.snapshot, "has_snapshot", lambda path: True)
+    loader = ModelLoader(device="cuda")
+
+    class Model(FakeModel):
+        @classmethod
+        def from_pretrained(cls, path, fail=False):
+            if fail:
+                raise OSError("truncated snapshot")
+            return cls()
+
+    assert loader._load_model("broken", Model, fail=True) is None
+    assert loader.memory_stats()["snapshot_loads"] == 0
+    assert isinstance(loader._load_model("good", Model), Model)
+    assert loader.memory_stats()["snapshot_loads"] == 1
@@ -0,0 +1,84 @@
+# --- FILENAME: tests/test_pool.py ---
+"""`AlchemyPool` worker processes serving stub engines."""
+import functools
+import os
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.core.stubs import stub_alchemy
+from image_alchemy.pool import AlchemyPool, WorkerCrashed
+
+class UnpicklableError(Exception):
+    def __init__(self):
+        super().__init__("holds a lock")
+        self.lock = threading.Lock()
+
+class UnreadableError(Exception):
+    """Pickles, but unpickling calls __init__ without its required argument."""
+    def __init__(self, code, detail):
+        super().__init__(f"{code}: {detail}")
+
+def make_image(seed: int = 0) -> Image.Image:
+    return Image.fromarray(np.random.RandomState(seed).randint(0, 256, (32, 48, 3)).astype(np.uint8))
+
+def faulty_alchemy(marker: str, device: str):
+    """
+    A stub engine whose denoise kills its process (the first time only when `marker`
+    names a file path; always when it is empty) and whose sharpen raises `UnpicklableError`.
+    """
+    alchemy = stub_alchemy(device)
+    denoise = alchemy.enhancement.denoise
+
+    def crashing_denoise(image, **kwargs):
+        if not marker or not os.path.exists(marker):
+            if marker:
+                open(marker, "w").close()
+            os._exit(3)
+        return denoise(image, **kwargs)
+
+    def failing_sharpen(image, **kwargs):
+        raise UnpicklableError()
+
+    def failing_deblur(image, **kwargs):
+        raise UnreadableError(7, "no detail")
+
+    alchemy.enhancement.denoise = crashing_denoise
+    alchemy.enhancement.sharpen = failing_sharpen
+    alchemy.enhancement.deblur = failing_deblur
+    return alchemy
+
+def test_results_round_trip():
+    image = make_image()
+    with AlchemyPool(devices=["cpu"], threads_per_worker=1, alchemy_factory=stub_alchemy) as pool:
+        results = pool.map("enhancement.denoise", [image, make_image(1)], seed=0)
+        assert pool.stats()["completed"] == 2
+    assert np.array_equal(np.asarray(results[0]), np.asarray(stub_alchemy().enhancement.denoise(image, seed=0)))
+
+def test_crashed_worker_is_restarted_and_its_task_retried(tmp_path):
+    factory = functools.partial(faulty_alchemy, str(tmp_path / "crashed"))
+    image = make_image()
+    with AlchemyPool(devices=["cpu"], threads_per_worker=1, alchemy_factory=factory, max_retries=1) as pool:
+        result = pool.run("enhancement.denoise", image=image, seed=0)
+        stats = pool.stats()
+    assert np.array_equal(np.asarray(result), np.asarray(stub_alchemy().enhancement.denoise(image, seed=0)))
+    assert (stats["restarts"], stats["retried"], stats["completed"]) == (1, 1, 1)
+
+def test_worker_errors_reach_the_caller():
+    # Timeouts turn a lost result into a failure rather than a hang
+    factory = functools.partial(faulty_alchemy, "")
+    with AlchemyPool(devices=["cpu"], threads_per_worker=1, alchemy_factory=factory, max_retries=1) as pool:
+        # A task that keeps killing its worker fails once its retries are spent
+        with pytest.raises(WorkerCrashed):
+            pool.submit("enhancement.denoise", image=make_image(), seed=0).result(timeout=60)
+        assert pool.stats()["restarts"] == 2
+
+        # Exceptions that cannot travel back are replaced by a RuntimeError naming them
+        with pytest.raises(RuntimeError, match="UnpicklableError: holds a lock"):
+            pool.submit("enhancement.sharpen", image=make_image(), seed=0).result(timeout=60)
+        with pytest.raises(RuntimeError, match="UnreadableError: 7: no detail"):
+            pool.submit("enhancement.deblur", image=make_image(), seed=0).result(timeout=60)
+        stats = pool.stats()
+    assert (stats["failed"], stats["restarts"]) == (3, 2)
@@ -0,0 +1,36 @@
+# --- FILENAME: tests/test_result_cache.py ---
+"""Keys and lookups of the on-disk result cache, on stub models."""
+import numpy as np
+from PIL import Image
+
+from image_alchemy.core import result_cache
+from image_alchemy.core.result_cache import ResultCache
+from image_alchemy.core.stubs import stub_alchemy
+
+def make_image() -> Image.Image:
+    return Image.fromarray(np.random.RandomState(0).randint(0, 256, (48, 64, 3)).astype(np.uint8))
+
+def test_tile_settings_are_part_of_the_key(tmp_path):
+    alchemy = stub_alchemy()
+    cache = alchemy.enhancement.result_cache = ResultCache(str(tmp_path))
+    image = make_image()
+    alchemy.enhancement.denoise(image, seed=0)
+    alchemy.enhancement.denoise(image, seed=0)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for name, value in [("tile_size", 256), ("tile_overlap", 32), ("tile_batch_size", 4)]:
+        setattr(alchemy.enhancement, name, value)
+        alchemy.enhancement.denoise(image, seed=0)
+    assert (cache.hits, cache.misses) == (1, 4)
+
+def test_a_file_evicted_after_it_was_read_is_still_a_hit(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    image = make_image()
+    cache.put("ab" * 20, image)
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(result_cache.os, "utime", evicted)
+    result = cache.get("ab" * 20)
+    assert np.array_equal(np.asarray(result), np.asarray(image))
+    assert (cache.hits, cache.misses) == (1, 0)
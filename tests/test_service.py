@@ -0,0 +1,173 @@
+# --- FILENAME: tests/test_service.py ---
+"""End-to-end tests of `AlchemyService` on stub pipelines."""
+import asyncio
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_alchemy.alchemy import ImageAlchemy
+from image_alchemy.core.model_loader import DEFAULT_INPAINT_MODEL_ID
+from image_alchemy.core.stubs import StubModelLoader
+from image_alchemy.service import AlchemyService, ServiceOverloaded
+
+BOX = [8, 8, 40, 40]
+
+def make_alchemy(call_latency: float = 0.0) -> ImageAlchemy:
+    return ImageAlchemy(model_loader=StubModelLoader(call_latency=call_latency))
+
+def make_image(seed: int = 0, size: tuple = (96, 64)) -> Image.Image:
+    pixels = np.random.RandomState(seed).randint(0, 256, (size[1], size[0], 3)).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+def pipeline_batch_sizes(alchemy: ImageAlchemy) -> list:
+    return alchemy.model_loader.get_sd_pipeline(DEFAULT_INPAINT_MODEL_ID).batch_sizes
+
+def controlnet_batch_sizes(alchemy: ImageAlchemy) -> list:
+    pipelines = [model for key, model in alchemy.model_loader._models.items() if "+" in key]
+    return [size for pipeline in pipelines for size in pipeline.batch_sizes]
+
+def test_compatible_requests_share_a_pipeline_call():
+    alchemy = make_alchemy()
+
+    async def main():
+        async with AlchemyService(alchemy, max_batch_size=4, batch_window=0.2) as service:
+            await asyncio.gather(*[
+                service.submit("manipulation.inpaint", image=make_image(i), mask=BOX, prompt="a cat", seed=i)
+                for i in range(4)
+            ])
+            return service.stats()
+
+    stats = asyncio.run(main())
+    assert stats["completed"] == 4
+    assert stats["batches"] == 1
+    assert pipeline_batch_sizes(alchemy) == [4]
+
+@pytest.mark.parametrize("operation", ["manipulation.inpaint", "manipulation.remove_object"])
+def test_batched_output_matches_single_call(operation):
+    alchemy = make_alchemy()
+    images = [make_image(i, size=(100, 70)) for i in range(3)]
+    params = {"prompt": "a cat"} if operation == "manipulation.inpaint" else {}
+
+    async def main():
+        async with AlchemyService(alchemy, max_batch_size=4, batch_window=0.2) as service:
+            return await asyncio.gather(*[
+                service.submit(operation, image=image, mask=BOX, seed=3 + i, **params)
+                for i, image in enumerate(images)
+            ])
+
+    batched = asyncio.run(main())
+    assert pipeline_batch_sizes(alchemy) == [3]
+    method = getattr(alchemy.manipulation, operation.partition(".")[2])
+    for i, (image, result) in enumerate(zip(images, batched)):
+        single = method(image, BOX, seed=3 + i, **params)
+        assert np.array_equal(np.asarray(result), np.asarray(single))
+
+def test_batched_enhancement_matches_single_call():
+    alchemy = make_alchemy()
+    images = [make_image(i) for i in range(2)]
+
+    async def main():
+        async with AlchemyService(alchemy, max_batch_size=4, batch_window=0.2) as service:
+            return await asyncio.gather(*[
+                service.submit("enhancement.denoise", image=image, seed=i) for i, image in enumerate(images)
+            ])
+
+    batched = asyncio.run(main())
+    assert controlnet_batch_sizes(alchemy) == [2]
+    for i, (image, result) in enumerate(zip(images, batched)):
+        assert np.array_equal(np.asarray(result), np.asarray(alchemy.enhancement.denoise(image, seed=i)))
+
+def test_batched_colorize_matches_single_call():
+    alchemy = make_alchemy()
+    images = [make_image(0), make_image(1).convert("L"), make_image(2), make_image(3).convert("L")]
+
+    async def main():
+        async with AlchemyService(alchemy, max_batch_size=4, batch_window=0.2) as service:
+            return await asyncio.gather(*[
+                service.submit("enhancement.colorize", image=image, seed=i) for i, image in enumerate(images)
+            ])
+
+    batched = asyncio.run(main())
+    # Grayscale and RGB inputs are batched separately
+    assert sorted(controlnet_batch_sizes(alchemy)) == [2, 2]
+    for i, (image, result) in enumerate(zip(images, batched)):
+        assert np.array_equal(np.asarray(result), np.asarray(alchemy.enhancement.colorize(image, seed=i)))
+
+@pytest.mark.parametrize("operation, params", [
+    ("enhancement.denoise", {"prompt": "clean"}),
+    ("enhancement.colorize", {"strength": 0.5}),
+])
+def test_enhancement_rejects_arguments_its_method_does_not_take(operation, params):
+    alchemy = make_alchemy()
+
+    async def main():
+        async with AlchemyService(alchemy, batch_window=0.2) as service:
+            with pytest.raises(TypeError):
+                await service.submit(operation, image=make_image(), seed=0, **params)
+
+    asyncio.run(main())
+    assert controlnet_batch_sizes(alchemy) == []
+
+def test_timeout_raises_and_drops_the_request():
+    alchemy = make_alchemy(call_latency=0.3)
+
+    async def main():
+        async with AlchemyService(alchemy, batch_window=0.0) as service:
+            with pytest.raises(asyncio.TimeoutError):
+                await service.submit("manipulation.inpaint", image=make_image(), mask=BOX, prompt="a cat", timeout=0.05)
+            return service.stats()
+
+    stats = asyncio.run(main())
+    assert stats["timed_out"] == 1
+    assert stats["completed"] <= 1  # a batch already running completes, its result is discarded
+
+def test_full_queue_rejects_without_blocking():
+    alchemy = make_alchemy()
+
+    async def main():
+        service = AlchemyService(alchemy, max_pending=1)
+        await service.start()
+        try:
+            # The scheduler has not run yet, so the first request fills the queue
+            first = asyncio.ensure_future(
+                service.submit("manipulation.inpaint", image=make_image(), mask=BOX, prompt="a cat", block=False)
+            )
+            await asyncio.sleep(0)
+            with pytest.raises(ServiceOverloaded):
+                await service.submit("manipulation.inpaint", image=make_image(1), mask=BOX, prompt="a cat", block=False)
+            await first
+        finally:
+            await service.stop()
+        return service.stats()
+
+    stats = asyncio.run(main())
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 1
+
+def test_stop_cancels_requests_waiting_for_their_batch():
+    alchemy = make_alchemy()
+
+    async def main():
+        service = AlchemyService(alchemy, batch_window=5.0)
+        await service.start()
+        request = asyncio.ensure_future(
+            service.submit("manipulation.inpaint", image=make_image(), mask=BOX, prompt="a cat")
+        )
+        await asyncio.sleep(0.05)  # the scheduler now holds the request in its batch window
+        assert service.stats()["pending"] == 0
+        await service.stop()
+        await asyncio.wait_for(asyncio.wait([request]), 1.0)
+        return request
+
+    request = asyncio.run(main())
+    assert request.cancelled()
+    assert pipeline_batch_sizes(alchemy) == []
+
+def test_unknown_operation_is_rejected():
+    async def main():
+        async with AlchemyService(make_alchemy()) as service:
+            with pytest.raises(ValueError):
+                await service.submit("manipulation._get_mask", image=make_image(), mask=BOX)
+
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+# --- FILENAME: tests/test_shared_components.py ---
+"""ControlNet pipelines built on one base model must share its components."""
+import pytest
+
+diffusers = pytest.importorskip("diffusers")
+transformers = pytest.importorskip("transformers")
+
+from image_alchemy.core.model_loader import ModelLoader, DEFAULT_BASE_MODEL_ID
+
+CANNY_ID = "lllyasviel/sd-controlnet-canny"
+SOFTEDGE_ID = "lllyasviel/control_v11p_sd15_softedge"
+
+def tiny_controlnet():
+    return diffusers.ControlNetModel(
+        block_out_channels=(8, 16), layers_per_block=1, down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        cross_attention_dim=8, norm_num_groups=8, attention_head_dim=2, conditioning_embedding_out_channels=(4, 8)
+    )
+
+def tiny_base_pipeline():
+    """A randomly initialised, few-kilobyte stand-in for the Stable Diffusion base model."""
+    class Tokenizer:
+        pass
+
+    return diffusers.StableDiffusionPipeline(
+        vae=diffusers.AutoencoderKL(
+            block_out_channels=(8,), down_block_types=("DownEncoderBlock2D",), up_block_types=("UpDecoderBlock2D",),
+            latent_channels=4, norm_num_groups=8, layers_per_block=1
+        ),
+        text_encoder=transformers.CLIPTextModel(transformers.CLIPTextConfig(
+            hidden_size=8, intermediate_size=16, num_attention_heads=2, num_hidden_layers=1
+        )),
+        tokenizer=Tokenizer(),
+        unet=diffusers.UNet2DConditionModel(
+            block_out_channels=(8, 16), layers_per_block=1, down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+            up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"), cross_attention_dim=8, norm_num_groups=8,
+            attention_head_dim=2, sample_size=8
+        ),
+        scheduler=diffusers.PNDMScheduler(steps_offset=1, skip_prk_steps=True),
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False
+    )
+
+@pytest.fixture
+def loader():
+    # Seed the registry with stand-ins so that nothing is downloaded
+    loader = ModelLoader(device="cpu", use_snapshots=False)
+    loader._get_or_load(f"{DEFAULT_BASE_MODEL_ID}::components", tiny_base_pipeline)
+    loader._get_or_load(CANNY_ID, tiny_controlnet)
+    loader._get_or_load(SOFTEDGE_ID, tiny_controlnet)
+    return loader
+
+def test_controlnet_pipelines_share_base_components(loader):
+    canny = loader.get_controlnet_pipeline(controlnet_model_id=CANNY_ID)
+    softedge = loader.get_controlnet_pipeline(controlnet_model_id=SOFTEDGE_ID)
+    base = loader.get_shared_components()
+
+    for name in ("unet", "vae", "text_encoder", "tokenizer"):
+        assert getattr(canny, name) is getattr(softedge, name) is base[name]
+    assert canny.controlnet is not softedge.controlnet
+    # Schedulers hold per-run state, so every pipeline gets its own
+    assert canny.scheduler is not softedge.scheduler
+    assert canny.scheduler is not base["scheduler"]
+
+def test_shared_weights_are_budgeted_once(loader):
+    # On the CPU every registered weight counts against the host tier
+    before = loader.memory_stats()["host_bytes"]
+    loader.get_controlnet_pipeline(controlnet_model_id=CANNY_ID)
+    loader.get_controlnet_pipeline(controlnet_model_id=SOFTEDGE_ID)
+    # The pipelines add no weights: the base components and ControlNets are already registered
+    assert loader.memory_stats()["host_bytes"] == before
+
+def test_assembly_keeps_its_parts_under_a_tight_budget(loader):
+    base = loader.get_shared_components()
+    components_bytes = loader.memory_stats()["models"][f"{DEFAULT_BASE_MODEL_ID}::components"]["bytes"]
+    # Room for the base components alone: loading the ControlNet must not evict them mid-assembly
+    loader.max_device_bytes = components_bytes
+    pipeline = loader.get_controlnet_pipeline(controlnet_model_id=CANNY_ID)
+    assert pipeline.unet is base["unet"]
+    assert loader.memory_stats()["reloads"] == 0
+    assert not loader._pins